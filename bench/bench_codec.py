@@ -0,0 +1,91 @@
+"""Benchmark JSON encode and decode of /mon/ant payloads.
+
+   Compares the json module with the codec in use (orjson if installed) on
+   antenna monitor payloads with the fields checked by the minmax_ant
+   configuration, in both strict and non-strict mode, and JSON lists with
+   the binary envelope for a two-pol bandpass vector.
+
+   Run from the top of the repo:
+
+    > python bench/bench_codec.py
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import dsautils.codec as codec
+from dsautils.cnf import MINMAX_ANT_DATA
+
+
+def ant_payloads(nant: int) -> list:
+    """Return one monitor payload per antenna with values inside the
+    minmax_ant limits.
+    """
+    rng = np.random.default_rng(110)
+    payloads = []
+    for ant in range(1, nant+1):
+        payload = {'ant_num': ant, 'time': 59000.+rng.random()}
+        for key, (low, high) in MINMAX_ANT_DATA.items():
+            if isinstance(low, bool):
+                payload[key] = bool(rng.integers(2))
+            elif isinstance(low, int):
+                payload[key] = int(rng.integers(low, high+1))
+            else:
+                payload[key] = float(rng.uniform(low, high))
+        payloads.append(payload)
+    return payloads
+
+
+def rate(func, items: list, nloop: int) -> float:
+    """Return calls per second of func over items, nloop times."""
+    start = time.perf_counter()
+    for _ in range(nloop):
+        for item in items:
+            func(item)
+    return nloop*len(items)/(time.perf_counter()-start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON codec throughput')
+    parser.add_argument('-n', type=int, default=200, help='loops over all antennas')
+    parser.add_argument('--nant', type=int, default=117, help='number of antennas')
+    parser.add_argument('--nchan', type=int, default=6144, help='channels in the bandpass vector')
+    args = parser.parse_args()
+
+    payloads = ant_payloads(args.nant)
+    docs = [json.dumps(payload) for payload in payloads]
+
+    def strict(val):
+        raise ValueError
+
+    print('codec backend: {}, {} bytes per payload'.format(codec.get_backend(),
+                                                           len(docs[0])))
+    for strict_json in (True, False):
+        parse = strict if strict_json else None
+        results = [
+            ('encode', rate(lambda p: json.dumps(p, allow_nan=not strict_json), payloads, args.n),
+             rate(lambda p: codec.dumps(p, strict_json), payloads, args.n)),
+            ('decode', rate(lambda d: json.loads(d, parse_constant=parse), docs, args.n),
+             rate(lambda d: codec.loads(d, parse), docs, args.n)),
+        ]
+        print('strict_json={}'.format(strict_json))
+        for name, before, after in results:
+            print('  {}: json {:10.0f}/s  codec {:10.0f}/s  speedup {:.1f}x'.format(
+                name, before, after, after/before))
+
+    bandpass = np.random.default_rng(110).random((2, args.nchan))
+    value = {'gainamp': bandpass}
+    nloop = max(args.n//10, 1)
+    print('bandpass {} x {} float64'.format(*bandpass.shape))
+    for name, encode in [('json list', lambda v: codec.dumps({'gainamp': v['gainamp'].tolist()})),
+                         ('envelope', codec.pack_dict),
+                         ('envelope zlib', lambda v: codec.pack_dict(v, compress=True))]:
+        data = encode(value)
+        print('  {:13s}: {:8d} bytes  encode {:8.0f}/s  decode {:8.0f}/s'.format(
+            name, len(data), rate(encode, [value], nloop),
+            rate(codec.decode_payload, [data], nloop)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark DsaStore reads and writes against the in-process etcd.
+
+   Uses dsa_mem_etcd.MemEtcd with a simulated round trip time so the
+   store layer can be measured without a live etcd. Compares reading the
+   monitor payloads of all antennas key by key with get_many and
+   get_prefix_dicts, and writing them key by key with put_many.
+
+   Run from the top of the repo:
+
+    > python bench/bench_dsa_store.py --rtt 0.0005 --jitter 0.0001
+"""
+
+import argparse
+import time
+import dsautils.dsa_mem_etcd as dme
+import dsautils.dsa_store as ds
+
+
+def timed(func) -> float:
+    """Return seconds taken by func()."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter()-start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DsaStore throughput')
+    parser.add_argument('--nant', type=int, default=117, help='number of antennas')
+    parser.add_argument('--rtt', type=float, default=0.0005, help='round trip time in s')
+    parser.add_argument('--jitter', type=float, default=0.0001, help='round trip jitter in s')
+    args = parser.parse_args()
+
+    mem = dme.MemEtcd(rtt=args.rtt, jitter=args.jitter, seed=110)
+    store = ds.DsaStore(client=mem)
+    keys = ['/mon/ant/{}'.format(i) for i in range(1, args.nant+1)]
+    values = {key: {'ant_num': i, 'ant_el': 45.+i/10., 'brake_on': False}
+              for i, key in enumerate(keys)}
+
+    def put_each():
+        for key, value in values.items():
+            store.put_dict(key, value)
+
+    results = [('put_dict x{}'.format(args.nant), put_each),
+               ('put_many', lambda: store.put_many(values)),
+               ('get_dict x{}'.format(args.nant), lambda: [store.get_dict(key) for key in keys]),
+               ('get_many', lambda: store.get_many(keys)),
+               ('get_prefix_dicts', lambda: store.get_prefix_dicts('/mon/ant/'))]
+    print('rtt {:.2f} ms, jitter {:.2f} ms, {} antennas'.format(
+        args.rtt*1e3, args.jitter*1e3, args.nant))
+    for name, func in results:
+        trips = mem.round_trips
+        seconds = timed(func)
+        print('  {:18s}: {:8.2f} ms  {:4d} round trips'.format(
+            name, seconds*1e3, mem.round_trips-trips))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark DsaSyslogger message throughput.
+
+   Compares the current logger against the previous implementation, which
+   took a multiprocessing.Lock and called astropy Time.now() per message.
+   Both write to an in-memory stream so syslog speed does not matter.
+
+   Run from the top of the repo:
+
+    > python bench/bench_dsa_syslog.py
+"""
+
+import argparse
+import datetime
+import io
+import json
+import logging
+import time
+from multiprocessing import Lock
+from astropy.time import Time
+import dsautils.dsa_syslog as dsl
+
+
+class LegacySyslogger(dsl.DsaSyslogger):
+    """DsaSyslogger with the astropy timestamp and shared message dict.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mutex = Lock()
+
+    def info(self, event):
+        with self.mutex:
+            self.msg['level'] = "info"
+            d_utc = datetime.datetime.utcnow()
+            self.msg['time'] = d_utc.isoformat("T") + "Z"
+            self.msg['mjd'] = Time.now().mjd
+            self.msg['msg'] = event
+            self.log.info(json.dumps(self.msg))
+
+
+def rate(loggr: dsl.DsaSyslogger, nmsg: int) -> float:
+    """Return messages per second for nmsg calls to loggr.info.
+    """
+    loggr.function('rate')
+    start = time.perf_counter()
+    for i in range(nmsg):
+        loggr.info('benchmark message')
+    return nmsg/(time.perf_counter()-start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DsaSyslogger throughput')
+    parser.add_argument('-n', type=int, default=20000, help='messages per run')
+    args = parser.parse_args()
+
+    legacy = LegacySyslogger('dsa', 'bench', logging.INFO, 'bench_legacy',
+                             log_stream=io.StringIO())
+    current = dsl.DsaSyslogger('dsa', 'bench', logging.INFO, 'bench_current',
+                               log_stream=io.StringIO())
+    # warm up astropy (IERS tables) and structlog caches
+    rate(legacy, 100)
+    rate(current, 100)
+
+    before = rate(legacy, args.n)
+    after = rate(current, args.n)
+    print('before: {:10.0f} msg/s'.format(before))
+    print('after:  {:10.0f} msg/s'.format(after))
+    print('speedup: {:.1f}x'.format(after/before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark decoding of heimdall candidate messages.
+
+   Compares dada_h5pyfile.unpack_messages, which decodes a batch with one
+   np.frombuffer, against the previous per-field struct.unpack decoder.
+
+   Run from the top of the repo:
+
+    > python bench/bench_heimdall.py
+"""
+
+import argparse
+import struct
+import time
+import numpy as np
+import dsautils.dada_h5pyfile as dh
+
+
+def legacy_unpack_message(dat):
+    """unpack_message before the structured dtype.
+    """
+    first_idx = struct.unpack('Q', dat[0][:8])[0]
+    snr = struct.unpack('f', dat[0][8:12])[0]
+    samp_idx = struct.unpack('Q', dat[0][12:20])[0]
+    time_since = struct.unpack('f', dat[0][20:24])[0]
+    h_group_filter_inds = struct.unpack('Q', dat[0][24:32])[0]
+    h_group_dm_inds = struct.unpack('Q', dat[0][32:40])[0]
+    h_group_dms = struct.unpack('f', dat[0][40:44])[0]
+    h_group_members = struct.unpack('Q', dat[0][44:52])[0]
+    MJD = np.bytes_("%0.30f" % np.frombuffer(dat[0][52:68], dtype=np.float128)[0])
+    cand_MJD = struct.unpack('i', dat[0][68:72])[0]
+    cand_hour = struct.unpack('i', dat[0][72:76])[0]
+    cand_minute = struct.unpack('i', dat[0][76:80])[0]
+    cand_sec = np.bytes_("%0.30f" % np.frombuffer(dat[0][80:96], dtype=np.float128)[0])
+    return np.array(
+        [first_idx, snr, samp_idx, time_since, h_group_filter_inds, h_group_dm_inds, h_group_dms,
+         h_group_members, MJD, cand_MJD, cand_hour, cand_minute, cand_sec])
+
+
+def make_messages(ncand: int) -> list:
+    """Return ncand random candidate messages as (bytes, type) tuples.
+    """
+    cands = np.zeros(ncand, dtype=dh.HEIMDALL_CAND_DTYPE)
+    rng = np.random.default_rng(0)
+    cands['samp_idx'] = rng.integers(0, 200000, ncand)
+    cands['snr'] = rng.uniform(6, 50, ncand)
+    cands['h_group_dms'] = rng.uniform(0, 2000, ncand)
+    cands['MJD'] = 59400 + rng.uniform(0, 1, ncand)
+    return [(cand.tobytes(), 1) for cand in cands]
+
+
+def rate(func, messages: list, nrep: int) -> float:
+    """Return candidates per second decoded by func(messages).
+    """
+    start = time.perf_counter()
+    for i in range(nrep):
+        func(messages)
+    return nrep*len(messages)/(time.perf_counter()-start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Heimdall candidate decode rate')
+    parser.add_argument('-n', type=int, default=5000, help='candidates per batch')
+    parser.add_argument('--nrep', type=int, default=5, help='batches per run')
+    args = parser.parse_args()
+
+    messages = make_messages(args.n)
+    before = rate(lambda msgs: [legacy_unpack_message(dat) for dat in msgs],
+                  messages, args.nrep)
+    after = rate(dh.unpack_messages, messages, args.nrep)
+    print('before: {:12.0f} cand/s'.format(before))
+    print('after:  {:12.0f} cand/s'.format(after))
+    print('speedup: {:.0f}x'.format(after/before))
+
+
+if __name__ == '__main__':
+    main()
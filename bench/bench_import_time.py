@@ -0,0 +1,54 @@
+"""Benchmark import time of the console entry points.
+
+   Runs python -X importtime in a fresh interpreter for each entry point
+   in setup.py and reports the cumulative import time of dsautils.cli and
+   the slowest modules it pulls in. No service is contacted at import.
+
+   Run from the top of the repo:
+
+    > python bench/bench_import_time.py
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ['dsamon', 'dsacon', 'dsatm', 'dsacand']
+ATTRS = {'dsamon': 'mon', 'dsacon': 'con', 'dsatm': 'tm', 'dsacand': 'cand'}
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def importtime(entry_point: str) -> list:
+    """Return (module, cumulative us) for one import of the entry point.
+    """
+    code = 'from dsautils.cli import {0}'.format(ATTRS[entry_point])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules += [(match.group(4), int(match.group(2)))]
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entry point import time')
+    parser.add_argument('-n', type=int, default=5, help='runs per entry point')
+    parser.add_argument('--top', type=int, default=5, help='slowest modules to list')
+    args = parser.parse_args()
+
+    for entry_point in ENTRY_POINTS:
+        runs = [importtime(entry_point) for i in range(args.n)]
+        total = statistics.median(dict(run)['dsautils.cli'] for run in runs)
+        print('{0:8s} {1:8.1f} ms'.format(entry_point, total/1e3))
+    slowest = sorted(runs[-1], key=lambda mod: -mod[1])
+    slowest = [mod for mod in slowest if mod[0] != 'dsautils.cli'][:args.top]
+    for name, cumulative in slowest:
+        print('    {0:40s} {1:8.1f} ms'.format(name, cumulative/1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,8 @@ Dana Simard 06/2020
 Module for setting and decoding the status of the real-time calibration pipeline.
 """
 
+import numpy as np
+
 INV_ANTNUM = 1 << 0
 INV_POL = 1 << 1
 INV_GAINAMP_P1 = 1 << 2
@@ -57,6 +59,10 @@ error_dict = {'inv_antnum': INV_ANTNUM,
               'unknown_err': UNKNOWN_ERR,
               }
 
+# Error names and codes in bit order, for the array functions
+ERROR_NAMES = list(error_dict.keys())
+ERROR_CODES = np.array(list(error_dict.values()), dtype=np.uint32)
+
 
 def update(status, error):
     """Updates the status code to include a given error.
@@ -124,3 +130,103 @@ def is_error(status, error):
         True if the given error is encoded in status.
     """
     return status & error
+
+
+def decode_array(status):
+    """Decodes an array of calibration status codes.
+
+    Parameters
+    ----------
+    status : array_like of int
+        Status codes, of any shape.
+
+    Returns
+    -------
+    ndarray of bool
+        Array of shape ``status.shape + (len(ERROR_NAMES),)``, True where the
+        error named in `ERROR_NAMES` is set.
+    """
+    status = np.asarray(status, dtype=np.uint32)
+    return (status[..., np.newaxis] & ERROR_CODES) != 0
+
+
+def encode_array(errors):
+    """Encodes a boolean error matrix as status codes. Inverse of
+    `decode_array`.
+
+    Parameters
+    ----------
+    errors : array_like of bool
+        Array whose last axis has one entry per error in `ERROR_NAMES`.
+
+    Returns
+    -------
+    ndarray of uint32
+        The status codes, with the last axis of `errors` removed.
+    """
+    errors = np.asarray(errors, dtype=bool)
+    return np.bitwise_or.reduce(np.where(errors, ERROR_CODES, np.uint32(0)), axis=-1)
+
+
+def count_errors(status, axis=None):
+    """Counts how often each error is set in an array of status codes.
+
+    Parameters
+    ----------
+    status : array_like of int
+        Status codes, of any shape.
+    axis : int or tuple of int, optional
+        Axes of `status` to count over. Defaults to all of them.
+
+    Returns
+    -------
+    ndarray of int
+        Counts, with a last axis of one entry per error in `ERROR_NAMES`.
+    """
+    status = np.asarray(status, dtype=np.uint32)
+    if axis is None:
+        axis = tuple(range(status.ndim))
+    return decode_array(status).sum(axis=axis)
+
+
+def reduce_or(status, axis=None):
+    """Combines status codes so that an error is set if it is set in any of
+    them, e.g. over pols or over time.
+
+    Parameters
+    ----------
+    status : array_like of int
+        Status codes, of any shape.
+    axis : int or tuple of int, optional
+        Axes of `status` to combine. Defaults to all of them.
+
+    Returns
+    -------
+    ndarray of uint32 or uint32
+        The combined status codes.
+    """
+    status = np.asarray(status, dtype=np.uint32)
+    if axis is None:
+        axis = tuple(range(status.ndim))
+    return np.bitwise_or.reduce(status, axis=axis)
+
+
+def update_array(status, error):
+    """Updates an array of status codes to include the given errors.
+
+    Parameters
+    ----------
+    status : array_like of int
+        The current values of the status codes.
+    error : int, str, list of str or array_like of int
+        The error to add, as a code, a name or list of names as for `update`,
+        or an array of codes broadcastable against `status`.
+
+    Returns
+    -------
+    ndarray of uint32
+        The updated status codes.
+    """
+    if isinstance(error, (str, list)):
+        error = update(0, error)
+    return np.bitwise_or(np.asarray(status, dtype=np.uint32), np.asarray(error, dtype=np.uint32))
@@ -1,27 +1,16 @@
 import os.path
 import time
-from astropy.time import Time
-from astropy.coordinates import SkyCoord
-from astropy import units, table
-from numpy import median, where
 from collections import Counter
 import click
-from dsautils import dsa_store, coordinates
-from syshealth import status_mon
-from event import lookup, event, labels
 import dsautils.dsa_syslog as dsl
-from influxdb import DataFrameClient
-try:
-    from dsaT3 import T3_manager
-except ImportError:
-    print('dsaT3 not available')
+from dsautils.connections import get_store, get_influx
 
+# astropy, numpy, coordinates, syshealth, event and dsaT3 are imported in
+# the commands that use them so that every invocation does not pay for them.
 
 logger = dsl.DsaSyslogger()    
 logger.subsystem("software")
 logger.app("mnccli")
-de = dsa_store.DsaStore()
-influx = DataFrameClient('influxdbservice.pro.pvt', 8086, 'root', 'root', 'dsa110')
 
 ovro_longitude_deg = -118.2819
 ovro_latitude_deg = 37.2339
@@ -48,6 +37,10 @@ def radecel(mjd=None, localtime=None, utctime=None):
     The local time (with time zone) can be pasted into "localtime" argument to get values at that time.
     """
 
+    from astropy.time import Time
+    from astropy import units
+    from numpy import median
+
     if mjd is not None and localtime is None and utctime is None:
         tu = int(MS_PER_SECOND*Time(mjd, format='mjd').unix)
         tm = Time(mjd, format='mjd')
@@ -68,7 +61,7 @@ def radecel(mjd=None, localtime=None, utctime=None):
     query = f'SELECT time,ant_num,ant_el FROM "antmon" WHERE time >= {tu}ms and time < {tu+MS_PER_SECOND}ms'
     print(query)
     try:
-        result = influx.query(query)
+        result = get_influx().query(query)
 #        print(result['antmon'])
         med_ant_el = median(result['antmon']['ant_el'])
         ha = tm.sidereal_time("apparent", ovro_longitude_deg*units.deg)
@@ -91,6 +84,8 @@ def temperature(mjd=None, localtime=None, utctime=None):
     The local time (with time zone) can be pasted into "localtime" argument to get values at that time.
     """
 
+    from astropy.time import Time
+
     if mjd is not None and localtime is None and utctime is None:
         tu = int(MS_PER_SECOND*Time(mjd, format='mjd').unix)
         tm = Time(mjd, format='mjd')
@@ -110,7 +105,7 @@ def temperature(mjd=None, localtime=None, utctime=None):
 
     query = f'SELECT time,airtemp FROM "wxmon" WHERE time >= {tu}ms and time < {tu+30000}ms'
     try:
-        result = influx.query(query)
+        result = get_influx().query(query)
         temp = float(result['wxmon']['airtemp'])
         print(f'Temperature on {mjd}: {temp}C')
 
@@ -129,9 +124,12 @@ def check_oscillation(thresh_db, thresh_bins):
     thresh_db is number of db above mean defined as excess power. Default: 3db
     thresh_bins is number of sequential 10min time bins considered excess. Default: 18 (3 hrs)
     """
+
+    from numpy import where
+
     
     query = f'SELECT last(time),last(ant_num),mean(rf_pwr_a) as rfa, mean(rf_pwr_b) as rfb FROM "antmon" WHERE time >= now()-1d GROUP BY time(600s),ant_num'
-    result = influx.query(query)
+    result = get_influx().query(query)
 #    keys = list(result.keys())
 #    vals = list(result.values())
 #    ant_nums = [key[1][0][1] for key in keys]
@@ -165,7 +163,7 @@ def ant(antnum):
     """
 
     try:
-        vv = de.get_dict('/mon/ant/{0}'.format(antnum))
+        vv = get_store().get_dict('/mon/ant/{0}'.format(antnum))
         print(vv)
     except KeyDoesNotExistException:
         logger.warn("Antnum {0} not found".format(antnum))
@@ -178,7 +176,7 @@ def beb(antnum):
     """
 
     try:
-        vv = de.get_dict('/mon/beb/{0}'.format(antnum))
+        vv = get_store().get_dict('/mon/beb/{0}'.format(antnum))
         print(vv)
     except KeyDoesNotExistException:
         logger.warn("antnum {0} not found".format(antnum))
@@ -191,7 +189,7 @@ def snap(snapnum):
     """
     
     try:
-        vv = de.get_dict('/mon/snap/{0}'.format(snapnum))
+        vv = get_store().get_dict('/mon/snap/{0}'.format(snapnum))
         print(vv)
     except KeyDoesNotExistException:
         logger.warn("snapnum {0} not found".format(snapnum))
@@ -203,7 +201,7 @@ def getcal(antnum):
     """ Display antenna calibration state
     """
     
-    vv = de.get_dict('/mon/cal/{0}'.format(antnum))
+    vv = get_store().get_dict('/mon/cal/{0}'.format(antnum))
 
     print(vv)
 
@@ -219,10 +217,10 @@ def watch(subsystem, antnum, timeout):
 
     assert subsystem in ['ant', 'snap']
 
-    vv = de.get_dict('/cmd/{0}/{1}'.format(subsystem, antnum))
+    vv = get_store().get_dict('/cmd/{0}/{1}'.format(subsystem, antnum))
     print("Watching antenna {0} for command. Current commanded values: {1}".format(antnum, vv))
 
-    de.add_watch('/cmd/{0}/{1}'.format(subsystem, antnum), my_cb)
+    get_store().add_watch('/cmd/{0}/{1}'.format(subsystem, antnum), my_cb)
     t0 = time.time()
     if timeout is not None:
         while time.time() - t0 < timeout:
@@ -242,6 +240,9 @@ def get_status(mjd, verbose):
     If all metrics are good, then status is True.
     """
 
+    from astropy.time import Time
+    from syshealth import status_mon
+
     if mjd is None:
         mjd = Time.now().mjd
 
@@ -258,6 +259,9 @@ def run_status_loop(nsec, verbose):
     verbose=True will print status per test (e.g., max dm, etc.)
     """
 
+    from astropy.time import Time
+    from syshealth import status_mon
+
     while True:
         mjd = Time.now().mjd
         status, arr = status_mon.check_obs(mjd, t_window_sec=nsec)
@@ -300,16 +304,20 @@ def putcal(antnum, time, gainamp_a, gainamp_b, gainphase_a, gainphase_b, delay_a
           'status': status, 'calsource': calsource,
           'gaincaltime_offset': gaincaltime_offset,
           'delaycaltime_offset': delaycaltime_offset, 'sim': sim}
-    de.put_dict('/mon/cal/{0}'.format(antnum), dd)
+    get_store().put_dict('/mon/cal/{0}'.format(antnum), dd)
 
     
 @mon.command()
 def corr():
+    from astropy.time import Time
+
     now = Time.now().mjd
     print('capture_rate, drop_rate, drop_count, b0_full, b0_clear, b0_written, b0_read, last_seq:')
     ages = []  # hold mp age in seconds
-    for i in range(1,17):
-        h = de.get_dict('/mon/corr/'+str(i))
+    keys = ['/mon/corr/'+str(i) for i in range(1,17)]
+    hs = get_store().get_many(keys)
+    for key in keys:
+        h = hs[key]
         ages.append(24*3600*(now-float(h['time'])))
         print(h['capture_rate'], h['drop_rate'], h['drop_count'],
               h['b0_full'], h['b0_clear'], h['b0_written'], h['b0_read'],h['last_seq'])
@@ -331,7 +339,7 @@ def move(antnum, elev):
     """
 
     logger.info("Commanding ant {0} to move to {1}".format(antnum, elev))
-    de.put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "move", "val": elev})
+    get_store().put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "move", "val": elev})
 
 
 @con.command()
@@ -341,7 +349,7 @@ def halt(antnum):
     """
 
     logger.info("Commanding ant {0} to halt".format(antnum))
-    de.put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "halt"}) # test this
+    get_store().put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "halt"}) # test this
 
 
 @con.command()
@@ -354,7 +362,7 @@ def noise(antnum, ab, value):
 
     assert ab in ['a', 'b']
     logger.info("Commanding ant {0} noise {1} to {2}".format(antnum, ab, value))
-    de.put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "noise_{0}_on".format(ab), "val": value})
+    get_store().put_dict('/cmd/ant/{0}'.format(antnum),  {"cmd": "noise_{0}_on".format(ab), "val": value})
 
 
 @con.command()
@@ -378,21 +386,19 @@ def corr(command):
 
     if command.lower() == 'start':
         print("Starting search processes")
-        for i in range(17,21):
-            de.put_dict('/cmd/corr/'+str(i), {'cmd':'start', 'val':0})
+        get_store().put_many({'/cmd/corr/'+str(i): {'cmd':'start', 'val':0} for i in range(17,21)})
         time.sleep(5)
         print("Starting beamformer processes")
-        for i in range(1,17):
-            de.put_dict('/cmd/corr/'+str(i), {'cmd':'start', 'val':0})
+        get_store().put_many({'/cmd/corr/'+str(i): {'cmd':'start', 'val':0} for i in range(1,17)})
     elif command.lower() == 'stop':
         print("Stopping all nodes")
-        de.put_dict('/cmd/corr/0', {'cmd':'stop', 'val':0})
+        get_store().put_dict('/cmd/corr/0', {'cmd':'stop', 'val':0})
     elif command.lower() == 'set':
-        corr_dict = de.get_dict('/mon/corr/1')
+        corr_dict = get_store().get_dict('/mon/corr/1')
         if 'last_seq' in corr_dict:
             print("Setting counter for beamformer processes")
             counter = corr_dict['last_seq'] + 500000
-            de.put_dict('/cmd/corr/0', {'cmd':'utc_start', 'val':str(int(counter))})
+            get_store().put_dict('/cmd/corr/0', {'cmd':'utc_start', 'val':str(int(counter))})
         else:
             print("Could not find counter")
 
@@ -417,8 +423,8 @@ def trigger(name, beam):
 
 #    de.put_dict('/cmd/corr/0', {'cmd': 'trigger', 'val': str(itime)+'-'+name+'-'})
     scfac = 1
-    de.put_dict('/cmd/corr/%d'%kk, {'cmd':'inject','val':'%d-%s-%f-'%(beam, name, scfac)})
-    de.put_dict('/cmd/corr/%d'%(kk+2), {'cmd':'inject','val':'%d-%s-%f-'%(beam, name, scfac*0.68*35./47.)})
+    get_store().put_dict('/cmd/corr/%d'%kk, {'cmd':'inject','val':'%d-%s-%f-'%(beam, name, scfac)})
+    get_store().put_dict('/cmd/corr/%d'%(kk+2), {'cmd':'inject','val':'%d-%s-%f-'%(beam, name, scfac*0.68*35./47.)})
 
     print('Trigger sent with name '+name)
 
@@ -442,6 +448,8 @@ def label(candname, label):
     TODO: get full path to filename either from etcd key or from glob.
     """
 
+    from event import labels
+
     filename = f'{candname}.json'
     if label is not None:
         labels.set_label(candname, label, filename=filename)
@@ -459,6 +467,10 @@ def get_coord(mjd, ibeam):
     TODO: include arbitrary elevation
     """
 
+    from astropy.time import Time
+    from astropy.coordinates import SkyCoord
+    from dsautils import coordinates
+
     if mjd is not None:
         mjd = Time(mjd, format='mjd')
 
@@ -475,7 +487,7 @@ def send_injection(beam, templatefile):
     beamgroup = beam // 64
     nodenum = [17, 18, 19, 20][beamgroup]
     beam0 = beam - 64 * beamgroup + 1
-    de.put_dict(f'/cmd/corr/{nodenum}', {'cmd':'inject', 'val': f'{beam0}-{templatefile}-'})
+    get_store().put_dict(f'/cmd/corr/{nodenum}', {'cmd':'inject', 'val': f'{beam0}-{templatefile}-'})
 
 
 @cand.command()
@@ -522,6 +534,8 @@ def check_nvss(mjd, ibeam, radius):
     TODO: use local file instead of astroquery.
     """
 
+    from astropy import units
+
     from astroquery import ned
     ne = ned.Ned()
 
@@ -538,6 +552,8 @@ def check_pulsars(mjd, ibeam, radius):
     """ Search pulsar catalog for (RA, Dec) within radius in arcseconds.
     """
 
+    from event import lookup
+
     co = get_coord(mjd, ibeam)
     result = lookup.find_associations(co.ra.value, co.dec.value, atnf_radius=3.3*3600, mode='pulsar')
 #    ind_near = psrtools.match_pulsar(co.ra, co.dec, thresh_deg=radius/3600)
@@ -560,6 +576,9 @@ def check_CLU(mjd, ibeam, radius, clupath):
     Radius is defined in arcsec.
     """
 
+    from astropy import table
+    from astropy.coordinates import SkyCoord
+
     import numpy as np
 
     try:
@@ -652,6 +671,13 @@ def submit_T3(candname):
     Requires T3 json file in standard operations directory.
     """
 
+    from event import event
+    try:
+        from dsaT3 import T3_manager
+    except ImportError:
+        print('dsaT3 not available')
+        return
+
     fn = f"/dataz/dsa110/operations/T3/{candname}.json"
 
     if os.path.exists(fn):
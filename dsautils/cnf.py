@@ -24,7 +24,7 @@
 from typing import List
 import logging
 import etcd3
-import json
+import dsautils.codec as codec
 import dsautils.dsa_functions36 as df
 import dsautils.dsa_syslog as dsl
 from pkg_resources import Requirement, resource_filename
@@ -409,15 +409,17 @@ class Conf:
     """
 
     def __init__(self, endpoint_conf: "String" = ETCDCONF, cnf_conf: "String" = CNFCONF, use_etcd: "bool" = True,
-                 data: "dict"= DATA):
+                 data: "dict"= DATA, client=None):
         """C-tor
 
         :param endpoint_conf: Specify config file for Etcd endpoint.(Optional)
         :param cnf_conf: Specify config file for subsystem mapping.(Optional)
         :param use_etcd: Set to True to load config from etcd.
+        :param client: etcd3 client to use instead of connecting to the endpoint, e.g. dsa_mem_etcd.MemEtcd. (Optional)
         :type endpoint_conf: String
         :type cnf_conf: String
         :type use_etcd: Bool
+        :type client: etcd3.Etcd3Client
         """
 
         self.log = dsl.DsaSyslogger("dsa", "System", logging.INFO, "Conf")
@@ -425,11 +427,13 @@ class Conf:
         self.data = data
         self.watch_ids = []
         try:
-            etcd_config = df.read_yaml(endpoint_conf)
-            etcd_host, etcd_port = self._parse_endpoint(
-                etcd_config['endpoints'])
+            if client is None:
+                etcd_config = df.read_yaml(endpoint_conf)
+                etcd_host, etcd_port = self._parse_endpoint(
+                    etcd_config['endpoints'])
+                client = etcd3.client(host=etcd_host, port=etcd_port)
 
-            self.etcd = etcd3.client(host=etcd_host, port=etcd_port)
+            self.etcd = client
 
             try:
                 self.cnf_config = df.read_yaml(cnf_conf)
@@ -505,7 +509,7 @@ class Conf:
             # etcd returns a 2-tuple. We want the first element
             data = self.etcd.get(key)[0]
             try:
-                return json.loads(data.decode("utf-8"))
+                return codec.loads(data)
             except:
                 self.log.error('could not convert json to dictionary')
                 raise
@@ -586,7 +590,7 @@ class Conf:
         self.log.function('_parse_value')
         rtn = {}
         try:
-            rtn = json.loads(value)
+            rtn = codec.loads(value)
         except ValueError:
             # TODO: log to syslog
             self.log.error("JSON Decode Error. value= {}".format(value))
@@ -0,0 +1,233 @@
+"""JSON encoding and decoding of etcd payloads.
+
+   Uses orjson when it is installed and the standard library json module
+   otherwise. Results match json.dumps and json.loads: NaN, Infinity and
+   -Infinity raise ValueError when strict and are written and read as
+   those tokens when not. orjson cannot do this, so any payload it cannot
+   handle exactly is passed to the json module instead, including
+   documents that may hold integers wider than 64 bits, which orjson
+   reads as floats.
+
+   :example:
+
+    >>> from dsautils import codec
+    >>> codec.dumps({'ant_el': 45.})
+    '{"ant_el":45.0}'
+    >>> codec.loads(b'{"ant_el": NaN}', parse_constant=None)
+    {'ant_el': nan}
+    >>> codec.set_backend('json')  # force the standard library
+
+   Numpy arrays are stored in a binary envelope instead of JSON: a magic
+   string, a kind byte ('A' for an array, 'D' for a dictionary with array
+   fields), the length of a JSON header as a little-endian uint32, the
+   header with dtype, shape and compression, and the raw array bytes,
+   optionally zlib compressed. decode_payload reads both envelopes and
+   plain JSON.
+
+    >>> import numpy as np
+    >>> data = codec.pack_array(np.arange(2048.), compress=True)
+    >>> codec.decode_payload(data).shape
+    (2048,)
+"""
+
+import json
+import re
+import struct
+import zlib
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ('orjson', 'json') if orjson is not None else ('json',)
+if orjson is not None:
+    # leave datetimes and dataclasses to the json module, which rejects them
+    _DUMPS_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                      | orjson.OPT_PASSTHROUGH_DATACLASS)
+_backend = BACKENDS[0]
+# digit runs this long may be integers beyond the 64 bit range orjson reads
+# exactly
+_WIDE_INT = re.compile(r'\d{20,}')
+_WIDE_INT_BYTES = re.compile(rb'\d{20,}')
+
+
+def get_backend() -> str:
+    """Name of the library in use, 'orjson' or 'json'."""
+    return _backend
+
+
+def set_backend(name: str):
+    """Choose the library used by dumps and loads.
+
+    :param name: 'orjson' or 'json'.
+    :type name: str
+    :raise: ValueError if the library is not installed.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError('JSON backend {} is not available. Choose from {}'.format(name, BACKENDS))
+    _backend = name
+
+
+def dumps(value, strict_json: bool = True) -> str:
+    """Serialize value to JSON.
+
+    :param value: Data to serialize.
+    :param strict_json: Raise ValueError on NaN, +Infinity, -Infinity.
+    :type strict_json: bool
+    :return: JSON string.
+    :rtype: str
+    :raise: ValueError, TypeError
+    """
+    if _backend == 'orjson':
+        try:
+            out = orjson.dumps(value, option=_DUMPS_OPTIONS)
+        except TypeError:
+            # types only the json module handles, or that it rejects itself
+            out = None
+        # orjson writes NaN and +/-Infinity as null
+        if out is not None and b'null' not in out:
+            return out.decode('utf-8')
+    return json.dumps(value, allow_nan=not strict_json)
+
+
+def loads(value, parse_constant: "function" = None):
+    """Parse JSON.
+
+    :param value: JSON document.
+    :param parse_constant: Called with 'NaN', 'Infinity' or '-Infinity' if one is found. None accepts them as floats.
+    :type value: str or bytes
+    :type parse_constant: Function which takes a string.
+    :return: The decoded value.
+    :raise: ValueError
+    """
+    if _backend == 'orjson':
+        wide = _WIDE_INT if isinstance(value, str) else _WIDE_INT_BYTES
+        if wide.search(value) is None:
+            try:
+                return orjson.loads(value)
+            except orjson.JSONDecodeError:
+                # NaN and +/-Infinity, or input orjson is stricter about
+                pass
+    return json.loads(value, parse_constant=parse_constant)
+
+
+MAGIC = b'\x93DSA'
+_ARRAY = b'A'
+_DICT = b'D'
+_HEADER_LEN = struct.Struct('<I')
+
+
+def is_envelope(data: bytes) -> bool:
+    """True if data is a binary envelope made by pack_array or pack_dict."""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _array_header(arr: np.ndarray) -> dict:
+    if arr.dtype.hasobject:
+        raise ValueError('Arrays of Python objects cannot be stored')
+    return {'dtype': np.lib.format.dtype_to_descr(arr.dtype), 'shape': list(arr.shape)}
+
+
+def _header_dtype(header: dict) -> np.dtype:
+    descr = header['dtype']
+    # structured dtypes come back from JSON as lists of lists
+    if isinstance(descr, list):
+        descr = [tuple(field) for field in descr]
+    return np.lib.format.descr_to_dtype(descr)
+
+
+def _pack(kind: bytes, header: dict, body: bytes, compress: bool,
+          strict_json: bool = True) -> bytes:
+    if compress:
+        body = zlib.compress(body)
+    header['compression'] = 'zlib' if compress else None
+    header_json = dumps(header, strict_json).encode('utf-8')
+    return b''.join([MAGIC, kind, _HEADER_LEN.pack(len(header_json)), header_json, body])
+
+
+def pack_array(arr, compress: bool = False) -> bytes:
+    """Encode an array in a binary envelope.
+
+    :param arr: Array, or anything np.asarray accepts.
+    :param compress: zlib compress the array bytes.
+    :type compress: bool
+    :return: Envelope.
+    :rtype: bytes
+    :raise: ValueError for object arrays.
+    """
+    arr = np.asarray(arr)
+    return _pack(_ARRAY, _array_header(arr), np.ascontiguousarray(arr).tobytes(), compress)
+
+
+def pack_dict(value: dict, strict_json: bool = True, compress: bool = False) -> bytes:
+    """Encode a dictionary in a binary envelope. numpy array fields are
+    stored as binary and the other fields as JSON in the header.
+
+    :param value: Dictionary with string keys.
+    :param strict_json: Raise ValueError on NaN, +Infinity, -Infinity outside the arrays.
+    :param compress: zlib compress the array bytes.
+    :type value: dict
+    :type strict_json: bool
+    :type compress: bool
+    :return: Envelope.
+    :rtype: bytes
+    :raise: ValueError
+    """
+    fields = {}
+    arrays = {}
+    body = []
+    for name, field in value.items():
+        if isinstance(field, np.ndarray):
+            arrays[name] = _array_header(field)
+            body.append(np.ascontiguousarray(field).tobytes())
+        else:
+            fields[name] = field
+    return _pack(_DICT, {'fields': fields, 'arrays': arrays}, b''.join(body),
+                 compress, strict_json)
+
+
+def decode_payload(data, parse_constant: "function" = None):
+    """Decode a payload written by pack_array, pack_dict or dumps.
+
+    :param data: Payload as stored.
+    :param parse_constant: Called with 'NaN', 'Infinity' or '-Infinity' if one is found in JSON. None accepts them as floats.
+    :type data: bytes or str
+    :type parse_constant: Function which takes a string.
+    :return: numpy array for pack_array, dictionary with numpy array fields for pack_dict, else the JSON value.
+    :raise: ValueError
+    """
+    if isinstance(data, str) or not is_envelope(data):
+        return loads(data, parse_constant)
+
+    data = memoryview(data)
+    kind = bytes(data[len(MAGIC):len(MAGIC)+1])
+    start = len(MAGIC) + 1 + _HEADER_LEN.size
+    (header_len,) = _HEADER_LEN.unpack(data[len(MAGIC)+1:start])
+    header = loads(bytes(data[start:start+header_len]), parse_constant)
+    body = data[start+header_len:]
+    if header['compression'] == 'zlib':
+        body = zlib.decompress(body)
+    elif header['compression'] is not None:
+        raise ValueError('Unknown compression {}'.format(header['compression']))
+
+    if kind == _ARRAY:
+        return _unpack_array(header, body, 0)[0]
+    if kind == _DICT:
+        value = header['fields']
+        offset = 0
+        for name, array_header in header['arrays'].items():
+            value[name], offset = _unpack_array(array_header, body, offset)
+        return value
+    raise ValueError('Unknown envelope kind {}'.format(kind))
+
+
+def _unpack_array(header: dict, body, offset: int) -> tuple:
+    """Copy one array out of body at offset. Returns (array, next offset)."""
+    dtype = _header_dtype(header)
+    shape = tuple(header['shape'])
+    count = int(np.prod(shape, dtype=np.int64))
+    arr = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+    return arr.reshape(shape).copy(), offset + count*dtype.itemsize
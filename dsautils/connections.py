@@ -0,0 +1,79 @@
+"""Shared clients for etcd, the correlator configuration and InfluxDB.
+
+   Nothing connects at import time. Each accessor creates its client on
+   the first call and returns the same object afterwards, so command line
+   tools only pay for the services they use.
+
+   :example:
+
+    >>> from dsautils.connections import get_store, get_influx
+    >>> ant24 = get_store().get_dict('/mon/ant/24')
+    >>> result = get_influx().query('SELECT last(ant_el) FROM "antmon"')
+"""
+
+import threading
+
+INFLUX_HOST = 'influxdbservice.pro.pvt'
+INFLUX_PORT = 8086
+INFLUX_DB = 'dsa110'
+
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+
+def _get(name: str, factory: "Function") -> object:
+    """Return the client called name, creating it with factory if needed.
+    """
+    with _LOCK:
+        if name not in _CLIENTS:
+            _CLIENTS[name] = factory()
+        return _CLIENTS[name]
+
+
+def _make_store() -> "DsaStore":
+    from dsautils import dsa_store
+    return dsa_store.DsaStore()
+
+
+def _make_influx() -> "DataFrameClient":
+    from influxdb import DataFrameClient
+    return DataFrameClient(INFLUX_HOST, INFLUX_PORT, 'root', 'root', INFLUX_DB)
+
+
+def _make_corr_cnf() -> "Dictionary":
+    import dsautils.cnf as cnf
+    return cnf.Conf().get('corr')
+
+
+def get_store() -> "DsaStore":
+    """Return the shared DsaStore.
+    """
+    return _get('store', _make_store)
+
+
+def get_influx() -> "DataFrameClient":
+    """Return the shared InfluxDB DataFrameClient.
+    """
+    return _get('influx', _make_influx)
+
+
+def get_corr_cnf() -> "Dictionary":
+    """Return the correlator configuration, read from etcd once.
+    """
+    return _get('corr_cnf', _make_corr_cnf)
+
+
+def set_client(name: str, client: object):
+    """Replace a shared client, e.g. with a test double. Passing None
+    drops it so the next access creates a new one.
+
+    :param name: One of 'store', 'influx' or 'corr_cnf'.
+    :param client: The client to use or None.
+    :type name: String
+    :type client: object
+    """
+    with _LOCK:
+        if client is None:
+            _CLIENTS.pop(name, None)
+        else:
+            _CLIENTS[name] = client
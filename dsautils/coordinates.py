@@ -3,26 +3,21 @@
 
 import datetime
 import numpy as np
-from influxdb import DataFrameClient
 import pandas
 from astropy.time import Time
 import astropy.units as u
 from astropy.coordinates import SkyCoord, FK5, ICRS
 from astropy.wcs import WCS
+from etcd3.exceptions import Etcd3Exception
 import dsacalib.constants as ct
-from dsacalib.utils import Direction
-import dsautils.cnf as cnf
-from dsautils import dsa_store
-
-DS = dsa_store.DsaStore()
-CORR_CNF = cnf.Conf().get('corr')
-INFLUX = DataFrameClient(
-    'influxdbservice.pro.pvt',
-    8086,
-    'root',
-    'root',
-    'dsa110'
-)
+import dsautils.codec as codec
+from dsautils.connections import get_store, get_influx, get_corr_cnf
+
+# Number of InfluxQL statements sent per request by get_history.
+HISTORY_BATCH = 144
+# Synthesized beam grid used by get_pointing(s).
+NPIX = 1000
+BEAM_SEP = 1.*u.arcmin
 
 def get_elevation(tobs: Time = None, tol: float = 0.25) -> u.Quantity:
     """Get the pointing elevation now or at a time in the past.
@@ -38,17 +33,25 @@ def get_elevation(tobs: Time = None, tol: float = 0.25) -> u.Quantity:
         time_ms = int(tobs.unix*1000)
         query = ('SELECT ant_num, ant_el, ant_cmd_el, ant_el_err FROM "antmon" WHERE '
                  'time >= {0}ms and time < {1}ms'.format(time_ms-500, time_ms+500))
-        el_df = INFLUX.query(query)
+        el_df = get_influx().query(query)
         if 'antmon' in el_df:
             # Defaults to current value if no value in etcd
             el_df = el_df['antmon']
             el = np.median(el_df[np.abs(el_df['ant_el_err']) < 1.]['ant_cmd_el'])*u.deg
             return el
-    commanded_els = np.zeros(len(CORR_CNF['antenna_order']))
-    for idx, ant in CORR_CNF['antenna_order'].items():
+    antenna_order = get_corr_cnf()['antenna_order']
+    commanded_els = np.zeros(len(antenna_order))
+    # read every antenna in one range read but parse each payload on its
+    # own, so a bad payload only drops that antenna
+    try:
+        antmcs = {meta.key.decode('utf-8'): data
+                  for data, meta in get_store().get_etcd().get_prefix('/mon/ant/')}
+    except Etcd3Exception:
+        antmcs = {}
+    for idx, ant in antenna_order.items():
         idx = int(idx)
         try:
-            antmc = DS.get_dict('/mon/ant/{0}'.format(ant))
+            antmc = codec.decode_payload(antmcs['/mon/ant/{0}'.format(ant)])
             a1 = np.abs(antmc['ant_el'] - antmc['ant_cmd_el'])
         except:
             a1 = 2.*tol
@@ -93,30 +96,20 @@ def create_WCS(coords: SkyCoord, beam_sep: u.Quantity, npix: int) -> "wcs":
     w.wcs.ctype = ["RA---SIN", "DEC--SIN"]
     return w
 
-def get_pointing(ibeam: int = None, jbeam: int = None, obstime: Time = None, usecasa: bool = False) -> tuple:
-    """Get pointing of the primary beam or a synthesized beam.
+def _get_primary_pointing(obstime: Time = None, usecasa: bool = False) -> tuple:
+    """Get the ICRS pointing of the primary beam.
 
-    :param ibeam: The beam number of beam<256 (E-W beam). If not set, it will default to the centre of the primary beam (128).
-    :type ibeam: int
-    :param jbeam: The beam number of beam>=256 (N-S beam). If not set, it will default to a non-detection (position precision of primary beam width)
-    :type jbeam: int
     :param obstime: The time of the observation.  Defaults to now.
     :type obstime: astropy Time
-    :param usecasa: If true, uses CASA to calculate coordinates.  Otherwise, uses astropy. Defaults to astropy (faster, less precise).
+    :param usecasa: If true, uses CASA to calculate coordinates.  Otherwise, uses astropy.
     :type usecasa: bool
 
-    :return: (ra, dec) as astropy Quantities for the centre of the synthesized or primary beam.
+    :return: (pointing, obstime) with the pointing as an astropy SkyCoord.
     :rtype: tuple
     """
-    npix = 1000
-    beam_sep = 1.*u.arcmin
-
-    if ibeam is None:
-        ibeam = 127
-
     if obstime is None:
         obstime = Time(datetime.datetime.utcnow())
-        dec = DS.get_dict('/mon/array/dec')
+        dec = get_store().get_dict('/mon/array/dec')
         if dec:
             dec = dec['dec_deg']*u.deg
         else:
@@ -131,18 +124,83 @@ def get_pointing(ibeam: int = None, jbeam: int = None, obstime: Time = None, use
         pointing = pointing.transform_to(ICRS)
 
     else:
+        from dsacalib.utils import Direction
         pointing = Direction(
             'HADEC', 0., dec.to_value(u.rad), obstime=obstime.mjd)
         pointing = SkyCoord(*pointing.J2000(), unit='rad', frame=ICRS)
+    return pointing, obstime
+
+def get_pointing(ibeam: int = None, jbeam: int = None, obstime: Time = None, usecasa: bool = False) -> tuple:
+    """Get pointing of the primary beam or a synthesized beam.
+
+    :param ibeam: The beam number of beam<256 (E-W beam). If not set, it will default to the centre of the primary beam (128).
+    :type ibeam: int
+    :param jbeam: The beam number of beam>=256 (N-S beam). If not set, it will default to a non-detection (position precision of primary beam width)
+    :type jbeam: int
+    :param obstime: The time of the observation.  Defaults to now.
+    :type obstime: astropy Time
+    :param usecasa: If true, uses CASA to calculate coordinates.  Otherwise, uses astropy. Defaults to astropy (faster, less precise).
+    :type usecasa: bool
+
+    :return: (ra, dec) as astropy Quantities for the centre of the synthesized or primary beam.
+    :rtype: tuple
+    """
+    if ibeam is None:
+        ibeam = 127
 
+    pointing, obstime = _get_primary_pointing(obstime, usecasa)
     print(f'Primary beam pointing: {pointing}')
-    wcs_sky = create_WCS(pointing, beam_sep, npix)
+    wcs_sky = create_WCS(pointing, BEAM_SEP, NPIX)
     if jbeam is None:
-        beam_pointing = wcs_sky.pixel_to_world(npix//2+(127-ibeam), npix//2)
+        beam_pointing = wcs_sky.pixel_to_world(NPIX//2+(127-ibeam), NPIX//2)
     else:
-        beam_pointing = wcs_sky.pixel_to_world(npix//2+(127-ibeam), npix//2+(383-jbeam))  # centered on range from 256-512
+        beam_pointing = wcs_sky.pixel_to_world(NPIX//2+(127-ibeam), NPIX//2+(383-jbeam))  # centered on range from 256-512
     return beam_pointing.ra, beam_pointing.dec
 
+def get_pointings(ibeams: np.ndarray, jbeams: np.ndarray = None, obstimes: Time = None,
+                  usecasa: bool = False) -> tuple:
+    """Get pointings of many synthesized beams at once.
+
+    The primary beam pointing and WCS are computed once per unique obstime
+    and all beams sharing it are converted in one pixel_to_world call.
+
+    :param ibeams: Beam numbers of beams<256 (E-W beams).
+    :type ibeams: array-like of int
+    :param jbeams: Beam numbers of beams>=256 (N-S beams). If not set, uses the centre of the primary beam for all.
+    :type jbeams: array-like of int
+    :param obstimes: The time of each observation, or a single time for all beams.  Defaults to now.
+    :type obstimes: astropy Time
+    :param usecasa: If true, uses CASA to calculate coordinates.  Otherwise, uses astropy.
+    :type usecasa: bool
+
+    :return: (ra, dec) as numpy arrays in degrees, one entry per beam.
+    :rtype: tuple
+    """
+    ibeams = np.atleast_1d(np.asarray(ibeams))
+    xpix = NPIX//2+(127-ibeams)
+    if jbeams is None:
+        ypix = np.full(ibeams.shape, NPIX//2)
+    else:
+        ypix = NPIX//2+(383-np.broadcast_to(jbeams, ibeams.shape))  # centered on range from 256-512
+
+    ra = np.zeros(ibeams.shape)
+    dec = np.zeros(ibeams.shape)
+    if obstimes is None or obstimes.isscalar:
+        groups = [(obstimes, np.ones(ibeams.shape, dtype=bool))]
+    else:
+        obstimes = obstimes.ravel()
+        _, first, inverse = np.unique(obstimes.mjd, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(ibeams.shape)
+        groups = [(obstimes[first[idx]], inverse == idx) for idx in range(len(first))]
+
+    for obstime, sel in groups:
+        pointing, _ = _get_primary_pointing(obstime, usecasa)
+        wcs_sky = create_WCS(pointing, BEAM_SEP, NPIX)
+        beam_pointing = wcs_sky.pixel_to_world(xpix[sel], ypix[sel])
+        ra[sel] = beam_pointing.ra.deg
+        dec[sel] = beam_pointing.dec.deg
+    return ra, dec
+
 
 def get_galcoord(ra: float, dec: float) -> tuple:
     """Converts RA and dec to galactic coordinates.
@@ -159,9 +217,13 @@ def get_galcoord(ra: float, dec: float) -> tuple:
     galcoord = coord.galactic
     return galcoord.l.deg, galcoord.b.deg
 
-def get_history(tablename: str, keys: list, num_days: int = 30, tavg: int = 1000, selection: str = None) -> pandas.DataFrame:
+def get_history(tablename: str, keys: list, num_days: int = 30, tavg: int = 1000, selection: str = None,
+                obstime: Time = None) -> pandas.DataFrame:
     """Gets the history of a key in influxdb at 10 minute cadence.
 
+    The window queries are sent HISTORY_BATCH statements per request and the
+    median of each window is computed in one grouped pass.
+
     :param tablename: Name of the influxDB table.
     :type tablename: str
     :param keys: List of columns to extract from `tablename`.
@@ -172,26 +234,42 @@ def get_history(tablename: str, keys: list, num_days: int = 30, tavg: int = 1000
     :type tavg: int
     :param selection: An optional additional selection for querying the table.
     :type selection: str
+    :param obstime: The time of the most recent sample. Defaults to now.
+    :type obstime: astropy Time
 
-    :return: Pandas dataframe.
+    :return: Pandas dataframe, most recent sample first.
     """
-    obstime = Time(datetime.datetime.utcnow())
-    df = pandas.DataFrame()
-    for i in range(24*6*num_days):
-        time_ago = obstime-i*10*u.min
-        time_ago_ms = int(time_ago.unix*1000)
+    if obstime is None:
+        obstime = Time(datetime.datetime.utcnow())
+    times_ago = obstime-np.arange(24*6*num_days)*10*u.min
+    statements = []
+    for time_ago_ms in (times_ago.unix*1000).astype(int):
         query = f'SELECT {", ".join(keys)} FROM "{tablename}" WHERE time >= {time_ago_ms-tavg//2}ms and time < {time_ago_ms+tavg//2}ms'
         if selection is not None:
             query += f' and {selection}'
-        temp_df = INFLUX.query(query)
-        if tablename in temp_df:
-            temp_df = temp_df[tablename]
-            temp_df.reset_index(inplace=True, drop=True)
-            temp_dict = pandas.DataFrame.from_dict({'time': [time_ago.mjd]})
-            for key in keys:
-                temp_dict[key] = np.median(temp_df[key].astype(float))
-            df = pandas.concat([df, pandas.DataFrame.from_dict(temp_dict)])
-    df.reset_index(inplace=True, drop=True)
+        statements += [query]
+
+    frames = []
+    for start in range(0, len(statements), HISTORY_BATCH):
+        results = get_influx().query(';'.join(statements[start:start+HISTORY_BATCH]), method='POST')
+        # A single statement returns a dict instead of a list of dicts
+        if isinstance(results, dict):
+            results = [results]
+        for slot, temp_df in enumerate(results, start):
+            if tablename in temp_df:
+                temp_df = temp_df[tablename].reindex(columns=keys).astype(float)
+                temp_df['slot'] = slot
+                frames += [temp_df]
+    if not frames:
+        return pandas.DataFrame()
+
+    temp_df = pandas.concat(frames, ignore_index=True)
+    grouped = temp_df.groupby('slot')
+    # np.median returns nan if any sample is nan; keep that behaviour
+    medians = grouped[keys].median().mask(temp_df[keys].isna().groupby(temp_df['slot']).any())
+    df = pandas.DataFrame.from_dict({'time': times_ago[medians.index.values].mjd})
+    for key in keys:
+        df[key] = medians[key].values
     return df
 
 def get_elevation_history(num_days: int = 30, tol: float = 0.25) -> pandas.DataFrame:
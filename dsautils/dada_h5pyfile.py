@@ -1,37 +1,170 @@
-from psrdada import Reader
+import time
 import h5py
 import numpy as np
-import sysv_ipc
-import struct
+
+# Heimdall candidate record as sent over the SysV IPC message queue: 96
+# packed bytes, native byte order, with long doubles for the MJD and seconds.
+HEIMDALL_CAND_DTYPE = np.dtype([
+	('first_idx', np.uint64),
+	('snr', np.float32),
+	('samp_idx', np.uint64),
+	('time_since', np.float32),
+	('h_group_filter_inds', np.uint64),
+	('h_group_dm_inds', np.uint64),
+	('h_group_dms', np.float32),
+	('h_group_members', np.uint64),
+	('MJD', np.float128),
+	('cand_MJD', np.int32),
+	('cand_hour', np.int32),
+	('cand_minute', np.int32),
+	('cand_sec', np.float128)])
+
+# Row of the 'candidates' table written by CandidateWriter: the heimdall
+# record plus where its cutout starts in 'data' and how many samples it has.
+CAND_TABLE_DTYPE = np.dtype(HEIMDALL_CAND_DTYPE.descr + [
+	('offset', np.uint64),
+	('nsamp', np.uint64)])
+
+
+def unpack_messages(messages):
+	"""
+	Decodes a batch of candidate messages from heimdall, each a (bytes, type)
+	tuple as returned by sysv_ipc.MessageQueue.receive, into a record array
+	with dtype HEIMDALL_CAND_DTYPE using a single np.frombuffer.
+	"""
+	size = HEIMDALL_CAND_DTYPE.itemsize
+	return np.frombuffer(b''.join(dat[0][:size] for dat in messages),
+						 dtype=HEIMDALL_CAND_DTYPE)
 
 
 def unpack_message(dat):
 	"""
 	Takes candidate metadata sent via System V IPC message queue from 
-	heimdall and decodes it to be used in python.
+	heimdall and decodes it to be used in python. Returns one record of
+	HEIMDALL_CAND_DTYPE, which can be indexed by field name or position.
+	"""
+	return unpack_messages([dat])[0]
+
+
+class CandidateWriter:
 	"""
+	Appends candidate cutouts to one h5 file that stays open. Cutouts are
+	concatenated along time in the extendable (nchan, N) dataset 'data' and
+	each candidate is a row of the compound dataset 'candidates' giving its
+	heimdall record and the offset and nsamp of its cutout. Candidates are
+	buffered in memory and written when flush_bytes of cutouts are pending
+	or flush_interval seconds have passed since the last write. The
+	interval is checked by append and by flush_if_due, which a listener
+	calls while it waits so quiet periods do not hold candidates back.
+
+	:example:
+
+	>>> with CandidateWriter('candidates.h5', compression='lzf') as writer:
+	...     writer.append(dy_norm[:, s1:s2], cand)
+	"""
+
+	def __init__(self, filename, nchan=2048, dtype=np.uint16, flush_bytes=64*2**20,
+				 flush_interval=10., compression=None, chunk_samples=256):
+		"""
+		:param filename: Path of the h5 file, created or appended to.
+		:param nchan: Number of channels in each cutout.
+		:param dtype: Data type of the cutouts.
+		:param flush_bytes: Write once this many bytes of cutouts are pending.
+		:param flush_interval: Write once this many seconds pass since the last write.
+		:param compression: h5py compression filter, e.g. 'gzip' or 'lzf'. None for no compression.
+		:param chunk_samples: Number of time samples per chunk of 'data'.
+		"""
+		self.flush_bytes = flush_bytes
+		self.flush_interval = flush_interval
+		self._pending = []
+		self._pending_bytes = 0
+		self._last_flush = time.monotonic()
+		self.hf = h5py.File(filename, 'a')
+		if 'data' in self.hf:
+			self.data = self.hf['data']
+			self.table = self.hf['candidates']
+		else:
+			self.data = self.hf.create_dataset(
+				'data', shape=(nchan, 0), maxshape=(nchan, None), dtype=dtype,
+				chunks=(nchan, chunk_samples), compression=compression)
+			self.table = self.hf.create_dataset(
+				'candidates', shape=(0,), maxshape=(None,), dtype=CAND_TABLE_DTYPE,
+				chunks=(1024,), compression=compression)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return self.table.shape[0] + len(self._pending)
+
+	def append(self, data, cand):
+		"""
+		Queues one candidate, writing the queue out if a budget is exceeded.
 
-	first_idx = struct.unpack('Q', dat[0][:8])[0]
-	snr = struct.unpack('f', dat[0][8:12])[0]
-	samp_idx = struct.unpack('Q', dat[0][12:20])[0]
-	time_since = struct.unpack('f', dat[0][20:24])[0]
-	h_group_filter_inds = struct.unpack('Q', dat[0][24:32])[0]
-	h_group_dm_inds = struct.unpack('Q', dat[0][32:40])[0]
-	h_group_dms = struct.unpack('f', dat[0][40:44])[0]
-	h_group_members = struct.unpack('Q', dat[0][44:52])[0]
-	MJD = "%0.30f" % np.frombuffer(dat[0][52:68], dtype=np.float128)[0]
-	MJD = np.string_(MJD)
-	cand_MJD = struct.unpack('i', dat[0][68:72])[0]
-	cand_hour = struct.unpack('i', dat[0][72:76])[0]
-	cand_minute = struct.unpack('i', dat[0][76:80])[0]
-	cand_sec = "%0.30f" % np.frombuffer(dat[0][80:96], dtype=np.float128)[0]
-	cand_sec = np.string_(cand_sec)
-	metadata = np.array(
-		[first_idx, snr, samp_idx, time_since, h_group_filter_inds, h_group_dm_inds, h_group_dms,
-		 h_group_members, MJD, cand_MJD, cand_hour, cand_minute, cand_sec])
-	metadata[-1] = np.string_(metadata[-1])
-	metadata[-5] = np.string_(metadata[-5])
-	return metadata
+		:param data: Cutout of the dynamic spectrum, shape (nchan, nsamp).
+		:param cand: Candidate record with dtype HEIMDALL_CAND_DTYPE.
+		"""
+		data = np.array(data, dtype=self.data.dtype, copy=True)
+		self._pending.append((data, cand))
+		self._pending_bytes += data.nbytes
+		if self._pending_bytes >= self.flush_bytes:
+			self.flush()
+		else:
+			self.flush_if_due()
+
+	def flush_if_due(self):
+		"""
+		Writes queued candidates if flush_interval seconds have passed since
+		the last write.
+		"""
+		if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+			self.flush()
+
+	def flush(self):
+		"""
+		Writes all queued candidates with one resize of each dataset.
+		"""
+		self._last_flush = time.monotonic()
+		if not self._pending:
+			return
+		cands = np.array([cand for data, cand in self._pending], dtype=HEIMDALL_CAND_DTYPE)
+		rows = np.zeros(len(cands), dtype=CAND_TABLE_DTYPE)
+		for name in HEIMDALL_CAND_DTYPE.names:
+			rows[name] = cands[name]
+		rows['nsamp'] = [data.shape[1] for data, cand in self._pending]
+		start = self.data.shape[1]
+		rows['offset'] = start + np.cumsum(rows['nsamp']) - rows['nsamp']
+
+		stop = start + int(rows['nsamp'].sum())
+		self.data.resize(stop, axis=1)
+		self.data[:, start:stop] = np.concatenate([data for data, cand in self._pending], axis=1)
+		nrows = self.table.shape[0]
+		self.table.resize(nrows + len(rows), axis=0)
+		self.table[nrows:] = rows
+		self.hf.flush()
+		self._pending = []
+		self._pending_bytes = 0
+
+	def read(self, idx):
+		"""
+		Returns (cutout, record) for a written candidate.
+
+		:param idx: Row of the candidate in the 'candidates' table.
+		"""
+		row = self.table[idx]
+		return self.data[:, row['offset']:row['offset'] + row['nsamp']], row
+
+	def close(self):
+		"""
+		Writes any queued candidates and closes the file.
+		"""
+		if self.hf:
+			self.flush()
+			self.hf.close()
+			self.hf = None
 
 
 def read_buffer(reader):
@@ -54,47 +187,71 @@ def disp_delay(DM, dt, ftop, fbottom):
 	return 0.00415 / dt * DM * (fbottom ** -2 - ftop ** -2)
 
 
-key = sysv_ipc.ftok("/home/user/linux_64/heimdall_buffer/progfile",
-					65)  # key of message queue to listen to
-queue = sysv_ipc.MessageQueue(key)  # creates message queue
-for i in range(queue.current_messages):  # clears any lingering messages in the queue
-	queue.receive()
-reader = Reader(0xfada)  # defines a psrdada ring buffer to read
-count = 0
-n_candidates_remaining = 0
-dt = 6.5536e-5
-while reader.isConnected:  # as long as the reader is connected...
-	candidates = []
-	dat = queue.receive()
-	n_candidates_remaining = dat[1]
-	if n_candidates_remaining != 10000:
-		candidates.append(unpack_message(dat))
-	print("mesg type ", dat[1])
-	print(unpack_message(dat))
-	if n_candidates_remaining != 10000:
-		for i in range(n_candidates_remaining - 1):
-			print("receiving")
-			dat = queue.receive()
-			print("received")
-			candidates.append(unpack_message(dat))
-			print(unpack_message(dat))
-	print(1)
-	dy_norm = read_buffer(reader)
-	for i in range(len(
-			candidates)):  # for each candidate, calculate what part of data to save and put it
-		# in an h5 file
-		s1 = int(candidates[i][2]) - int(candidates[i][0]) - 1000
-		s1 = s1 * (s1 > 0)
-		s2 = min(s1 + int(disp_delay(float(candidates[i][6]), dt, 1.53, 1.28) + 1) + 2 ** int(
-			candidates[i][4]) + 1000, 200000)
-		save_cand = np.array([dy_norm[:, s1:s2], candidates[i]])
-		save_cand[1][-1] = np.string_(save_cand[1][-1])
-		save_cand[1][-5] = np.string_(save_cand[1][-5])
-		adict = dict(data=save_cand[0], metadata=save_cand[1])
-		with h5py.File('/home/user/candidates_train/candidates.h5', 'a') as hf:
-			grp = hf.create_group('candidate_%s_%s' % (int(candidates[i][2]), i))
-			for k, v in adict.items():
-				grp.create_dataset(k, data=v)
-		print("Saving candidate %s" % candidates[i][2])
-	count += 1
-reader.disconnect()  # disconnect from the buffer
+def receive(queue, writer, poll=0.1):
+	"""
+	Waits for the next message on a sysv_ipc queue, letting writer write out
+	buffered candidates whenever its flush_interval passes meanwhile.
+
+	:param queue: sysv_ipc.MessageQueue to read.
+	:param writer: CandidateWriter to flush.
+	:param poll: Seconds between checks of an empty queue.
+	"""
+	import sysv_ipc
+
+	while True:
+		try:
+			return queue.receive(block=False)
+		except sysv_ipc.BusyError:
+			writer.flush_if_due()
+			time.sleep(poll)
+
+
+def main():
+	"""
+	Listens for heimdall candidates and saves a dynamic spectrum cutout
+	around each to /home/user/candidates_train/candidates.h5 with a
+	CandidateWriter.
+	"""
+	from psrdada import Reader
+	import sysv_ipc
+
+	key = sysv_ipc.ftok("/home/user/linux_64/heimdall_buffer/progfile",
+						65)  # key of message queue to listen to
+	queue = sysv_ipc.MessageQueue(key)  # creates message queue
+	for i in range(queue.current_messages):  # clears any lingering messages in the queue
+		queue.receive()
+	reader = Reader(0xfada)  # defines a psrdada ring buffer to read
+	count = 0
+	n_candidates_remaining = 0
+	dt = 6.5536e-5
+	writer = CandidateWriter('/home/user/candidates_train/candidates.h5')
+	while reader.isConnected:  # as long as the reader is connected...
+		messages = []
+		dat = receive(queue, writer)
+		n_candidates_remaining = dat[1]
+		print("mesg type ", dat[1])
+		if n_candidates_remaining != 10000:
+			messages.append(dat)
+			for i in range(n_candidates_remaining - 1):
+				print("receiving")
+				messages.append(queue.receive())
+				print("received")
+		candidates = unpack_messages(messages)
+		for cand in candidates:
+			print(cand)
+		print(1)
+		dy_norm = read_buffer(reader)
+		for cand in candidates:  # for each candidate, calculate what part of data to save
+			s1 = int(cand['samp_idx']) - int(cand['first_idx']) - 1000
+			s1 = s1 * (s1 > 0)
+			s2 = min(s1 + int(disp_delay(float(cand['h_group_dms']), dt, 1.53, 1.28) + 1) + 2 ** int(
+				cand['h_group_filter_inds']) + 1000, 200000)
+			writer.append(dy_norm[:, s1:s2], cand)
+			print("Saving candidate %s" % cand['samp_idx'])
+		count += 1
+	writer.close()
+	reader.disconnect()  # disconnect from the buffer
+
+
+if __name__ == '__main__':
+	main()
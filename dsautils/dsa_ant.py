@@ -8,12 +8,20 @@
     >>> ant99.noise_a_on(True)
     >>> ant99.noise_b_on(True)
     >>> ant99.noise_ab_on(False)
+    >>>
+    >>> # Command several antennas in one etcd transaction, correcting
+    >>> # each for its el_offset from the cal configuration
+    >>> ants = ant.Ant([24, 25, 26])
+    >>> ants.move(60.1, apply_offset=True)
+    >>> ants.noise_a_on(True)
 """
 
 import sys
 import logging
 from pathlib import Path
+import numpy as np
 from pkg_resources import Requirement, resource_filename
+import dsautils.cnf as cnf
 import dsautils.dsa_store as ds
 import dsautils.dsa_syslog as dsl
 ETCDCONF = resource_filename(Requirement.parse("dsa110-pyutils"),
@@ -44,30 +52,65 @@ class Ant:
         self.my_store = ds.DsaStore(ETCDCONF)
         self.cmd_key_base = CMD_KEY_BASE
         self.mon_key_base = MON_KEY_BASE
+        self.el_offset = None
         self.log = dsl.DsaSyslogger('dsa', 'ant', logging.INFO, 'Ant')
         self.log.function('c-tor')
         self.log.info("Created Ant object")
 
     def _send(self, cmd):
-        """Private helper to send command dictionary to antenna.
+        """Private helper to send the same command dictionary to every
+        antenna in one transaction.
 
         :param cmd: Dictionary containing antenna command.
         :type cmd: Dictionary
         """
 
-        self.my_etcd.put_dict(self.key, cmd)
+        self._send_many([cmd]*len(self.ant_nums))
+
+    def _send_many(self, cmds):
+        """Private helper to send one command dictionary per antenna, in the
+        order of ant_nums, in one transaction.
+
+        :param cmds: Dictionaries containing antenna commands.
+        :type cmds: List of Dictionary
+        """
+
+        self.log.function('_send_many')
+        self.my_store.put_many({self.cmd_key_base + str(ant): cmd
+                                for ant, cmd in zip(self.ant_nums, cmds)})
+
+    def get_el_offsets(self):
+        """Return the elevation offset of each antenna in ant_nums, in
+        degrees, from the cal configuration. Antennas without an offset
+        get 0. The configuration is read once.
 
-    def move(self, el_in_deg):
+        :return: Offsets in the order of ant_nums.
+        :rtype: numpy.ndarray
+        """
+
+        if self.el_offset is None:
+            el_offset = cnf.Conf().get('cal')['el_offset']
+            # keys are strings when the configuration comes from etcd
+            self.el_offset = {int(ant): val for ant, val in el_offset.items()}
+        return np.array([self.el_offset.get(int(ant), 0.) for ant in self.ant_nums])
+
+    def move(self, el_in_deg, apply_offset=False):
         """Move antenna elevation.
 
-        :param el_in_deg: Elevation angle in degrees.
-        :type el_in_deg: Float
+        :param el_in_deg: Elevation angle in degrees, or one per antenna.
+        :param apply_offset: Correct each antenna for its el_offset in the cal configuration.
+        :type el_in_deg: Float or Array of Floats
+        :type apply_offset: Boolean
+        :raise: ValueError
         """
 
-        cmd = {}
-        cmd['cmd'] = 'move'
-        cmd['val'] = el_in_deg
-        self._send(cmd)
+        els = np.broadcast_to(np.asarray(el_in_deg, dtype=float), (len(self.ant_nums),))
+        if apply_offset:
+            if 0 in self.ant_nums:
+                raise ValueError('apply_offset needs antenna numbers, not 0 for all')
+            # commanded pointing = desired pointing - pointing offset
+            els = els - self.get_el_offsets()
+        self._send_many([{'cmd': 'move', 'val': float(el)} for el in els])
 
     def noise_a_on(self, onoff):
         """Turn noise A diode on or off.
@@ -93,33 +136,43 @@ class Ant:
         self._send(cmd)
 
     def noise_ab_on(self, onoff):
-        """Turn noise A,B diode on or off.
+        """Turn noise A,B diode on or off for every antenna.
 
         :param onoff: True for On. False for Off.
         :type onoff: Boolean
         """
+        # A and B are separate commands on the same key, and a transaction
+        # cannot put a key twice, so this is two transactions.
         self.noise_a_on(onoff)
         self.noise_b_on(onoff)
 
-    def add_watch(self, cb_func: "Callback Function", ant_num=0):
+    def add_watch(self, cb_func: "Callback Function", ant_num=0, executor=None):
         """Add a callback function for the specified key.
 
         The callback function must take a dictionary as its argument. The
         dictionary will represent payloads associated with an antenna.
         The call back must be made thread safe if passing in a list of
         antennas as it will likely be called at the same time for
-        different antennas. Default antenna number is 0 for all.
+        different antennas. Default antenna number is 0 for all. With an
+        executor the callbacks run on its workers, in order per antenna.
 
         :param cb_func: Callback function. Must take dictionary as argument.
         :param ant_num: Antenna number. 0 for all. Or a list of antenna numbers.
+        :param executor: Pool to run callbacks on. None for the watch thread.
         :type cb_func: Function(dictionary)
         :type ant_num: Integer or Array of integers
+        :type executor: dsautils.dsa_store.KeyOrderedExecutor
+        :return: Watch ids, one per antenna, for DsaStore.cancel.
+        :rtype: List
         """
         ant_cb_nums = []
         if isinstance(ant_num, list):
             ant_cb_nums = ant_num
+            # one etcd watch on the prefix serves every antenna in the list
+            self.my_store.enable_watch_mux(self.mon_key_base)
         else:
             ant_cb_nums.append(ant_num)
 
-        for ant in ant_cb_nums:
-            self.my_store.add_watch(self.mon_key_base + str(ant), cb_func)
+        return [self.my_store.add_watch(self.mon_key_base + str(ant), cb_func,
+                                        executor=executor)
+                for ant in ant_cb_nums]
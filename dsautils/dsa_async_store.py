@@ -0,0 +1,317 @@
+"""Asyncio client for the DSA110 etcd store.
+
+   AsyncDsaStore speaks the etcd v3 gRPC API through grpc.aio, so every
+   operation is awaitable and all of them, watches included, share one
+   connection without a thread per call. Values are JSON dictionaries with
+   the same strict handling of NaN, Infinity and -Infinity as DsaStore.
+
+   :example:
+
+    >>> import asyncio
+    >>> from dsautils.dsa_async_store import AsyncDsaStore
+    >>>
+    >>> async def main():
+    ...     async with AsyncDsaStore() as store:
+    ...         await store.put_dict('/cmd/ant/24', {'cmd': 'move', 'val': 45.})
+    ...         values = await asyncio.gather(*[store.get_dict('/mon/ant/{}'.format(i))
+    ...                                         for i in range(1, 118)])
+    ...         async with store.watch_prefix('/mon/ant/') as events:
+    ...             async for key, payload in events:
+    ...                 print(key, payload)
+    >>>
+    >>> asyncio.run(main())
+"""
+
+import asyncio
+import collections
+import logging
+import grpc
+from etcd3 import etcdrpc
+from etcd3.exceptions import Etcd3Exception, RevisionCompactedError
+from etcd3.utils import increment_last_byte, to_bytes
+import dsautils.codec as codec
+import dsautils.dsa_functions36 as df
+import dsautils.dsa_syslog as dsl
+from dsautils.dsa_store import etcdconf
+
+
+def _strict_json(val: str):
+    """Called by codec.loads for 'NaN', '-Infinity' or 'Infinity'."""
+    raise ValueError
+
+
+class AsyncDsaStore:
+    """Asyncio accessor to the ETCD service. The gRPC channel is opened on
+    first use inside the running event loop and closed by close() or on
+    leaving an async with block.
+
+    raise: grpc.aio.AioRpcError, FileNotFoundError
+    """
+
+    def __init__(self, endpoint_config: str = etcdconf, timeout: float = None):
+        """C-tor
+
+        :param endpoint_config: Specify config file for Etcd endpoint. (Optional)
+        :param timeout: Timeout in seconds of each get, put and delete. None for no timeout.
+        :type endpoint_config: String
+        :type timeout: float
+        """
+
+        self.log = dsl.DsaSyslogger("dsa", "System", logging.INFO, "dsaAsyncStore")
+        self.timeout = timeout
+        etcd_config = df.read_yaml(endpoint_config)
+        # like DsaStore, only the first endpoint is used
+        self.endpoint = etcd_config['endpoints'][0]
+        self._channel = None
+        self._kv = None
+        self._watch = None
+        self.log.function('c-tor')
+        self.log.info('AsyncDsaStore created')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _stubs(self):
+        if self._channel is None:
+            self._channel = grpc.aio.insecure_channel(self.endpoint)
+            self._kv = etcdrpc.KVStub(self._channel)
+            self._watch = etcdrpc.WatchStub(self._channel)
+        return self._kv, self._watch
+
+    async def close(self):
+        """Close the connection. Open watches end."""
+        if self._channel is not None:
+            await self._channel.close()
+            self._channel = None
+
+    def _parse_value(self, value: bytes, parse_func: object = 'default') -> "Dictionary":
+        parse_fun = _strict_json if parse_func == 'default' else parse_func
+        try:
+            return codec.decode_payload(value, parse_fun)
+        except ValueError:
+            self.log.error("JSON Decode Error. value= {}".format(value))
+            raise
+
+    async def put_dict(self, key: str, value: "Dictionary",
+                       strict_json: bool = True):
+        """Put a dictionary into Etcd under the specified key.
+
+        Raises ValueError exception on Nan, +Infinity, -Infinity.
+
+        :param key: Key name to place data under. (Ex. '/mon/snap/1')
+        :param value: Data to place into Etcd store.
+        :param strict_json: Default True. Strict JSON. Throw on NaN, +/-Infinity
+        :type key: String
+        :type value: Dictionary
+        :type strict_json: bool
+        """
+
+        self.log.function('put_dict')
+        try:
+            value_json = codec.dumps(value, strict_json)
+        except ValueError:
+            self.log.error('Could not serialize to json')
+            raise
+        kv, _ = self._stubs()
+        await kv.Put(etcdrpc.PutRequest(key=to_bytes(key), value=to_bytes(value_json)),
+                     timeout=self.timeout)
+
+    async def get_dict(self, key: str, parse_func: object = 'default') -> "Dictionary":
+        """Get data from Etcd store in the form of a dictionary for the
+        specified key.
+
+        :param key: Etcd key from which to read data.
+        :param parse_func: Set to None to allow NaN, Infinity and -Infinity
+        :type key: String (Ex. '/mont/snap/1')
+        :type parse_func: Function which takes a string.
+        :return: Dictionary, or None if the key does not exist.
+        :rtype: Dictionary
+        :raise: ValueError
+        """
+
+        self.log.function('get_dict')
+        kv, _ = self._stubs()
+        response = await kv.Range(etcdrpc.RangeRequest(key=to_bytes(key)),
+                                  timeout=self.timeout)
+        if not response.kvs:
+            self.log.warning('Nothing returned for key: {}'.format(key))
+            return None
+        return self._parse_value(response.kvs[0].value, parse_func)
+
+    async def get_prefix(self, prefix: str,
+                         parse_func: object = 'default') -> "Dictionary":
+        """Get data for every key starting with prefix in one range read.
+
+        :param prefix: Etcd key prefix from which to read data.
+        :param parse_func: Set to None to allow NaN, Infinity and -Infinity
+        :type prefix: String (Ex. '/mon/ant/')
+        :type parse_func: Function which takes a string.
+        :return: Dictionary of {key: dictionary}
+        :rtype: Dictionary
+        :raise: ValueError
+        """
+
+        self.log.function('get_prefix')
+        kv, _ = self._stubs()
+        prefix = to_bytes(prefix)
+        response = await kv.Range(etcdrpc.RangeRequest(key=prefix,
+                                                       range_end=increment_last_byte(prefix)),
+                                  timeout=self.timeout)
+        return {item.key.decode('utf-8'): self._parse_value(item.value, parse_func)
+                for item in response.kvs}
+
+    async def delete(self, key: str, prefix: bool = False) -> int:
+        """Delete the key, or every key starting with it if prefix is True.
+
+        :param key: The key name to delete.
+        :param prefix: Delete all keys with this prefix.
+        :type key: string
+        :type prefix: boolean
+        :return: Number of keys deleted.
+        :rtype: int
+        """
+
+        self.log.function('delete')
+        kv, _ = self._stubs()
+        key = to_bytes(key)
+        request = etcdrpc.DeleteRangeRequest(key=key)
+        if prefix:
+            request.range_end = increment_last_byte(key)
+        response = await kv.DeleteRange(request, timeout=self.timeout)
+        return response.deleted
+
+    def watch(self, key: str, parse_func: object = 'default',
+              start_revision: int = None) -> "AsyncWatch":
+        """Watch a key. Iterating yields the payload of each change as a
+        dictionary, or None when the key is deleted.
+
+        :param key: Key to watch.
+        :param parse_func: Set to None to allow NaN, -Infinity, Infinity
+        :param start_revision: Revision to replay changes from. None for new changes only.
+        :type key: String
+        :type parse_func: Function which takes a string.
+        :type start_revision: int
+        :rtype: AsyncWatch
+        """
+
+        return AsyncWatch(self, key, False, parse_func, start_revision)
+
+    def watch_prefix(self, prefix: str, parse_func: object = 'default',
+                     start_revision: int = None) -> "AsyncWatch":
+        """Watch every key starting with prefix. Iterating yields
+        (key, payload) tuples, with payload None when the key is deleted.
+
+        :param prefix: Key prefix to watch.
+        :param parse_func: Set to None to allow NaN, -Infinity, Infinity
+        :param start_revision: Revision to replay changes from. None for new changes only.
+        :type prefix: String
+        :type parse_func: Function which takes a string.
+        :type start_revision: int
+        :rtype: AsyncWatch
+        """
+
+        return AsyncWatch(self, prefix, True, parse_func, start_revision)
+
+
+class AsyncWatch:
+    """Async iterator over the changes to a key or prefix, made by
+    AsyncDsaStore.watch and watch_prefix. Each watch is one gRPC stream on
+    the store's connection. The stream is read only when the consumer asks
+    for the next event, so a slow consumer holds events back at the server
+    through gRPC flow control instead of buffering them here.
+
+    Starting the watch waits for the server to register it. A watch whose
+    start_revision has been compacted raises
+    etcd3.exceptions.RevisionCompactedError, and one canceled by the
+    server for another reason raises etcd3.exceptions.Etcd3Exception;
+    cancel() ends iteration quietly.
+    """
+
+    def __init__(self, store: AsyncDsaStore, key: str, prefix: bool,
+                 parse_func: object, start_revision: int):
+        self.store = store
+        self.key = key
+        self.prefix = prefix
+        self.parse_func = parse_func
+        self.start_revision = start_revision
+        self.revision = None
+        self._call = None
+        self._cancelled = False
+        self._events = collections.deque()
+
+    async def __aenter__(self):
+        await self._start()
+        return self
+
+    async def __aexit__(self, *args):
+        self.cancel()
+
+    def __aiter__(self):
+        return self
+
+    async def _start(self):
+        _, watch = self.store._stubs()
+        key = to_bytes(self.key)
+        create = etcdrpc.WatchCreateRequest(key=key)
+        if self.prefix:
+            create.range_end = increment_last_byte(key)
+        if self.start_revision is not None:
+            create.start_revision = self.start_revision
+        self._call = watch.Watch()
+        await self._call.write(etcdrpc.WatchRequest(create_request=create))
+        # like etcd3's watcher, wait until the server has registered the
+        # watch so changes made after this returns are not missed
+        while True:
+            response = await self._call.read()
+            if response is grpc.aio.EOF:
+                self.cancel()
+                raise Etcd3Exception('Watch stream closed before the watch was created')
+            self._check_canceled(response)
+            self._events.extend(response.events)
+            if response.created:
+                return
+
+    def _check_canceled(self, response):
+        """Raise if the server canceled the watch."""
+        if not response.canceled:
+            return
+        self.cancel()
+        if response.compact_revision:
+            raise RevisionCompactedError(response.compact_revision)
+        raise Etcd3Exception('Watch canceled by server: {}'.format(response.cancel_reason))
+
+    async def __anext__(self):
+        if self._cancelled:
+            raise StopAsyncIteration
+        if self._call is None:
+            await self._start()
+        while not self._events:
+            try:
+                response = await self._call.read()
+            except asyncio.CancelledError:
+                if not self._cancelled:
+                    raise
+                raise StopAsyncIteration
+            if response is grpc.aio.EOF:
+                self.cancel()
+                raise StopAsyncIteration
+            self._check_canceled(response)
+            self._events.extend(response.events)
+        event = self._events.popleft()
+        self.revision = event.kv.mod_revision
+        if event.type == etcdrpc.kv_pb2.Event.DELETE:
+            payload = None
+        else:
+            payload = self.store._parse_value(event.kv.value, self.parse_func)
+        if self.prefix:
+            return event.kv.key.decode('utf-8'), payload
+        return payload
+
+    def cancel(self):
+        """End the watch. Iteration stops."""
+        self._cancelled = True
+        if self._call is not None:
+            self._call.cancel()
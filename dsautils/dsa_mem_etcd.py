@@ -0,0 +1,311 @@
+"""In-process stand-in for the etcd3 client used by DsaStore and Conf.
+
+   Implements the subset of etcd3.Etcd3Client that this package calls:
+   get, put, delete, prefix/range reads, transactions, watches and
+   revisions. Responses are built from the same protobuf messages the
+   real client returns, so code under test cannot tell the difference.
+   As in etcd, each put, delete or transaction that changes the keyspace
+   advances the revision by one. A round trip time and jitter can be
+   injected to measure store performance without a live etcd, and every
+   simulated round trip is counted in round_trips.
+
+   :example:
+
+    >>> import dsautils.dsa_store as ds
+    >>> import dsautils.dsa_mem_etcd as dme
+    >>> mem = dme.MemEtcd(rtt=0.0005, jitter=0.0001)
+    >>> my_ds = ds.DsaStore(client=mem)
+    >>> my_ds.put_dict('/test/1', {"a": 5.4})
+    >>> my_ds.get_dict('/test/1')
+    {'a': 5.4}
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+import etcd3.etcdrpc as etcdrpc
+from etcd3.etcdrpc import kv_pb2
+from etcd3 import events, transactions, utils
+from etcd3.client import KVMetadata, Transactions
+from etcd3.watch import WatchResponse
+
+_log = logging.getLogger(__name__)
+
+
+class MemEtcd:
+    """In-memory etcd keyspace with revisions, watches and latency injection.
+    """
+
+    def __init__(self, rtt: float = 0.0, jitter: float = 0.0,
+                 seed: int = None):
+        """C-tor
+
+        :param rtt: Simulated round trip time per RPC in seconds.
+        :param jitter: Standard deviation of the round trip time in seconds.
+        :param seed: Seed for the jitter random number generator.
+        :type rtt: float
+        :type jitter: float
+        :type seed: int
+        """
+
+        self.rtt = rtt
+        self.jitter = jitter
+        self.transactions = Transactions()
+        self._rng = random.Random(seed)
+        self.round_trips = 0
+        self._lock = threading.RLock()
+        self._kvs = {}
+        self._revision = 1
+        self._watches = {}
+        self._watch_id = 0
+        self._events = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch,
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def _round_trip(self):
+        """Sleep for one simulated round trip.
+        """
+        self.round_trips += 1
+        if self.rtt > 0. or self.jitter > 0.:
+            time.sleep(max(0., self._rng.gauss(self.rtt, self.jitter)))
+
+    def _header(self) -> "etcdrpc.ResponseHeader":
+        return etcdrpc.ResponseHeader(revision=self._revision)
+
+    def _range(self, key: bytes, range_end: bytes = None) -> "List":
+        """Return the KeyValue messages in [key, range_end), sorted by key.
+        """
+        if range_end is None:
+            kv = self._kvs.get(key)
+            return [] if kv is None else [kv]
+        return [self._kvs[k] for k in sorted(self._kvs)
+                if key <= k and (range_end == b'\0' or k < range_end)]
+
+    def _range_response(self, key, range_end=None) -> "etcdrpc.RangeResponse":
+        key = utils.to_bytes(key)
+        if range_end is not None:
+            range_end = utils.to_bytes(range_end)
+        kvs = self._range(key, range_end)
+        return etcdrpc.RangeResponse(header=self._header(), kvs=kvs,
+                                     count=len(kvs))
+
+    def _put(self, key, value, revision: int = None) -> "List":
+        """Write key at revision, or at a new revision if None."""
+        key = utils.to_bytes(key)
+        if revision is None:
+            self._revision += 1
+            revision = self._revision
+        prev = self._kvs.get(key)
+        kv = kv_pb2.KeyValue(
+            key=key, value=utils.to_bytes(value),
+            create_revision=prev.create_revision if prev else revision,
+            mod_revision=revision,
+            version=prev.version+1 if prev else 1)
+        self._kvs[key] = kv
+        return [kv_pb2.Event(type=kv_pb2.Event.PUT, kv=kv)]
+
+    def _delete(self, key, range_end=None, revision: int = None) -> "List":
+        """Delete keys at revision, or at a new revision if None."""
+        key = utils.to_bytes(key)
+        if range_end is not None:
+            range_end = utils.to_bytes(range_end)
+        deleted = self._range(key, range_end)
+        if not deleted:
+            return []
+        if revision is None:
+            self._revision += 1
+            revision = self._revision
+        evs = []
+        for kv in deleted:
+            del self._kvs[kv.key]
+            evs.append(kv_pb2.Event(
+                type=kv_pb2.Event.DELETE,
+                kv=kv_pb2.KeyValue(key=kv.key, mod_revision=revision)))
+        return evs
+
+    def _compare(self, cmp: "transactions.BaseCompare") -> bool:
+        kv = self._kvs.get(utils.to_bytes(cmp.key))
+        if isinstance(cmp, transactions.Value):
+            actual, target = (kv.value if kv else None), utils.to_bytes(cmp.value)
+        elif isinstance(cmp, transactions.Version):
+            actual, target = (kv.version if kv else 0), int(cmp.value)
+        elif isinstance(cmp, transactions.Create):
+            actual, target = (kv.create_revision if kv else 0), int(cmp.value)
+        elif isinstance(cmp, transactions.Mod):
+            actual, target = (kv.mod_revision if kv else 0), int(cmp.value)
+        else:
+            raise ValueError('Unknown compare {}'.format(cmp))
+        if actual is None:
+            return cmp.op == etcdrpc.Compare.NOT_EQUAL
+        return {etcdrpc.Compare.EQUAL: actual == target,
+                etcdrpc.Compare.NOT_EQUAL: actual != target,
+                etcdrpc.Compare.LESS: actual < target,
+                etcdrpc.Compare.GREATER: actual > target}[cmp.op]
+
+    def _notify(self, evs: "List", watch_id: int = None):
+        """Queue events for the watch dispatcher thread.
+        """
+        if evs:
+            self._events.put((self._header(), evs, watch_id))
+
+    def _dispatch(self):
+        """Deliver events to matching watches, like the etcd3 watch thread.
+        """
+        while True:
+            header, evs, watch_id = self._events.get()
+            with self._lock:
+                watches = list(self._watches.items())
+            for wid, (key, range_end, first_live, callback) in watches:
+                if watch_id is not None and wid != watch_id:
+                    continue
+                # a replay for one watch is already filtered; other events
+                # are only new to watches created before they happened
+                matched = [events.new_event(ev) for ev in evs
+                           if (watch_id is not None or ev.kv.mod_revision >= first_live) and
+                           (ev.kv.key == key if range_end is None else
+                            key <= ev.kv.key < range_end)]
+                if matched:
+                    try:
+                        callback(WatchResponse(header, matched))
+                    except Exception:
+                        # etcd3 logs callback failures in _safe_callback
+                        _log.exception('Watch callback failed')
+
+    def get_revision(self) -> int:
+        """Return the current revision of the keyspace.
+        """
+        return self._revision
+
+    def get(self, key, **kwargs) -> "Tuple":
+        self._round_trip()
+        with self._lock:
+            response = self._range_response(key)
+        if response.count < 1:
+            return None, None
+        kv = response.kvs[0]
+        return kv.value, KVMetadata(kv, response.header)
+
+    def get_prefix_response(self, key_prefix, **kwargs) -> "etcdrpc.RangeResponse":
+        self._round_trip()
+        with self._lock:
+            return self._range_response(
+                key_prefix,
+                utils.increment_last_byte(utils.to_bytes(key_prefix)))
+
+    def get_prefix(self, key_prefix, **kwargs) -> "Generator":
+        response = self.get_prefix_response(key_prefix, **kwargs)
+        return ((kv.value, KVMetadata(kv, response.header))
+                for kv in response.kvs)
+
+    def get_range(self, range_start, range_end, **kwargs) -> "Generator":
+        self._round_trip()
+        with self._lock:
+            response = self._range_response(range_start, range_end)
+        return ((kv.value, KVMetadata(kv, response.header))
+                for kv in response.kvs)
+
+    def get_all(self, **kwargs) -> "Generator":
+        return self.get_range(b'\0', b'\0')
+
+    def put(self, key, value, lease=None, prev_kv=False) -> "etcdrpc.PutResponse":
+        self._round_trip()
+        with self._lock:
+            prev = self._kvs.get(utils.to_bytes(key))
+            self._notify(self._put(key, value))
+            response = etcdrpc.PutResponse(header=self._header())
+            if prev_kv and prev is not None:
+                response.prev_kv.CopyFrom(prev)
+        return response
+
+    def delete(self, key, prev_kv=False, return_response=False):
+        self._round_trip()
+        with self._lock:
+            evs = self._delete(key)
+            self._notify(evs)
+            response = etcdrpc.DeleteRangeResponse(header=self._header(),
+                                                   deleted=len(evs))
+        if return_response:
+            return response
+        return response.deleted >= 1
+
+    def delete_prefix(self, prefix) -> "etcdrpc.DeleteRangeResponse":
+        self._round_trip()
+        with self._lock:
+            evs = self._delete(prefix, utils.increment_last_byte(
+                utils.to_bytes(prefix)))
+            self._notify(evs)
+            return etcdrpc.DeleteRangeResponse(header=self._header(),
+                                               deleted=len(evs))
+
+    def transaction(self, compare, success=None, failure=None) -> "Tuple":
+        self._round_trip()
+        with self._lock:
+            succeeded = all(self._compare(c) for c in compare)
+            ops = (success if succeeded else failure) or []
+            # all writes of a transaction share one revision, which only
+            # counts if something changed
+            revision = self._revision + 1
+            evs = []
+            responses = []
+            for op in ops:
+                if isinstance(op, transactions.Put):
+                    evs += self._put(op.key, op.value, revision)
+                    responses.append(etcdrpc.ResponseOp(
+                        response_put=etcdrpc.PutResponse(header=self._header())))
+                elif isinstance(op, transactions.Get):
+                    response = self._range_response(op.key, op.range_end)
+                    responses.append([(kv.value, KVMetadata(kv, response.header))
+                                      for kv in response.kvs])
+                elif isinstance(op, transactions.Delete):
+                    deleted = self._delete(op.key, op.range_end, revision)
+                    evs += deleted
+                    responses.append(etcdrpc.ResponseOp(
+                        response_delete_range=etcdrpc.DeleteRangeResponse(
+                            header=self._header(), deleted=len(deleted))))
+                else:
+                    raise Exception(
+                        'Unknown request class {}'.format(op.__class__))
+            if evs:
+                self._revision = revision
+            self._notify(evs)
+        return succeeded, responses
+
+    def add_watch_callback(self, key, callback, range_end=None,
+                           start_revision=None, **kwargs) -> int:
+        """Call callback with a WatchResponse for each change to key, or
+        to [key, range_end). With start_revision, the current values of
+        keys modified at or after it are replayed first; unlike etcd
+        there is no history, so earlier values and deletes are not.
+        """
+        self._round_trip()
+        key = utils.to_bytes(key)
+        if range_end is not None:
+            range_end = utils.to_bytes(range_end)
+        with self._lock:
+            self._watch_id += 1
+            # changes up to the current revision reach the watch only
+            # through the replay, so none is delivered twice
+            self._watches[self._watch_id] = (
+                key, range_end, self._revision+1, callback)
+            if start_revision is not None:
+                replay = [kv_pb2.Event(type=kv_pb2.Event.PUT, kv=kv)
+                          for kv in self._range(key, range_end)
+                          if kv.mod_revision >= start_revision]
+                self._notify(replay, self._watch_id)
+            return self._watch_id
+
+    def add_watch_prefix_callback(self, key_prefix, callback, **kwargs) -> int:
+        kwargs['range_end'] = utils.increment_last_byte(
+            utils.to_bytes(key_prefix))
+        return self.add_watch_callback(key_prefix, callback, **kwargs)
+
+    def cancel_watch(self, watch_id: int):
+        with self._lock:
+            self._watches.pop(watch_id, None)
+
+    def close(self):
+        with self._lock:
+            self._watches.clear()
@@ -18,26 +18,270 @@
     >>> print("vv: ", vv)
     >>> print("vv['time']: ", vv['time'])
     >>>
+    >>> # Get monitor data for all antennas in one round trip
+    >>> all_ants = my_ds.get_prefix_dicts('/mon/ant/')
+    >>> print("ant 24: ", all_ants['/mon/ant/24'])
+    >>> corrs = my_ds.get_many(['/mon/corr/1', '/mon/corr/2'])
+    >>>
+    >>> # put several keys in one transaction
+    >>> my_ds.put_many({'/cmd/corr/1': {'cmd': 'start', 'val': 0},
+    >>>                 '/cmd/corr/2': {'cmd': 'start', 'val': 0}})
+    >>>
+    >>> # numpy arrays are stored as binary, not JSON lists
+    >>> my_ds.put_array('/mon/bandpass/24', np.ones((2, 6144)), compress=True)
+    >>> bandpass = my_ds.get_array('/mon/bandpass/24')
+    >>> my_ds.put_dict_arrays('/mon/cal/24', {'time': 59000.5, 'gainamp': np.ones(2)})
+    >>> cal = my_ds.get_dict('/mon/cal/24')  # cal['gainamp'] is an array
+    >>>
+    >>> # serve reads of /mon/array/ keys from a watch-backed cache
+    >>> my_ds.enable_cache('/mon/array/')
+    >>> dec = my_ds.get_dict('/mon/array/dec')
+    >>> dec = my_ds.get_dict('/mon/array/dec', max_age=5.0)
+    >>> rev = my_ds.get_cache_revision()
+    >>>
     >>> # register a call back function on key: '/mon/ant/24'
     >>>
     >>> def my_cb(event: "Dictionary"):
     >>>     print(event)
     >>> # watch_id can be used to cancel watch with cancel() command.
     >>> watch_id = my_ds.add_watch('/mon/ant/24', my_cb)
+    >>>
+    >>> # share one etcd watch between all keys under /mon/ant/
+    >>> my_ds.enable_watch_mux('/mon/ant/')
+    >>> watch_ids = [my_ds.add_watch('/mon/ant/{}'.format(i), my_cb) for i in range(1, 65)]
+    >>> my_ds.cancel(watch_ids[0])
+    >>>
+    >>> # deliver only the latest value, at most twice a second
+    >>> watch_id = my_ds.add_watch('/mon/ant/24', my_cb, max_rate=2.)
+    >>> print(my_ds.get_watch_stats(watch_id))
+    >>>
+    >>> # run slow callbacks on a pool, in order per key
+    >>> pool = KeyOrderedExecutor(max_workers=8)
+    >>> watch_id = my_ds.add_watch_prefix('/mon/ant/', my_cb, executor=pool)
+    >>> print(pool.stats())
     >>> while True
     >>>    time.sleep(1)
 """
 
 from typing import List
 import logging
+import collections
+import threading
+import time
 import etcd3
-import json
+import etcd3.events
+import numpy as np
+import dsautils.codec as codec
 import dsautils.dsa_functions36 as df
 import dsautils.dsa_syslog as dsl
 from pkg_resources import Requirement, resource_filename
 
 etcdconf = resource_filename(Requirement.parse("dsa110-pyutils"), "dsautils/conf/etcdConfig.yml")
 
+# tracebacks of failed callbacks, as etcd3 logs them for its own watches
+_log = logging.getLogger(__name__)
+
+# etcd rejects transactions with more operations than --max-txn-ops.
+MAX_TXN_OPS = 128
+
+
+class CoalescingDelivery:
+    """Watch event sink that keeps only the latest event per key and hands
+    them to deliver from a background thread at most max_rate times a
+    second per key. Events replaced before delivery are counted as
+    coalesced and are never parsed. Events whose callback raises are
+    logged and counted as failed.
+    """
+
+    def __init__(self, deliver: "function", max_rate: float):
+        """C-tor
+
+        :param deliver: Function taking one PutEvent or DeleteEvent.
+        :param max_rate: Maximum delivery rounds per second.
+        :type deliver: Function
+        :type max_rate: float
+        """
+
+        if max_rate <= 0:
+            raise ValueError('max_rate must be positive')
+        self.deliver = deliver
+        self.interval = 1./max_rate
+        self.delivered = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._pending = {}
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, ev):
+        with self._cond:
+            if ev.key in self._pending:
+                self.coalesced += 1
+            self._pending[ev.key] = ev
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                events, self._pending = self._pending, {}
+            start = time.monotonic()
+            failed = 0
+            for ev in events.values():
+                try:
+                    self.deliver(ev)
+                except Exception:
+                    # keep the thread alive for the next events
+                    failed += 1
+                    _log.exception('Watch callback failed for key %s', ev.key.decode('utf-8'))
+            with self._cond:
+                self.delivered += len(events) - failed
+                self.failed += failed
+            time.sleep(max(0., start + self.interval - time.monotonic()))
+
+    def stats(self) -> "Dictionary":
+        """Return counts of delivered, coalesced, failed and pending events."""
+        with self._cond:
+            return {'delivered': self.delivered, 'coalesced': self.coalesced,
+                    'failed': self.failed, 'pending': len(self._pending)}
+
+    def stop(self):
+        """Stop delivering. Pending events are dropped."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+
+class KeyOrderedExecutor:
+    """Bounded pool of worker threads for watch callbacks. Calls submitted
+    for the same key run one at a time in submission order, while
+    different keys run in parallel. Pass an instance as the executor
+    argument of DsaStore.add_watch or add_watch_prefix; one executor can
+    serve many watches. Calls that raise are logged with their traceback
+    and counted in errors.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = None):
+        """C-tor
+
+        :param max_workers: Number of worker threads.
+        :param max_pending: Calls queued before submit blocks. None for no limit.
+        :type max_workers: int
+        :type max_pending: int
+        """
+
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self.max_pending = max_pending
+        self._queues = {}
+        self._ready = collections.deque()
+        self._pending = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self._wait_total = 0.
+        self._run_total = 0.
+        self._run_max = 0.
+        self._threads = [threading.Thread(target=self._worker, daemon=True)
+                         for _ in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, func: "function", *args):
+        """Queue func(*args) behind earlier calls for key.
+
+        :param key: Ordering key, normally the etcd key of the event.
+        :param func: Function to call.
+        :type func: Function
+        """
+
+        with self._cond:
+            while (self.max_pending is not None and self._pending >= self.max_pending
+                   and not self._stopped):
+                self._cond.wait()
+            if self._stopped:
+                raise RuntimeError('executor is shut down')
+            queue = self._queues.get(key)
+            if queue is None:
+                # key is idle: make it ready for a worker
+                queue = self._queues[key] = collections.deque()
+                self._ready.append(key)
+            queue.append((func, args, time.monotonic()))
+            self._pending += 1
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._pending)
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                key = self._ready.popleft()
+                func, args, queued = self._queues[key].popleft()
+            start = time.monotonic()
+            try:
+                func(*args)
+                failed = False
+            except Exception:
+                failed = True
+                _log.exception('Executor call for key %r failed', key)
+            end = time.monotonic()
+            with self._cond:
+                self._pending -= 1
+                self.completed += 1
+                self.errors += failed
+                self._wait_total += start - queued
+                self._run_total += end - start
+                self._run_max = max(self._run_max, end - start)
+                # the key stays owned by this worker until now, which keeps
+                # its calls in order; requeue it at the back if more arrived
+                if self._queues[key]:
+                    self._ready.append(key)
+                else:
+                    del self._queues[key]
+                self._cond.notify_all()
+
+    def stats(self) -> "Dictionary":
+        """Return queue_depth (calls waiting or running), max_queue_depth,
+        submitted, completed, errors, and the mean wait, mean run and max
+        run times of completed calls in seconds.
+        """
+        with self._cond:
+            done = max(self.completed, 1)
+            return {'queue_depth': self._pending,
+                    'max_queue_depth': self.max_queue_depth,
+                    'submitted': self.submitted,
+                    'completed': self.completed,
+                    'errors': self.errors,
+                    'mean_wait': self._wait_total/done,
+                    'mean_run': self._run_total/done,
+                    'max_run': self._run_max}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers. Queued calls that have not started are dropped.
+
+        :param wait: Wait for running calls to finish.
+        :type wait: bool
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
 
 class DsaStore:
     """ Accessor to the ETCD service. Production code should use
@@ -46,21 +290,36 @@ class DsaStore:
     raise: etcd3.exceptions.ConnectionFailedError, FileNotFoundError
     """
 
-    def __init__(self, endpoint_config: str = etcdconf):
+    def __init__(self, endpoint_config: str = etcdconf, client=None):
         """C-tor
 
         :param endpoint_config: Specify config file for Etcd endpoint. (Optional)
+        :param client: etcd3 client to use instead of connecting to the endpoint, e.g. dsa_mem_etcd.MemEtcd. (Optional)
         :type endpoint_config: String
+        :type client: etcd3.Etcd3Client
         """
 
         self.log = dsl.DsaSyslogger("dsa", "System", logging.INFO, "dsaStore")
         self.watch_ids = []
+        self._cache = {}
+        self._cache_prefix = None
+        self._cache_revision = None
+        self._cache_watch_id = None
+        self._cache_lock = threading.Lock()
+        self._mux_watch_ids = {}
+        self._mux_callbacks = {}
+        self._mux_keys = {}
+        self._next_mux_id = -1
+        self._mux_lock = threading.Lock()
+        self._coalescers = {}
         try:
-            etcd_config = df.read_yaml(endpoint_config)
-            etcd_host, etcd_port = self._parse_endpoint(
-                etcd_config['endpoints'])
+            if client is None:
+                etcd_config = df.read_yaml(endpoint_config)
+                etcd_host, etcd_port = self._parse_endpoint(
+                    etcd_config['endpoints'])
+                client = etcd3.client(host=etcd_host, port=etcd_port)
 
-            self.etcd = etcd3.client(host=etcd_host, port=etcd_port)
+            self.etcd = client
             self.log.function('c-tor')
             self.log.info('DsaStore created')
         except:
@@ -128,21 +387,119 @@ class DsaStore:
         try:
             # NaN, +Infinity, -Infinity are not JSON compliant. These
             # values will now raise a ValueError Exception as default
-            value_json = json.dumps(value, allow_nan=not strict_json)
+            value_json = codec.dumps(value, strict_json)
             self.etcd.put(key, value_json)
         except ValueError:
             self.log.error('Could not serialize to json')
             raise
 
+    def put_many(self, values: "Dictionary", strict_json: bool = True):
+        """Put several dictionaries into Etcd. Writes are packed into
+        transactions of at most MAX_TXN_OPS operations, so up to
+        MAX_TXN_OPS keys are written atomically in one round trip.
+
+        Every value is serialized before anything is written, so a value
+        that is not valid JSON leaves the store untouched.
+
+        :param values: Data to place into Etcd store, keyed by key name.
+        :param strict_json: Default True. Strict JSON. Throw on NaN, +/-Infinity
+        :type values: Dictionary of {key: dictionary} (Ex. {'/cmd/corr/1': {'cmd': 'start', 'val': 0}})
+        :type strict_json: bool
+        :raise: ValueError
+        """
+
+        self.log.function('put_many')
+        try:
+            values_json = [(key, codec.dumps(value, strict_json))
+                           for key, value in values.items()]
+        except ValueError:
+            self.log.error('Could not serialize to json')
+            raise
+
+        for i in range(0, len(values_json), MAX_TXN_OPS):
+            chunk = values_json[i:i+MAX_TXN_OPS]
+            self.etcd.transaction(
+                compare=[],
+                success=[self.etcd.transactions.put(key, value)
+                         for key, value in chunk],
+                failure=[])
+
+    def put_array(self, key: str, value: "numpy.ndarray", compress: bool = False):
+        """Put a numpy array into Etcd under the specified key as a binary
+        envelope holding its dtype, shape and bytes. See dsautils.codec.
+
+        :param key: Key name to place data under. (Ex. '/mon/bandpass/24')
+        :param value: Array. Anything np.asarray accepts.
+        :param compress: zlib compress the array bytes.
+        :type key: String
+        :type value: numpy.ndarray
+        :type compress: bool
+        :raise: ValueError for arrays of objects.
+        """
+
+        self.log.function('put_array')
+        try:
+            self.etcd.put(key, codec.pack_array(value, compress))
+        except ValueError:
+            self.log.error('Could not serialize array')
+            raise
+
+    def put_dict_arrays(self, key: str, value: "Dictionary",
+                        strict_json: bool = True, compress: bool = False):
+        """Put a dictionary with numpy array fields into Etcd under the
+        specified key. The arrays are stored as binary and the other fields
+        as JSON, in one envelope that get_dict and watches decode.
+
+        :param key: Key name to place data under. (Ex. '/mon/cal/24')
+        :param value: Data to place into Etcd store.
+        :param strict_json: Default True. Strict JSON. Throw on NaN, +/-Infinity outside arrays.
+        :param compress: zlib compress the array bytes.
+        :type key: String
+        :type value: Dictionary
+        :type strict_json: bool
+        :type compress: bool
+        :raise: ValueError
+        """
+
+        self.log.function('put_dict_arrays')
+        try:
+            self.etcd.put(key, codec.pack_dict(value, strict_json, compress))
+        except ValueError:
+            self.log.error('Could not serialize to json')
+            raise
+
+    def get_array(self, key: str, parse_func: object = 'default') -> "numpy.ndarray":
+        """Get a numpy array from Etcd store. Keys written by put_array give
+        the array as stored; JSON lists, as written by put_dict, are
+        converted with np.asarray.
+
+        :param key: Etcd key from which to read data.
+        :param parse_func: Set to None to allow NaN, Infinity and -Infinity in JSON.
+        :type key: String (Ex. '/mon/bandpass/24')
+        :type parse_func: Function which takes a string.
+        :return: Array, or None if the key does not exist.
+        :rtype: numpy.ndarray
+        :raise: ValueError if the key holds a dictionary.
+        """
+
+        self.log.function('get_array')
+        value = self.get_dict(key, parse_func)
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, dict):
+            self.log.error('Key {} holds a dictionary, not an array'.format(key))
+            raise ValueError('Key {} holds a dictionary, not an array'.format(key))
+        return np.asarray(value)
+
     def _strict_json(self, val: str):
-        """Function will be called by json.loads with one of the following
+        """Function will be called by codec.loads with one of the following
         strings: 'NaN', '-Infinity' or 'Infinity' for invalid numbers.
 
         """
         raise ValueError
 
     def _set_parse_function(self, parse_f: str)->object:
-        """Set how json.loads handles non-conformant json. That is, whether
+        """Set how codec.loads handles non-conformant json. That is, whether
         NaN or +-Infinity are allowed.
 
         :param parse_f: Set to 'default' to allow non strict json input.
@@ -170,33 +527,217 @@ class DsaStore:
         """
         self.etcd.delete(key, dir_flag, recursive)
     
-    def get_dict(self, key: str, parse_func: object = 'default') -> "Dictionary":
+    def get_dict(self, key: str, parse_func: object = 'default',
+                 max_age: float = None) -> "Dictionary":
         """Get data from Etcd store in the form of a dictionary for the
         specified key.
 
+        If the cache is enabled for the key (see enable_cache) the value is
+        served from memory unless it is older than max_age seconds, in
+        which case it is read from etcd and the cache is refreshed.
+
+        Values written by put_dict_arrays come back with numpy array fields.
+
         :param key: Etcd key from which to read data.
         "param parse_func: Set to None to allow NaN, Infinity and -Infinity
+        :param max_age: Maximum age in seconds of a cached value. (Optional)
         :type key: String (Ex. '/mont/snap/1')
         :type parse_func: Function which takes a string.
+        :type max_age: float
         """
 
         self.log.function('get_dict')
         parse_fun = self._set_parse_function(parse_func)
-            
-        # etcd returns a 2-tuple. We want the first element
-        data = self.etcd.get(key)[0]
+
+        if self._is_cached(key):
+            with self._cache_lock:
+                entry = self._cache.get(key)
+            if entry is None and max_age is None:
+                # The mirror holds every key under the prefix.
+                data = None
+            elif entry is not None and (max_age is None or
+                                        time.monotonic() - entry[2] <= max_age):
+                data = entry[0]
+            else:
+                data = self._refresh_cache(key)
+        else:
+            # etcd returns a 2-tuple. We want the first element
+            data = self.etcd.get(key)[0]
         if data is not None:
             try:
-                return json.loads(data.decode("utf-8"),
-                                  parse_constant=parse_fun)
+                return codec.decode_payload(data, parse_fun)
             except:
                 self.log.error('could not convert json to dictionary')
                 raise
         else:
             self.log.warning('Nothing returned for key: {}'.format(key))
 
+    def enable_cache(self, prefix: str = '/'):
+        """Serve get_dict for keys starting with prefix from an in-process
+        mirror. The mirror is loaded with one range read and kept current
+        by a prefix watch started at the revision of that read.
+
+        :param prefix: Key prefix to mirror.
+        :type prefix: String (Ex. '/mon/array/')
+        """
+
+        self.log.function('enable_cache')
+        self.disable_cache()
+        response = self.etcd.get_prefix_response(prefix)
+        now = time.monotonic()
+        with self._cache_lock:
+            self._cache = {kv.key.decode('utf-8'): (kv.value, kv.mod_revision, now)
+                           for kv in response.kvs}
+            self._cache_revision = response.header.revision
+            self._cache_prefix = prefix
+        self._cache_watch_id = self.etcd.add_watch_prefix_callback(
+            prefix, self._update_cache,
+            start_revision=response.header.revision+1)
+        self.log.info('Cache enabled for prefix: {}'.format(prefix))
+
+    def disable_cache(self):
+        """Stop the cache watch and drop the mirror. get_dict reads from etcd
+        again.
+        """
+
+        self.log.function('disable_cache')
+        if self._cache_watch_id is not None:
+            self.etcd.cancel_watch(self._cache_watch_id)
+            self._cache_watch_id = None
+        with self._cache_lock:
+            self._cache = {}
+            self._cache_prefix = None
+            self._cache_revision = None
+
+    def get_cache_revision(self) -> int:
+        """Return the etcd revision the cache is consistent with, or None if
+        the cache is disabled.
+        """
+        return self._cache_revision
+
+    def get_cache_age(self, key: str) -> float:
+        """Return the time in seconds since the cached value of key was last
+        written by the watch or read from etcd. None if not cached.
+
+        :param key: Etcd key.
+        :type key: String
+        """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[2]
+
+    def _is_cached(self, key: str) -> bool:
+        prefix = self._cache_prefix
+        return prefix is not None and key.startswith(prefix)
+
+    def _refresh_cache(self, key: str) -> bytes:
+        """Read key from etcd and store it in the cache unless the watch has
+        already delivered a newer revision.
+
+        :param key: Etcd key.
+        :type key: String
+        :return: Raw value or None
+        """
+        data, meta = self.etcd.get(key)
+        now = time.monotonic()
+        with self._cache_lock:
+            if self._is_cached(key):
+                entry = self._cache.get(key)
+                if data is None:
+                    self._cache.pop(key, None)
+                elif entry is None or entry[1] <= meta.mod_revision:
+                    self._cache[key] = (data, meta.mod_revision, now)
+        return data
+
+    def _update_cache(self, event):
+        """Watch callback applying put and delete events to the cache.
+
+        :param event: A WatchResponse object or an exception from the watcher
+        """
+        if isinstance(event, Exception):
+            # The watch is gone. Stop serving values we can no longer trust.
+            self.log.function('_update_cache')
+            self.log.error('Cache watch failed: {}'.format(event))
+            with self._cache_lock:
+                self._cache = {}
+                self._cache_prefix = None
+                self._cache_revision = None
+            self._cache_watch_id = None
+            return
+
+        now = time.monotonic()
+        with self._cache_lock:
+            if self._cache_prefix is None:
+                return
+            for ev in event.events:
+                key = ev.key.decode('utf-8')
+                if isinstance(ev, etcd3.events.DeleteEvent):
+                    self._cache.pop(key, None)
+                else:
+                    self._cache[key] = (ev.value, ev.mod_revision, now)
+            self._cache_revision = max(self._cache_revision,
+                                       event.header.revision)
+
+    def get_prefix_dicts(self, prefix: str,
+                         parse_func: object = 'default') -> "Dictionary":
+        """Get data for every key starting with prefix in one range read.
+
+        :param prefix: Etcd key prefix from which to read data.
+        :param parse_func: Set to None to allow NaN, Infinity and -Infinity
+        :type prefix: String (Ex. '/mon/ant/')
+        :type parse_func: Function which takes a string.
+        :return: Dictionary of {key: dictionary}
+        :rtype: Dictionary
+        :raise: ValueError
+        """
+
+        self.log.function('get_prefix_dicts')
+        parse_fun = self._set_parse_function(parse_func)
+
+        rtn = {}
+        for data, meta in self.etcd.get_prefix(prefix):
+            rtn[meta.key.decode('utf-8')] = self._parse_value(data, parse_fun)
+        return rtn
+
+    def get_many(self, keys: "List",
+                 parse_func: object = 'default') -> "Dictionary":
+        """Get data for a list of keys. Reads are packed into transactions of
+        at most MAX_TXN_OPS operations, so up to MAX_TXN_OPS keys cost one
+        round trip.
+
+        :param keys: Etcd keys from which to read data.
+        :param parse_func: Set to None to allow NaN, Infinity and -Infinity
+        :type keys: List of String (Ex. ['/mon/corr/1', '/mon/corr/2'])
+        :type parse_func: Function which takes a string.
+        :return: Dictionary of {key: dictionary}. None for missing keys.
+        :rtype: Dictionary
+        :raise: ValueError
+        """
+
+        self.log.function('get_many')
+        parse_fun = self._set_parse_function(parse_func)
+
+        rtn = {}
+        for i in range(0, len(keys), MAX_TXN_OPS):
+            chunk = keys[i:i+MAX_TXN_OPS]
+            _, responses = self.etcd.transaction(
+                compare=[],
+                success=[self.etcd.transactions.get(key) for key in chunk],
+                failure=[])
+            for key, response in zip(chunk, responses):
+                if response:
+                    rtn[key] = self._parse_value(response[0][0], parse_fun)
+                else:
+                    self.log.warning('Nothing returned for key: {}'.format(key))
+                    rtn[key] = None
+        return rtn
+
     def add_watch_prefix(self, key: str, cb_func: "function",
-                         parse_func: "function" = 'default') -> int:
+                         parse_func: "function" = 'default',
+                         max_rate: float = None,
+                         executor: KeyOrderedExecutor = None) -> int:
         """Add a callback function for the specified key prefix. This will
            call the callback for any key starting with the specified key prefix.
 
@@ -206,25 +747,45 @@ class DsaStore:
         parse_func if defined will be call with either 'Nan", '-Infinity' or
         'Infinity' string type. Set to None to allow these values.
 
+        If max_rate is set, only the latest value of each key is kept and
+        the callback is called from a separate thread at most max_rate times
+        a second per key. See get_watch_stats.
+
+        If executor is given, parsing and the callback run on its workers
+        instead of the etcd watch thread, in order for each key.
+
         :param key: Key prefix to watch. Callback function will be called when contents of any key starting with prefix changes.
         :param cb_func: Callback function. Must take list as argument.
         :param parse_func: Set to None to allow NaN, -Infinity, Infinity
+        :param max_rate: Maximum callbacks per second per key. None to call for every event.
+        :param executor: Pool to run callbacks on. None to run them on the watch thread.
         :type key: str
         :type cb_func: function
         :type parse_func: Function which takes a string.
+        :type max_rate: float
+        :type executor: KeyOrderedExecutor
         :rtype: int The watch id for the callback. Can be used to cancel watch.
 
         """
 
         parse_fun = self._set_parse_function(parse_func)
 
+        deliver = self._make_delivery(cb_func, parse_fun, with_key=True)
+        if executor is not None:
+            deliver = self._submit_to(executor, deliver)
+        if max_rate is not None:
+            deliver = CoalescingDelivery(deliver, max_rate)
         watch_id = self.etcd.add_watch_prefix_callback(key,
-                                                       self._process_cb_prefix(cb_func, parse_fun))
+                                                       self._watch_events(deliver))
+        if max_rate is not None:
+            self._coalescers[watch_id] = deliver
         self.watch_ids.append(watch_id)
         return watch_id
         
     def add_watch(self, key: str, cb_func: "Callback Function",
-                  parse_func: "function" = 'default') -> int:
+                  parse_func: "function" = 'default',
+                  max_rate: float = None,
+                  executor: KeyOrderedExecutor = None) -> int:
         """Add a callback function for the specified key.
 
         The callback function must take a dictionary as its argument. The
@@ -232,19 +793,48 @@ class DsaStore:
         parse_func if defined will be call with either 'Nan", '-Infinity' or
         'Infinity' string type. Set to None to allow these values.
 
+        If key is under a prefix passed to enable_watch_mux, the callback is
+        registered on that prefix's shared watch and the returned id is a
+        negative logical id, which cancel() also accepts.
+
+        If max_rate is set, only the latest value is kept and the callback
+        is called from a separate thread at most max_rate times a second.
+        See get_watch_stats.
+
+        If executor is given, parsing and the callback run on its workers
+        instead of the etcd watch thread, in the order the events arrived.
+
         :param key: Key to watch. Callback function will be called when contents of key changes.
         :param cb_func: Callback function. Must take dictionary as argument.
         :param parse_func: Set to None to allow NaN, -Infinity, Infinity
+        :param max_rate: Maximum callbacks per second. None to call for every event.
+        :param executor: Pool to run callbacks on. None to run them on the watch thread.
         :type key: String
         :type cb_func: Function(dictionary)
         :type parse_func: Function which takes a string.
+        :type max_rate: float
+        :type executor: KeyOrderedExecutor
         :rtype: int
 
         """
 
         parse_fun = self._set_parse_function(parse_func)
 
-        watch_id = self.etcd.add_watch_callback(key, self._process_cb(cb_func, parse_fun))
+        deliver = self._make_delivery(cb_func, parse_fun, with_key=False)
+        if executor is not None:
+            deliver = self._submit_to(executor, deliver)
+        if max_rate is not None:
+            deliver = CoalescingDelivery(deliver, max_rate)
+        if self._mux_prefix(key) is not None:
+            with self._mux_lock:
+                watch_id = self._next_mux_id
+                self._next_mux_id -= 1
+                self._mux_callbacks.setdefault(key, {})[watch_id] = deliver
+                self._mux_keys[watch_id] = key
+        else:
+            watch_id = self.etcd.add_watch_callback(key, self._watch_events(deliver))
+        if max_rate is not None:
+            self._coalescers[watch_id] = deliver
         self.watch_ids.append(watch_id)
         return watch_id
 
@@ -255,73 +845,153 @@ class DsaStore:
         :type watch_id: int
 
         """
-        self.etcd.cancel_watch(watch_id)
+        coalescer = self._coalescers.pop(watch_id, None)
+        if coalescer is not None:
+            coalescer.stop()
+        if watch_id < 0:
+            with self._mux_lock:
+                key = self._mux_keys.pop(watch_id, None)
+                if key is not None:
+                    callbacks = self._mux_callbacks[key]
+                    callbacks.pop(watch_id)
+                    if not callbacks:
+                        del self._mux_callbacks[key]
+        else:
+            self.etcd.cancel_watch(watch_id)
+
+    def get_watch_stats(self, watch_id: int) -> "Dictionary":
+        """Return delivered, coalesced, failed and pending event counts for a watch
+        added with max_rate, or None for other watches.
+
+        :param watch_id: The id of the watch callback.
+        :type watch_id: int
+        """
+        coalescer = self._coalescers.get(watch_id)
+        if coalescer is None:
+            return None
+        return coalescer.stats()
+
+    def enable_watch_mux(self, prefix: str):
+        """Route add_watch calls for keys starting with prefix through one
+        shared etcd prefix watch. Callbacks are looked up by key for each
+        event, so adding or cancelling key watches does not touch the etcd
+        stream. Events for keys without callbacks are dropped.
+
+        :param prefix: Key prefix to watch. (Ex. '/mon/ant/')
+        :type prefix: String
+        """
+
+        self.log.function('enable_watch_mux')
+        with self._mux_lock:
+            if prefix in self._mux_watch_ids:
+                return
+            self._mux_watch_ids[prefix] = None
+        watch_id = self.etcd.add_watch_prefix_callback(prefix, self._dispatch_mux)
+        with self._mux_lock:
+            self._mux_watch_ids[prefix] = watch_id
+
+    def disable_watch_mux(self, prefix: str):
+        """Cancel the shared watch for prefix and every key watch on it.
+
+        :param prefix: Key prefix passed to enable_watch_mux.
+        :type prefix: String
+        """
+
+        self.log.function('disable_watch_mux')
+        removed = []
+        with self._mux_lock:
+            watch_id = self._mux_watch_ids.pop(prefix, None)
+            for mux_id, key in list(self._mux_keys.items()):
+                if key.startswith(prefix) and self._mux_prefix(key) is None:
+                    del self._mux_keys[mux_id]
+                    self._mux_callbacks.pop(key, None)
+                    removed.append(mux_id)
+        for mux_id in removed:
+            coalescer = self._coalescers.pop(mux_id, None)
+            if coalescer is not None:
+                coalescer.stop()
+        if watch_id is not None:
+            self.etcd.cancel_watch(watch_id)
+
+    def _mux_prefix(self, key: str) -> str:
+        """Return the multiplexed prefix covering key, or None."""
+        # copy, as enable_watch_mux and disable_watch_mux may run meanwhile
+        for prefix in list(self._mux_watch_ids):
+            if key.startswith(prefix):
+                return prefix
+        return None
+
+    def _dispatch_mux(self, event):
+        """Watch callback of a multiplexed prefix. Hands each event to the
+        callbacks registered for its key.
+
+        :param event: A WatchResponse object or an exception from the watcher
+        """
+        if isinstance(event, Exception):
+            self.log.function('_dispatch_mux')
+            self.log.error('Multiplexed watch failed: {}'.format(event))
+            return
+        for ev in event.events:
+            key = ev.key.decode('utf-8')
+            with self._mux_lock:
+                callbacks = list(self._mux_callbacks.get(key, {}).values())
+            for deliver in callbacks:
+                try:
+                    deliver(ev)
+                except Exception:
+                    # keep delivering to the other callbacks
+                    _log.exception('Watch callback failed for key %s', key)
 
     def get_watch_ids(self) -> "List":
         """Return the array of watch_ids
         """
         return self.watch_ids
 
-    def _process_cb(self, cb_func: "Callback Function",
-                    parse_func: "function" = 'default'):
-        """Private closure to call callback function with dictionary argument
-        representing the payload of the key being watched.
+    def _make_delivery(self, cb_func: "Callback Function",
+                       parse_fun: "function", with_key: bool):
+        """Private closure parsing the payload of one watch event and
+        passing it to the callback function.
 
-        :param cb_func: Callback function. Takes a dictionary argument.
-        :param parse_func: Set to None to allow NaN, -Infinity, Infinity
+        :param cb_func: Callback function.
+        :param parse_fun: Function handling NaN, -Infinity, Infinity
+        :param with_key: Call cb_func with (key, payload) instead of payload.
         :type cb_func: Function
-        :type parse_func: Function which takes a string.
+        :type parse_fun: Function which takes a string.
+        :type with_key: bool
         """
 
-        self.log.function('_process_cb')
-
-        parse_fun = self._set_parse_function(parse_func)
-        
-        def a(event):
-            """Function Etcd actually calls. We process the event so the caller
-            doesn't have to.
+        def deliver(ev):
+            """Parse one event and call the callback.
 
-            :param event: A WatchResponse object
+            :param ev: A PutEvent or DeleteEvent
             :raise: ValueError
             :raise: AttributeError
             """
+            key = ev.key.decode('utf-8')
+            value = ev.value
+            # parse the JSON command into a dict.
             try:
-                if event is not None:
-                    for ev in event.events:
-                        key = ev.key.decode('utf-8')
-                        value = ev.value.decode('utf-8')
-                        # parse the JSON command into a dict.
-                        try:
-                            payload = self._parse_value(value, parse_fun)
-                            cb_func(payload)
-                        except ValueError:
-                            self.log.error('problem parsing payload')
-                            raise
-                        except AttributeError:
-                            self.log.error('Unknown attribute')
-                            raise
+                payload = self._parse_value(value, parse_fun)
+                if with_key:
+                    cb_func((key, payload))
                 else:
-                    self.log.warning('event is None.')
+                    cb_func(payload)
+            except ValueError:
+                self.log.error('problem parsing payload')
+                raise
             except AttributeError:
-                self.log.error('Unknown attribute in event.')
+                self.log.error('Unknown attribute')
                 raise
-        return a
+        return deliver
 
-    def _process_cb_prefix(self, cb_func: "Callback Function",
-                           parse_func: "function" = 'default'):
-        """Private closure to call callback function with list argument
-        representing the kay and payload of the keys being watched.
+    def _watch_events(self, deliver: "function"):
+        """Private closure handing every event of a watch response to
+        deliver.
 
-        :param cb_func: Callback function. Takes a list argument.
-        :param parse_func: Set to None to allow NaN, -Infinity, Infinity
-        :type cb_func: Function
-        :type parse_func: Function which takes a string.
+        :param deliver: Function taking one PutEvent or DeleteEvent.
+        :type deliver: Function
         """
 
-        self.log.function('_process_cb')
-
-        parse_fun = self._set_parse_function(parse_func)
-            
         def a(event):
             """Function Etcd actually calls. We process the event so the caller
             doesn't have to.
@@ -329,38 +999,42 @@ class DsaStore:
             :param event: A WatchResponse object
             :raise: ValueError
             :raise: AttributeError
-
             """
             try:
                 if event is not None:
                     for ev in event.events:
-                        key = ev.key.decode('utf-8')
-                        value = ev.value.decode('utf-8')
-                        # parse the JSON command into a dict.
-                        try:
-                            payload = self._parse_value(value, parse_fun)
-                            cb_func((key, payload))
-                        except ValueError:
-                            self.log.error('problem parsing payload')
-                            raise
-                        except AttributeError:
-                            self.log.error('Unknown attribute')
-                            raise
+                        deliver(ev)
                 else:
-                    self.log.warning('event is None')
+                    self.log.warning('event is None.')
             except AttributeError:
                 self.log.error('Unknown attribute in event.')
                 raise
         return a
 
+    @staticmethod
+    def _submit_to(executor: KeyOrderedExecutor, deliver: "function"):
+        """Private closure queueing deliver on executor, ordered by event key.
+
+        :param executor: Pool the events are delivered on.
+        :param deliver: Function taking one PutEvent or DeleteEvent.
+        :type executor: KeyOrderedExecutor
+        :type deliver: Function
+        """
+
+        def submit(ev):
+            executor.submit(ev.key, deliver, ev)
+        return submit
+
     def _parse_value(self, value: "Json String",
                      parse_func: "function" = 'default') -> "Dictionary":
-        """Parse the string in JSON format into a dictionary.
+        """Parse the string in JSON format into a dictionary. Binary
+        envelopes written by put_array and put_dict_arrays are decoded
+        to an array or a dictionary with array fields.
 
         :param value: JSON string of the form: {"key":"value"}
                       or {"key":number|bool}
         "param parse_func: Set to None to allow NaN, Infinity and -Infinity
-        :type value: String
+        :type value: String or bytes
         :type key: String (Ex. '/mont/snap/1')
         :type parse_func: Function which takes a string.
         :return: Key,value dictionary
@@ -372,7 +1046,7 @@ class DsaStore:
         parse_fun = self._set_parse_function(parse_func)
         rtn = {}
         try:
-            rtn = json.loads(value, parse_constant=parse_fun)
+            rtn = codec.decode_payload(value, parse_fun)
         except ValueError:
             # TODO: log to syslog
             self.log.error("JSON Decode Error. value= {}".format(value))
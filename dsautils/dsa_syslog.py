@@ -1,10 +1,17 @@
 """Class to provide logging to syslog on Linux using structured logging.
 
-   This class is not thread safe.
+   Each message is built in its own dictionary, so logging from several
+   threads does not need a lock. Setting app, version, function, etc. is
+   shared by all threads using the same logger.
 
    Current MJD will be added to log message at time of logging. See example
    output below.
 
+   With async_mode=True, records are put on a bounded in-memory queue and a
+   background thread ships them to syslog, so a stalled rsyslog does not
+   block the caller. When the queue is full the overflow policy decides
+   whether the oldest record, the new record, or the caller gives way.
+
    :example:
 
     >>> import logging
@@ -15,6 +22,13 @@
     >>> my_log.function('setup')
     >>> my_log.info('corr01 configured')
     >>>
+    >>> # Non-blocking logger dropping the oldest records on overflow
+    >>> async_log = dsl.DsaSyslogger('dsa', 'correlator', logging.INFO, 'corr_async',
+    >>>                              async_mode=True, queue_size=10000,
+    >>>                              overflow='drop-oldest')
+    >>> async_log.info('corr01 configured')
+    >>> print(async_log.get_dropped())
+    >>>
     >>> # Look into /var/log/syslog
     >>> Jul 10 15:40:31 birch 2020-07-10T22:40:31 [info     ] \
 {"mjd": 59040.944796612166, "subsystem": "correlator", "app": "run_corr, \
@@ -22,16 +36,86 @@
 "msg": "corr01 configured"}
 """
 
+import atexit
 import datetime
+import queue
 import socket
+import threading
 import logging
 import logging.handlers
 from collections import OrderedDict
 import json
-from multiprocessing import Lock
+import time
 from structlog.stdlib import LoggerFactory
 import structlog
-from astropy.time import Time
+
+# MJD of the unix epoch, 1970-01-01T00:00:00 UTC.
+MJD_UNIX_EPOCH = 40587.0
+SECONDS_PER_DAY = 86400.0
+
+OVERFLOW_POLICIES = ('drop-oldest', 'drop-new', 'block')
+
+
+def fast_mjd(unix_time: float = None) -> float:
+    """Current UTC time as MJD computed from the unix clock.
+
+    Matches astropy Time.now().mjd without constructing a Time object.
+
+    :param unix_time: Seconds since the unix epoch. Defaults to now.
+    :type unix_time: float
+    :return: MJD
+    :rtype: float
+    """
+    if unix_time is None:
+        unix_time = time.time()
+    return MJD_UNIX_EPOCH + unix_time/SECONDS_PER_DAY
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue that applies an overflow policy
+    when the queue is full and counts the records it drops.
+    """
+
+    def __init__(self, log_queue: "queue.Queue", overflow: str = 'drop-oldest'):
+        """C-tor
+
+        :param log_queue: Bounded queue drained by a QueueListener.
+        :param overflow: One of 'drop-oldest', 'drop-new' or 'block'.
+        :type log_queue: queue.Queue
+        :type overflow: String
+        :raise: ValueError
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of {}'.format(OVERFLOW_POLICIES))
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def _count_drop(self):
+        with self._drop_lock:
+            self.dropped += 1
+
+    def enqueue(self, record: "logging.LogRecord"):
+        """Put record on the queue according to the overflow policy.
+        """
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.overflow == 'drop-new':
+                    self._count_drop()
+                    return
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count_drop()
+            except queue.Empty:
+                pass
 
 
 class DsaSyslogger:
@@ -42,7 +126,10 @@ class DsaSyslogger:
                  subsystem_name='_',
                  log_level=logging.INFO,
                  logger_name=__name__,
-                 log_stream=None):
+                 log_stream=None,
+                 async_mode=False,
+                 queue_size=10000,
+                 overflow='drop-oldest'):
         """C-tor
 
         :param proj_name: Project name
@@ -51,11 +138,18 @@ class DsaSyslogger:
         :param loger_name: Name used to control scope of logger. \
 Loggers with the same name are global within the Python interpreter instance.
         :param log_stream: Use Stream instead of syslog.
+        :param async_mode: Ship records from a background thread.
+        :param queue_size: Maximum number of queued records in async mode.
+        :param overflow: Policy when the queue is full: 'drop-oldest', 'drop-new' or 'block'.
         :type proj_name: String
         :type subsystem_name: String
         :type log_level: logging.Level
         :type logger_name: String
         :type log_stream: Stream
+        :type async_mode: bool
+        :type queue_size: int
+        :type overflow: String
+        :raise: ValueError
         """
 
         
@@ -95,6 +189,17 @@ Loggers with the same name are global within the Python interpreter instance.
                     
         handler.setFormatter(formatter)
 
+        self.queue_handler = None
+        self.listener = None
+        if async_mode:
+            self.queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size),
+                                                     overflow)
+            self.listener = logging.handlers.QueueListener(self.queue_handler.queue,
+                                                           handler)
+            self.listener.start()
+            atexit.register(self.stop)
+            handler = self.queue_handler
+
         self.log = logging.getLogger(logger_name)
         self.log.addHandler(handler)
         self.log.setLevel(log_level)
@@ -108,9 +213,29 @@ Loggers with the same name are global within the Python interpreter instance.
             'module': logger_name,
             'function': '_'
         })
-        self.mutex = Lock()
 
 
+    def get_dropped(self) -> int:
+        """Return the number of records dropped because the queue was full.
+        Always 0 unless async_mode is set.
+        """
+        if self.queue_handler is None:
+            return 0
+        return self.queue_handler.dropped
+
+    def stop(self):
+        """Ship the queued records and stop the background thread. Later
+        records are written directly, as without async_mode.
+        Does nothing unless async_mode is set.
+        """
+        if self.listener is not None:
+            listener = self.listener
+            self.listener = None
+            self.log.removeHandler(self.queue_handler)
+            for handler in listener.handlers:
+                self.log.addHandler(handler)
+            listener.stop()
+
     def subsystem(self, name: "String"):
         """Add subsystem name.
 
@@ -151,22 +276,26 @@ Loggers with the same name are global within the Python interpreter instance.
         """
         self.log.setLevel(level)
 
-    def _logit(self, event: "String", log_func: "logging function"):
+    def _logit(self, level: "String", event: "String",
+               log_func: "logging function"):
         """Log message to syslog
 
+        :param level: level name placed in the message
         :param event: message to log
         :param log_func: logging function to use
+        :type level: String
         :type event: String
         :type log_func: Function
         """
 
         try:
-            d_utc = datetime.datetime.utcnow() # <-- get time in UTC
-            self.msg['time'] = d_utc.isoformat("T") + "Z"
-            self.msg['mjd'] = Time.now().mjd
-            self.msg['msg'] = event
-            msgs = json.dumps(self.msg)
-            log_func(msgs)
+            now = time.time()
+            msg = self.msg.copy()
+            msg['level'] = level
+            msg['time'] = datetime.datetime.utcfromtimestamp(now).isoformat("T") + "Z"
+            msg['mjd'] = fast_mjd(now)
+            msg['msg'] = event
+            log_func(json.dumps(msg))
         except BrokenPipeError as bpe:
             print("dsa_syslog:_logit. Exception: ", bpe)
 
@@ -176,34 +305,29 @@ Loggers with the same name are global within the Python interpreter instance.
         On some systems, writing to debug ends up in /var/log/debug
         and not /var/log/syslog.
         """
-        with self.mutex:
-            self.msg['level'] = "debug"
-            self._logit(event, self.log.debug)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self._logit("debug", event, self.log.debug)
 
     def info(self, event: "String"):
         """Support log.info
         """
-        with self.mutex:
-            self.msg['level'] = "info"
-            self._logit(event, self.log.info)
+        if self.log.isEnabledFor(logging.INFO):
+            self._logit("info", event, self.log.info)
 
     def warning(self, event: "String"):
         """Support log.warning
         """
-        with self.mutex:
-            self.msg['level'] = "warn"
-            self._logit(event, self.log.warning)
+        if self.log.isEnabledFor(logging.WARNING):
+            self._logit("warn", event, self.log.warning)
 
     def error(self, event: "String"):
         """Support log.error
         """
-        with self.mutex:
-            self.msg['level'] = "error"
-            self._logit(event, self.log.error)
+        if self.log.isEnabledFor(logging.ERROR):
+            self._logit("error", event, self.log.error)
 
     def critical(self, event: "String"):
         """Support log.critical
         """
-        with self.mutex:
-            self.msg['level'] = "critical"
-            self._logit(event, self.log.critical)
+        if self.log.isEnabledFor(logging.CRITICAL):
+            self._logit("critical", event, self.log.critical)
@@ -1,82 +1,126 @@
-import argparse
-import numpy as np
-import matplotlib.pyplot as plt
-import sigproc
-import warnings
-
-parser = argparse.ArgumentParser(description="Multi-beam FIL file visualization");
-parser.add_argument('infile', type=str, help="FIL file name");
-parser.add_argument('-cl', type=int, dest='cl', help="channel low", default = 0);
-parser.add_argument("-cu", type=int, dest='cu', help="channel high", default = 1023);
-parser.add_argument('-il', type=int, dest='il', help="integration low", default = 0);
-parser.add_argument("-iu", type=int, dest='iu', help="integration high", default = 4095);
-parser.add_argument('-bl', type=int, dest='bl', help="beam low", default = 0);
-parser.add_argument("-bu", type=int, dest='bu', help="beam high", default = 63);
-args = parser.parse_args();
-
-cl = args.cl;
-cu = args.cu;
-bl = args.bl;
-bu = args.bu;
-il = args.il;
-iu = args.iu;
-
-header = sigproc.read_header(args.infile);
-nBeams = header['nbeams'];
-nChans = header['nchans'];
-nInts = header['nsamples'];
-
-print("\nfile contains:");
-print(str(nBeams) + " beams");
-print(str(nChans) + " channels");
-print(str(nInts) + " time samples\n");
-
-if cl > cu:
-    cl , cu = cu , cl;
-if bl > bu:
-    bl , bu = bu , bl;
-if il > iu:
-    il , iu = iu , il;
-if cl < 0: cl = 0;
-if cu > nChans-1: cu = nChans-1;
-if bl < 0: bl = 0;
-if bu > nBeams-1: bu = nBeams-1;
-if il < 0: il = 0;
-if iu > nInts-1: iu = nInts-1;
-
-if iu > 4096:
-    iu = 4096;
-    warnings.warn("upper integration sample set to 4096 to analyze first DADA block");
-
-fh  = open(args.infile, 'rb');
-while True:
-	keyword, value, idx = sigproc.read_next_header_keyword(fh);
-	if keyword == 'HEADER_END':
-		break;
-
-nStartDataIdx = fh.tell();
-fh.seek(0,0);
-data = np.fromfile(fh, dtype=np.uint8, count=nBeams*nChans*nInts, offset=nStartDataIdx);
-data = np.reshape(data, (nBeams,nInts,nChans), order = 'C');
-data = data[bl:bu+1,il:iu+1,cl:cu+1];
-data = data.transpose(0,2,1);
-data = np.reshape(data,((bu-bl+1)*(cu-cl+1),(iu-il+1)),order='C').T;
-
-plt.figure();
-plt.suptitle(args.infile, fontsize=14)
-plt.subplot(2,2,1);
-plt.imshow(data,aspect='auto');
-plt.colorbar();
-plt.xlabel('frequency channel');
-plt.ylabel('time sample');
-plt.subplot(2,2,2);
-plt.plot(np.mean(data,axis=1));
-plt.grid();
-plt.xlabel('time sample');
-plt.ylabel('mean power');
-plt.subplot(2,2,3);
-plt.plot(np.mean(data,axis=0));
-plt.grid();
-plt.xlabel('frequency channel');
-plt.ylabel('mean power');
-plt.show();
+import argparse
+import os
+import numpy as np
+import sigproc
+
+# numpy type of the samples for each supported nbits
+NBITS_DTYPE = {8: np.uint8, 16: np.uint16, 32: np.float32}
+
+
+class FilReader:
+    """Memory-mapped multi-beam filterbank file.
+
+    The data section after HEADER_END is mapped, not read, so slicing a
+    window of beams, samples and channels only touches the pages that hold
+    it. data is a (beam, time, chan) view of the whole file.
+
+    :example:
+
+    >>> fil = FilReader('beams.fil')
+    >>> window = fil.window(beams=(0, 3), samples=(100000, 104096))
+    """
+
+    def __init__(self, filename: str):
+        """
+        :param filename: Path of the filterbank file.
+        :type filename: str
+        """
+        self.filename = filename
+        self.header = sigproc.read_header(filename)
+        self.nbeams = self.header.get('nbeams', 1)
+        self.nchans = self.header['nchans']
+        self.dtype = np.dtype(NBITS_DTYPE[self.header.get('nbits', 8)])
+
+        with open(filename, 'rb') as fh:
+            while True:
+                keyword, value, idx = sigproc.read_next_header_keyword(fh)
+                if keyword == 'HEADER_END':
+                    break
+            self.data_offset = fh.tell()
+
+        # a file still being written may hold fewer samples than its header says
+        spectrum_bytes = self.nbeams*self.nchans*self.dtype.itemsize
+        available = (os.path.getsize(filename)-self.data_offset)//spectrum_bytes
+        self.nsamples = min(self.header.get('nsamples', available), available)
+        self.data = np.memmap(filename, dtype=self.dtype, mode='r', offset=self.data_offset,
+                              shape=(self.nbeams, self.nsamples, self.nchans))
+
+    def window(self, beams: tuple = None, samples: tuple = None, chans: tuple = None) -> np.ndarray:
+        """Return a view of part of the data, clipped to the file.
+
+        :param beams: (first, last) beam, inclusive. Defaults to all.
+        :type beams: tuple
+        :param samples: (first, last) time sample, inclusive. Defaults to all.
+        :type samples: tuple
+        :param chans: (first, last) channel, inclusive. Defaults to all.
+        :type chans: tuple
+        :return: View of shape (nbeam, nsample, nchan).
+        :rtype: numpy.memmap
+        """
+        slices = []
+        for bounds, size in zip((beams, samples, chans), self.data.shape):
+            if bounds is None:
+                slices += [slice(0, size)]
+            else:
+                low, high = sorted(bounds)
+                slices += [slice(max(low, 0), min(high, size-1)+1)]
+        return self.data[tuple(slices)]
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser(description="Multi-beam FIL file visualization");
+    parser.add_argument('infile', type=str, help="FIL file name");
+    parser.add_argument('-cl', type=int, dest='cl', help="channel low", default = 0);
+    parser.add_argument("-cu", type=int, dest='cu', help="channel high", default = 1023);
+    parser.add_argument('-il', type=int, dest='il', help="integration low", default = 0);
+    parser.add_argument("-iu", type=int, dest='iu', help="integration high", default = 4095);
+    parser.add_argument('-bl', type=int, dest='bl', help="beam low", default = 0);
+    parser.add_argument("-bu", type=int, dest='bu', help="beam high", default = 63);
+    args = parser.parse_args();
+
+    cl = args.cl;
+    cu = args.cu;
+    bl = args.bl;
+    bu = args.bu;
+    il = args.il;
+    iu = args.iu;
+
+    fil = FilReader(args.infile);
+    nBeams = fil.nbeams;
+    nChans = fil.nchans;
+    nInts = fil.nsamples;
+
+    print("\nfile contains:");
+    print(str(nBeams) + " beams");
+    print(str(nChans) + " channels");
+    print(str(nInts) + " time samples\n");
+
+    data = fil.window((bl, bu), (il, iu), (cl, cu));
+    nb, ni, nc = data.shape;
+    data = data.transpose(0,2,1);
+    data = np.reshape(data,(nb*nc,ni),order='C').T;
+
+    plt.figure();
+    plt.suptitle(args.infile, fontsize=14)
+    plt.subplot(2,2,1);
+    plt.imshow(data,aspect='auto');
+    plt.colorbar();
+    plt.xlabel('frequency channel');
+    plt.ylabel('time sample');
+    plt.subplot(2,2,2);
+    plt.plot(np.mean(data,axis=1));
+    plt.grid();
+    plt.xlabel('time sample');
+    plt.ylabel('mean power');
+    plt.subplot(2,2,3);
+    plt.plot(np.mean(data,axis=0));
+    plt.grid();
+    plt.xlabel('frequency channel');
+    plt.ylabel('mean power');
+    plt.show();
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Decoding of SNAP voltage packets.
+
+   A packet is an 8 byte header followed by 3 antennas x 384 channels x
+   2 times x 2 pols of 4-bit complex samples, one byte per sample with the
+   real part in the low nibble and the imaginary part in the high nibble.
+   A capture is viewed as a (npackets, PACKET_SIZE) uint8 array and every
+   function works on all packets at once.
+
+   :example:
+
+    >>> from dsautils import sockets, packet_parse
+    >>> data = sockets.capture(ip='10.41.0.2', port=4011, n=1000)
+    >>> spec = packet_parse.spectra(data)  # (antenna, pol, channel)
+    >>> packet_parse.loss_stats(data)  # per spectrum id
+"""
+
+import time
+import numpy as np
+
+HEADER_SIZE = 8
+NANT = 3
+NCHAN = 384
+NTIME = 2
+NPOL = 2
+PACKET_SIZE = HEADER_SIZE + NANT*NCHAN*NTIME*NPOL
+
+
+def as_array(data) -> np.ndarray:
+    """View packets as a (npackets, PACKET_SIZE) uint8 array.
+
+    :param data: List of packets, a buffer of whole packets or an array.
+    :type data: list, bytes or numpy.ndarray
+    :return: Packets, one per row. No copy is made for buffers and arrays.
+    :rtype: numpy.ndarray
+    """
+    if isinstance(data, (list, tuple)):
+        data = b''.join(data)
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, PACKET_SIZE)
+
+
+def decode_voltages(data) -> tuple:
+    """Split the 4-bit samples of every packet into signed integers.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :return: (real, imag) int8 arrays of shape (npackets, NANT, NCHAN, NTIME, NPOL) with values -8 to 7.
+    :rtype: tuple
+    """
+    payload = as_array(data)[:, HEADER_SIZE:]
+    real = (payload << 4).view(np.int8) >> 4
+    imag = payload.view(np.int8) >> 4
+    shape = (-1, NANT, NCHAN, NTIME, NPOL)
+    return real.reshape(shape), imag.reshape(shape)
+
+
+def histograms(data) -> np.ndarray:
+    """Count the 16 sample values of all antennas and pols.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :return: Counts of real and imaginary samples with shape (NANT, NPOL, 16), bin i holding value i-8.
+    :rtype: numpy.ndarray
+    """
+    return _histograms(*decode_voltages(data))
+
+
+def _histograms(real: np.ndarray, imag: np.ndarray) -> np.ndarray:
+    """histograms() of samples already split by decode_voltages."""
+    # bin index (ant*NPOL + pol)*16 + value+8 for each sample
+    offset = (np.arange(NANT)[:, None, None, None]*NPOL + np.arange(NPOL))*16 + 8
+    counts = (np.bincount((real + offset).ravel(), minlength=NANT*NPOL*16)
+              + np.bincount((imag + offset).ravel(), minlength=NANT*NPOL*16))
+    return counts.reshape(NANT, NPOL, 16)
+
+
+def make_histogram(data, ant: int = 0, pol: int = 0) -> tuple:
+    """Histogram of the samples of one antenna and pol.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :param ant: Antenna index in the packet, 0 to 2.
+    :type ant: int
+    :param pol: Polarization index, 0 or 1.
+    :type pol: int
+    :return: (histogram normalized to its peak, square root of the summed per-packet variance)
+    :rtype: tuple
+    """
+    real, imag = decode_voltages(data)
+    real = real[:, ant, :, :, pol].reshape(len(real), -1)
+    imag = imag[:, ant, :, :, pol].reshape(len(imag), -1)
+    histo = (np.bincount(real.ravel() + 8, minlength=16)
+             + np.bincount(imag.ravel() + 8, minlength=16)).astype(float)
+    rms = 0.5*(np.var(real, axis=1) + np.var(imag, axis=1)).sum()
+    return histo/np.max(histo), np.sqrt(rms)
+
+
+def spectra(data) -> np.ndarray:
+    """Power spectra of all antennas and pols, summed over packets.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :return: Power with shape (NANT, NPOL, NCHAN), averaged over the times in a packet.
+    :rtype: numpy.ndarray
+    """
+    real, imag = decode_voltages(data)
+    power = real.astype(np.int16)**2 + imag.astype(np.int16)**2
+    power = power.sum(axis=0, dtype=np.int64).mean(axis=2)
+    return power.transpose(0, 2, 1)
+
+
+def decode_data(data, ant: int = 0, pol: int = 0) -> np.ndarray:
+    """Power spectrum of one antenna and pol, summed over packets.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :param ant: Antenna index in the packet, 0 to 2.
+    :type ant: int
+    :param pol: Polarization index, 0 or 1.
+    :type pol: int
+    :return: Power in each of the NCHAN channels.
+    :rtype: numpy.ndarray
+    """
+    return spectra(data)[ant, pol]
+
+
+def decode_headers(data) -> tuple:
+    """Packet and spectrum ids from the header of every packet.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :return: (packet_ids, spectrum_ids) as uint64 arrays in arrival order.
+    :rtype: tuple
+    """
+    d = as_array(data)[:, :6].astype(np.uint64)
+    packet_ids = ((d[:, 4] & 224) >> 5) | (d[:, 3] << 3) | (d[:, 2] << 11) | (d[:, 1] << 19) | (d[:, 0] << 27)
+    spectrum_ids = ((d[:, 4] & 31) << 8) | d[:, 5]
+    return packet_ids, spectrum_ids
+
+
+def sequence_stats(packet_ids, step: int = None) -> dict:
+    """Loss statistics of one stream of packet ids in arrival order.
+
+    :param packet_ids: Packet ids as received.
+    :type packet_ids: numpy.ndarray
+    :param step: Increment between consecutive packets. Defaults to the most common increment.
+    :type step: int
+    :return: Dictionary with npackets, first, last, step, expected, missing, gaps, largest_gap, duplicates, reorders and loss_fraction.
+    :rtype: dict
+    """
+    ids = np.asarray(packet_ids, dtype=np.int64)
+    unique, first = np.unique(ids, return_index=True)
+    diffs = np.diff(unique)
+    if step is None:
+        if len(diffs):
+            values, counts = np.unique(diffs, return_counts=True)
+            step = int(values[np.argmax(counts)])
+        else:
+            step = 1
+    expected = int((unique[-1] - unique[0])//step + 1) if len(unique) else 0
+    missing = expected - len(unique)
+    gap_sizes = diffs[diffs > step]//step - 1
+    # a packet is reordered if a later id arrived before it; repeats count as duplicates only
+    is_first = np.zeros(len(ids), dtype=bool)
+    is_first[first] = True
+    late = ids[1:] < np.maximum.accumulate(ids)[:-1]
+    reorders = int(np.count_nonzero(late & is_first[1:]))
+    return {'npackets': len(ids),
+            'first': int(unique[0]) if len(unique) else None,
+            'last': int(unique[-1]) if len(unique) else None,
+            'step': step,
+            'expected': expected,
+            'missing': missing,
+            'gaps': len(gap_sizes),
+            'largest_gap': int(gap_sizes.max()) if len(gap_sizes) else 0,
+            'duplicates': len(ids) - len(unique),
+            'reorders': reorders,
+            'loss_fraction': missing/expected if expected else 0.}
+
+
+def loss_stats(data, step: int = None) -> dict:
+    """Loss statistics of a capture for each spectrum id in it.
+
+    :param data: Packets, see as_array.
+    :type data: list, bytes or numpy.ndarray
+    :param step: Increment between consecutive packet ids. Defaults to the most common one per spectrum id.
+    :type step: int
+    :return: Dictionary of sequence_stats keyed by spectrum id.
+    :rtype: dict
+    """
+    packet_ids, spectrum_ids = decode_headers(data)
+    return {int(sp): sequence_stats(packet_ids[spectrum_ids == sp], step)
+            for sp in np.unique(spectrum_ids)}
+
+
+class PacketAccumulator:
+    """Running spectra, histograms and voltage statistics of a packet
+    stream, fed one chunk at a time so memory does not grow with the
+    length of the capture. The mean and variance of each antenna and pol
+    are merged chunk by chunk with the Chan et al. form of Welford's
+    update. If a store and key are given, a snapshot is written with
+    put_dict every interval seconds.
+
+    :example:
+
+    >>> acc = PacketAccumulator(store=DsaStore(), key='/mon/snap/1/packets')
+    >>> with UdpCapture('10.41.0.2', 4011, nslots=8192) as cap:
+    ...     for packets, lengths in cap.iter_chunks(4096, duration=3600.):
+    ...         acc.add(packets)
+    """
+
+    def __init__(self, store=None, key: str = None, interval: float = 60.):
+        """
+        :param store: DsaStore to publish snapshots to, or None.
+        :param key: Key to publish snapshots under.
+        :param interval: Seconds between published snapshots.
+        """
+        if store is not None and key is None:
+            raise ValueError('A key is needed to publish to a store')
+        self.store = store
+        self.key = key
+        self.interval = interval
+        self.reset()
+
+    def reset(self):
+        """Clear all accumulated data."""
+        self.npackets = 0
+        self.power = np.zeros((NANT, NPOL, NCHAN), dtype=np.int64)
+        self.counts = np.zeros((NANT, NPOL, 16), dtype=np.int64)
+        self.nsamples = 0
+        self.mean = np.zeros((NANT, NPOL))
+        self.m2 = np.zeros((NANT, NPOL))
+        self._published = time.monotonic()
+
+    def add(self, data):
+        """Accumulate a chunk of packets and publish if interval has passed.
+
+        :param data: Packets, see as_array.
+        :type data: list, bytes or numpy.ndarray
+        """
+        real, imag = decode_voltages(data)
+        npackets = len(real)
+        if npackets == 0:
+            return
+        self.power += (real.astype(np.int16)**2 + imag.astype(np.int16)**2).sum(
+            axis=(0, 3), dtype=np.int64).transpose(0, 2, 1)
+        self.counts += _histograms(real, imag)
+
+        # mean and M2 of the real and imaginary samples of this chunk, from
+        # exact integer sums so the subtraction loses nothing of note
+        nsamples = 2*npackets*NCHAN*NTIME
+        axes = (0, 2, 3)
+        total = real.sum(axis=axes, dtype=np.int64) + imag.sum(axis=axes, dtype=np.int64)
+        mean = total/nsamples
+        sumsq = ((real.astype(np.int16)**2).sum(axis=axes, dtype=np.int64)
+                 + (imag.astype(np.int16)**2).sum(axis=axes, dtype=np.int64))
+        m2 = sumsq - total*mean
+
+        delta = mean - self.mean
+        combined = self.nsamples + nsamples
+        self.mean += delta*nsamples/combined
+        self.m2 += m2 + delta**2*self.nsamples*nsamples/combined
+        self.nsamples = combined
+        self.npackets += npackets
+
+        if self.store is not None and time.monotonic() - self._published >= self.interval:
+            self.publish()
+
+    @property
+    def rms(self) -> np.ndarray:
+        """Standard deviation of the samples of each antenna and pol."""
+        if self.nsamples == 0:
+            return np.full((NANT, NPOL), np.nan)
+        return np.sqrt(self.m2/self.nsamples)
+
+    def snapshot(self) -> dict:
+        """Current statistics as a JSON-serializable dictionary: npackets,
+        spectra (mean power per spectrum, antenna x pol x channel, as
+        spectra() divided by npackets),
+        histograms (counts, antenna x pol x 16), mean and rms
+        (antenna x pol) and time (unix seconds).
+        """
+        spectra = self.power/max(self.npackets*NTIME, 1)
+        return {'npackets': self.npackets,
+                'spectra': spectra.tolist(),
+                'histograms': self.counts.tolist(),
+                'mean': self.mean.tolist(),
+                'rms': self.rms.tolist(),
+                'time': time.time()}
+
+    def publish(self):
+        """Write a snapshot to the store."""
+        self._published = time.monotonic()
+        self.store.put_dict(self.key, self.snapshot())
@@ -1,38 +1,153 @@
-import numpy as np, pyfits as pf, matplotlib.pyplot as plt, pylab
+import os
+import numpy as np
+try:
+    import pyfits as pf
+except ImportError:
+    from astropy.io import fits as pf
 
+DEFAULT_FILE = '/mnt/nfs/data/dsatest.fits'
+NBASE = 6
+NCHAN = 1536  # f.header['NCHAN']
+
+# VisFile per (filename, modification time), shared by the plot functions
+_VISFILES = {}
 
-def plotTimeAmp(fl=None, f1=None, f2=None, tbin=1):
-    if fl is None:
-        fl = '/mnt/nfs/data/dsatest.fits'
-    f = pf.open(fl, ignore_missing_end=True)[1]
-    nrow = (f.header['NAXIS2'])
-    tsamp = f.header['TSAMP']
-    nchan = 1536  # f.header['NCHAN']
-    fch1 = f.header['FCH1'] - (nchan * 2 - 1) * 250. / 2048.
-    if1 = 0
-    if2 = nchan
-    if f1 is not None:
-        if f2 is not None:
-            if1 = np.floor((-fch1 + f1) / (500. / 2048.)).astype('int')
-            if2 = np.floor((-fch1 + f2) / (500. / 2048.)).astype('int')
-
-    t1 = 0
-    t2 = nrow - 1
-
-    data = np.flip(f.data['VIS'].reshape((nrow, 6, nchan, 2, 2)), axis=2)[t1:t2, :, if1:if2, :,
-           :].mean(axis=2)
-    tmax = np.floor((t2 - t1) / (tbin * 1.)).astype('int') * tbin
-    tims = np.arange(nrow) * tsamp
-    tims = tims[0:tmax]
-    data = data[0:tmax, :, :, :]
-
-    tims = tims.reshape((tmax / tbin, tbin)).mean(axis=1)
-    data = data.reshape((tmax / tbin, tbin, 6, 2, 2)).mean(axis=1)
-    amps = 5. * (np.log10(data[:, :, :, 0] ** 2. + data[:, :, :, 1] ** 2.))
 
+def get_visfile(fl=None):
+    """Return the cached VisFile for fl, opening it if it is new or has
+    changed on disk.
+    """
+    if fl is None:
+        fl = DEFAULT_FILE
+    key = (fl, os.path.getmtime(fl))
+    if key not in _VISFILES:
+        for old in [k for k in _VISFILES if k[0] == fl]:
+            del _VISFILES[old]
+        _VISFILES[key] = VisFile(fl)
+    return _VISFILES[key]
+
+
+class VisFile:
+    """Visibility FITS file opened once with memory mapping.
+
+    The first request for a product reads the VIS column block by block in
+    a single pass. That pass computes the channel-averaged visibilities
+    against time for the requested band and the time-averaged
+    visibilities against frequency. Both are cached, so amplitude and
+    phase plots against time and frequency reuse them without reading
+    the file again.
+    """
+
+    def __init__(self, fl=None, block_rows=256):
+        """
+        :param fl: Path of the FITS file.
+        :param block_rows: Number of rows read at a time.
+        """
+        self.filename = DEFAULT_FILE if fl is None else fl
+        self.block_rows = block_rows
+        self.hdul = pf.open(self.filename, ignore_missing_end=True, memmap=True)
+        self.hdu = self.hdul[1]
+        self.nrow = int(self.hdu.header['NAXIS2'])
+        self.tsamp = self.hdu.header['TSAMP']
+        self.nchan = NCHAN
+        self.fch1 = self.hdu.header['FCH1'] - (self.nchan * 2 - 1) * 250. / 2048.
+        # the last row is not used, as in the original plots
+        self.ntime = self.nrow - 1
+        self._freq = None
+        self._time = {}
+
+    def channel_range(self, f1=None, f2=None):
+        """Channel indices (if1, if2) covering frequencies f1 to f2 in MHz,
+        or all channels if either is None.
+        """
+        if f1 is None or f2 is None:
+            return 0, self.nchan
+        if1 = np.floor((-self.fch1 + f1) / (500. / 2048.)).astype('int')
+        if2 = np.floor((-self.fch1 + f2) / (500. / 2048.)).astype('int')
+        return int(if1), int(if2)
+
+    def _scan(self, if1, if2):
+        """One pass over the rows filling the caches for band (if1, if2)."""
+        vis = self.hdu.data['VIS']
+        time_vis = np.empty((self.ntime, NBASE, 2, 2))
+        freq_sum = np.zeros((NBASE, self.nchan, 2, 2)) if self._freq is None else None
+        for r1 in range(0, self.ntime, self.block_rows):
+            r2 = min(r1 + self.block_rows, self.ntime)
+            block = np.asarray(vis[r1:r2]).reshape((r2 - r1, NBASE, self.nchan, 2, 2))[:, :, ::-1]
+            np.mean(block[:, :, if1:if2], axis=2, out=time_vis[r1:r2])
+            if freq_sum is not None:
+                freq_sum += block.sum(axis=0, dtype=np.float64)
+        if freq_sum is not None:
+            freq_sum /= self.ntime
+            self._freq = freq_sum
+        self._time[(if1, if2)] = time_vis
+
+    def time_vis(self, f1=None, f2=None, tbin=1):
+        """Visibilities averaged over the band and in bins of tbin samples.
+
+        :return: (times in s, visibilities of shape (ntime, baseline, pol, re/im))
+        """
+        band = self.channel_range(f1, f2)
+        if band not in self._time:
+            self._scan(*band)
+        tmax = self.ntime // tbin * tbin
+        tims = (np.arange(tmax) * self.tsamp).reshape((tmax // tbin, tbin)).mean(axis=1)
+        data = self._time[band][:tmax].reshape((tmax // tbin, tbin, NBASE, 2, 2)).mean(axis=1)
+        return tims, data
+
+    def freq_vis(self, f1=None, f2=None):
+        """Visibilities averaged over time for the channels of the band.
+
+        :return: (channel numbers, visibilities of shape (baseline, channel, pol, re/im))
+        """
+        if1, if2 = self.channel_range(f1, f2)
+        if self._freq is None:
+            self._scan(if1, if2)
+        return np.arange(self.nchan)[if1:if2], self._freq[:, if1:if2]
+
+    def time_amp(self, f1=None, f2=None, tbin=1):
+        tims, data = self.time_vis(f1, f2, tbin)
+        return tims, amplitude(data)
+
+    def time_phase(self, f1=None, f2=None, tbin=1):
+        tims, data = self.time_vis(f1, f2, tbin)
+        return tims, phase(data)
+
+    def freq_amp(self, f1=None, f2=None):
+        freqs, data = self.freq_vis(f1, f2)
+        return freqs, amplitude(data)
+
+    def freq_phase(self, f1=None, f2=None):
+        freqs, data = self.freq_vis(f1, f2)
+        return freqs, phase(data)
+
+    def close(self):
+        self.hdul.close()
+
+
+def amplitude(data):
+    """Amplitude in dB of visibilities with real and imaginary parts last."""
+    return 5. * (np.log10(data[..., 0] ** 2. + data[..., 1] ** 2.))
+
+
+def phase(data):
+    """Phase in degrees of visibilities with real and imaginary parts last."""
+    return (180. / np.pi) * np.angle(data[..., 0] + data[..., 1] * 1j)
+
+
+def baseline_names():
+    bases = []
     for i in range(3):
         for j in range(i + 1):
             bases.append(str(i) + '-' + str(j))
+    return bases
+
+
+def plotTimeAmp(fl=None, f1=None, f2=None, tbin=1):
+    import matplotlib.pyplot as plt, pylab
+
+    tims, amps = get_visfile(fl).time_amp(f1, f2, tbin)
+    bases = baseline_names()
 
     plt.ion()
     for pl in range(6):
@@ -46,38 +161,10 @@ def plotTimeAmp(fl=None, f1=None, f2=None, tbin=1):
 
 # tmid as a standard astropy time, tspan in seconds
 def plotTimePhase(fl=None, tspan=None, f1=None, f2=None, tbin=1):
-    if fl is None:
-        fl = '/mnt/nfs/data/dsatest.fits'
-    f = pf.open(fl, ignore_missing_end=True)[1]
-    nrow = (f.header['NAXIS2'])
-    tsamp = f.header['TSAMP']
-    nchan = 1536  # f.header['NCHAN']
-    fch1 = f.header['FCH1'] - (nchan * 2 - 1) * 250. / 2048.
-    if1 = 0
-    if2 = nchan
-    if f1 is not None:
-        if f2 is not None:
-            if1 = np.floor((-fch1 + f1) / (500. / 2048.)).astype('int')
-            if2 = np.floor((-fch1 + f2) / (500. / 2048.)).astype('int')
-
-    t1 = 0
-    t2 = nrow - 1
-
-    data = np.flip(f.data['VIS'].reshape((nrow, 6, nchan, 2, 2)), axis=2)[t1:t2, :, if1:if2, :,
-           :].mean(axis=2)
-    tmax = np.floor((t2 - t1) / (tbin * 1.)).astype('int') * tbin
-    tims = np.arange(nrow) * tsamp
-    tims = tims[0:tmax]
-    data = data[0:tmax, :, :, :]
-
-    tims = tims.reshape((tmax / tbin, tbin)).mean(axis=1)
-    data = data.reshape((tmax / tbin, tbin, 6, 2, 2)).mean(axis=1)
-    angs = (180. / np.pi) * np.angle(data[:, :, :, 0] + data[:, :, :, 1] * 1j)
+    import matplotlib.pyplot as plt, pylab
 
-    bases = []
-    for i in range(3):
-        for j in range(i + 1):
-            bases.append(str(i) + '-' + str(j))
+    tims, angs = get_visfile(fl).time_phase(f1, f2, tbin)
+    bases = baseline_names()
 
     plt.ion()
     for pl in range(6):
@@ -92,33 +179,10 @@ def plotTimePhase(fl=None, tspan=None, f1=None, f2=None, tbin=1):
 
 # tmid as a standard astropy time, tspan in seconds
 def plotFreqAmp(fl=None, tspan=None, f1=None, f2=None):
-    if fl is None:
-        fl = '/mnt/nfs/data/dsatest.fits'
-    f = pf.open(fl, ignore_missing_end=True)[1]
-    nrow = int((f.header['NAXIS2']))
-    tsamp = f.header['TSAMP']
-    nchan = 1536  # f.header['NCHAN']
-    fch1 = f.header['FCH1'] - (nchan * 2 - 1) * 250. / 2048.
-    if1 = 0
-    if2 = nchan
-    if f1 is not None:
-        if f2 is not None:
-            if1 = np.floor((-fch1 + f1) / (500. / 2048.)).astype('int')
-            if2 = np.floor((-fch1 + f2) / (500. / 2048.)).astype('int')
-
-    t1 = 0
-    t2 = nrow - 1
-
-    data = np.flip(f.data['VIS'].reshape((nrow, 6, nchan, 2, 2)), axis=2)[t1:t2, :, if1:if2, :, :]
-    data = data.mean(axis=0)
-    freqs = np.arange(nchan)  # (np.arange(nchan)*(250./8192.)+fch1)[if1:if2]
-
-    amps = 5. * (np.log10(data[:, :, :, 0] ** 2. + data[:, :, :, 1] ** 2.))
+    import matplotlib.pyplot as plt, pylab
 
-    bases = []
-    for i in range(3):
-        for j in range(i + 1):
-            bases.append(str(i) + '-' + str(j))
+    freqs, amps = get_visfile(fl).freq_amp(f1, f2)
+    bases = baseline_names()
 
     plt.ion()
     for pl in range(6):
@@ -133,33 +197,10 @@ def plotFreqAmp(fl=None, tspan=None, f1=None, f2=None):
 
 # tmid as a standard astropy time, tspan in seconds
 def plotFreqPhase(fl=None, tspan=None, f1=None, f2=None):
-    if fl is None:
-        fl = '/mnt/nfs/data/dsatest.fits'
-    f = pf.open(fl, ignore_missing_end=True)[1]
-    nrow = (f.header['NAXIS2'])
-    tsamp = f.header['TSAMP']
-    nchan = 1536  # f.header['NCHAN']
-    fch1 = f.header['FCH1'] - (nchan * 2 - 1) * 250. / 2048.
-    if1 = 0
-    if2 = nchan
-    if f1 is not None:
-        if f2 is not None:
-            if1 = np.floor((-fch1 + f1) / (500. / 2048.)).astype('int')
-            if2 = np.floor((-fch1 + f2) / (500. / 2048.)).astype('int')
-
-    t1 = 0
-    t2 = nrow - 1
-
-    data = np.flip(f.data['VIS'].reshape((nrow, 6, nchan, 2, 2)), axis=2)[t1:t2, :, if1:if2, :, :]
-    data = data.mean(axis=0)
-    freqs = np.arange(nchan)  # (np.arange(nchan)*(250./8192.)+fch1)[if1:if2]
-
-    angs = (180. / np.pi) * np.angle(data[:, :, :, 0] + data[:, :, :, 1] * 1j)
+    import matplotlib.pyplot as plt, pylab
 
-    bases = []
-    for i in range(3):
-        for j in range(i + 1):
-            bases.append(str(i) + '-' + str(j))
+    freqs, angs = get_visfile(fl).freq_phase(f1, f2)
+    bases = baseline_names()
 
     plt.ion()
     for pl in range(6):
@@ -1,5 +1,7 @@
+import os
 import socket
-from progress.bar import Bar
+import time
+import numpy as np
 
 
 # ip as string, port as int, buf as int
@@ -13,18 +15,178 @@ def capture(n=100, ip=None, port=None, buf=4616):
         print('No port')
         return ()
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((ip, port))
+    with UdpCapture(ip, port, nslots=n, buf=buf) as cap:
+        cap.run(n=n, progress=True)
+        packets, lengths = cap.packets()
 
-    captured = 0
-    packs = []
-    bar = Bar('Capturing ' + str(n) + ' packets...', max=n)
-    while captured < n:
-        data, addr = sock.recvfrom(buf)
-        packs.append(data)
-        captured += 1
-        bar.next()
+    return [packet[:length].tobytes() for packet, length in zip(packets, lengths)]
 
-    bar.finish()
 
-    return packs
+def kernel_drops(sock):
+    """Packets the kernel dropped for sock because its receive buffer was
+    full, from the drops column of /proc/net/udp. None where unavailable.
+    """
+    inode = str(os.fstat(sock.fileno()).st_ino)
+    for name in ('/proc/net/udp', '/proc/net/udp6'):
+        try:
+            with open(name) as fh:
+                lines = fh.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if fields[9] == inode:
+                return int(fields[12])
+    return None
+
+
+class UdpCapture:
+    """Receives UDP packets into a preallocated ring of nslots rows of buf
+    bytes with recv_into, so no objects are created per packet. If the ring
+    wraps before packets() is called the oldest unread packets are counted
+    as overwritten.
+
+    :example:
+
+    >>> with UdpCapture('10.41.0.2', 4011, nslots=100000, rcvbuf=2**28) as cap:
+    ...     cap.run(duration=10.)
+    ...     packets, lengths = cap.packets()
+    ...     print(cap.stats())
+    """
+
+    def __init__(self, ip, port, nslots=1024, buf=4616, rcvbuf=None):
+        """
+        :param ip: Address to bind to.
+        :param port: Port to bind to.
+        :param nslots: Number of packets the ring holds.
+        :param buf: Bytes per packet; longer packets are truncated.
+        :param rcvbuf: Requested SO_RCVBUF in bytes. None keeps the system default.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if rcvbuf is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((ip, port))
+        self.buf = buf
+        self.ring = np.zeros((nslots, buf), dtype=np.uint8)
+        self.lengths = np.zeros(nslots, dtype=np.int64)
+        self._views = [memoryview(row) for row in self.ring]
+        self.received = 0
+        self.short = 0
+        self.overwritten = 0
+        self._read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def rcvbuf(self):
+        """Receive buffer size granted by the kernel, in bytes."""
+        return self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+    def run(self, n=None, duration=None, progress=False, interval=0.5):
+        """Receive until n packets have arrived or duration seconds have
+        passed, whichever is first. With neither, runs until interrupted.
+
+        :param n: Number of packets to receive.
+        :param duration: Time limit in seconds.
+        :param progress: Show a progress bar of n or duration, redrawn at most every interval seconds.
+        :param interval: Seconds between progress updates.
+        :return: Number of packets received by this call.
+        """
+        nslots = len(self.ring)
+        start = self.received
+        t0 = time.monotonic()
+        stop = None if duration is None else t0 + duration
+        bar = None
+        if progress:
+            from progress.bar import Bar
+            if n is not None:
+                bar = Bar('Capturing ' + str(n) + ' packets...', max=n)
+            elif duration is not None:
+                bar = Bar('Capturing for ' + str(duration) + ' s...', max=int(duration))
+        shown = 0
+        last_shown = t0
+        timeout = interval
+        self.sock.settimeout(timeout)
+
+        try:
+            while n is None or self.received - start < n:
+                if stop is not None:
+                    remaining = stop - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # settimeout costs syscalls, so only shorten it when a
+                    # wait could run past stop, halving so that happens a
+                    # few times at the end rather than for every packet
+                    if remaining < timeout:
+                        timeout = remaining/2 if remaining > 1e-3 else remaining
+                        self.sock.settimeout(timeout)
+                slot = self.received % nslots
+                try:
+                    nbytes = self.sock.recv_into(self._views[slot])
+                except socket.timeout:
+                    nbytes = None
+                if nbytes is not None:
+                    self.lengths[slot] = nbytes
+                    self.short += nbytes < self.buf
+                    self.received += 1
+                    if self.received - self._read > nslots:
+                        self._read += 1
+                        self.overwritten += 1
+
+                if bar is not None and time.monotonic() - last_shown >= interval:
+                    last_shown = time.monotonic()
+                    shown = self._progress(bar, shown, start, n, t0)
+        finally:
+            if bar is not None:
+                self._progress(bar, shown, start, n, t0)
+                bar.finish()
+        return self.received - start
+
+    def _progress(self, bar, shown, start, n, t0):
+        done = self.received - start if n is not None else min(int(time.monotonic() - t0), bar.max)
+        bar.next(done - shown)
+        return done
+
+    def iter_chunks(self, chunk=1024, duration=None):
+        """Yield (packets, lengths) for every chunk packets received, and
+        any remainder when duration seconds have passed. Unread packets
+        are drained first.
+
+        :param chunk: Packets per chunk; at most the number of ring slots.
+        :param duration: Time limit in seconds. None runs until interrupted.
+        """
+        if chunk > len(self.ring):
+            raise ValueError('chunk is larger than the ring')
+        stop = None if duration is None else time.monotonic() + duration
+        while True:
+            remaining = None if stop is None else stop - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            self.run(n=chunk, duration=remaining)
+            packets, lengths = self.packets()
+            if len(packets):
+                yield packets, lengths
+
+    def packets(self):
+        """Unread packets, oldest first, and marks them read.
+
+        :return: (packets, lengths) with packets a (npackets, buf) uint8 copy of the ring.
+        """
+        idx = np.arange(self._read, self.received) % len(self.ring)
+        self._read = self.received
+        return self.ring[idx], self.lengths[idx]
+
+    def stats(self):
+        """Counts of received packets, packets shorter than buf, packets
+        overwritten in the ring before being read, and packets dropped by
+        the kernel since the socket was opened (None if not available).
+        """
+        return {'received': self.received, 'short': self.short,
+                'overwritten': self.overwritten, 'kernel_drops': kernel_drops(self.sock)}
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,51 @@
+"""Test code for calstatus.py
+   execute 'pytest' to run tests.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+import numpy as np
+sys.path.append(str(Path('..')))
+import dsautils.calstatus as cs
+
+
+class TestCalstatus(unittest.TestCase):
+    """This class is applying unit tests to the functions in calstatus.py
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        # antenna x pol x time
+        self.status = rng.integers(0, 1 << 25, (10, 2, 30)).astype(np.uint32)
+        self.status[self.status % 3 == 0] = 0
+
+    def test_decode_array(self):
+        errors = cs.decode_array(self.status)
+        self.assertEqual(errors.shape, (10, 2, 30, len(cs.ERROR_NAMES)))
+        for idx in [(0, 0, 0), (3, 1, 7), (9, 1, 29)]:
+            names = [cs.ERROR_NAMES[i] for i in np.flatnonzero(errors[idx])]
+            self.assertEqual(names, cs.decode(int(self.status[idx])))
+        np.testing.assert_array_equal(cs.encode_array(errors), self.status)
+
+    def test_count_errors(self):
+        counts = cs.count_errors(self.status)
+        expected = [sum(bool(s & code) for s in self.status.ravel()) for code in cs.ERROR_CODES]
+        np.testing.assert_array_equal(counts, expected)
+        self.assertEqual(cs.count_errors(self.status, axis=2).shape, (10, 2, len(cs.ERROR_NAMES)))
+
+    def test_reduce_or(self):
+        combined = cs.reduce_or(self.status, axis=(1, 2))
+        for ant in range(10):
+            code = 0
+            for s in self.status[ant].ravel():
+                code = cs.update(code, int(s))
+            self.assertEqual(combined[ant], code)
+        self.assertEqual(cs.reduce_or(self.status), np.bitwise_or.reduce(self.status.ravel()))
+
+    def test_update_array(self):
+        updated = cs.update_array(self.status, ['inv_pol', 'fringes_err'])
+        self.assertTrue(np.all(updated & cs.INV_POL))
+        self.assertTrue(np.all(updated & cs.FRINGES_ERR))
+        updated = cs.update_array(self.status, np.array([cs.INV_POL, 0])[:, np.newaxis])
+        np.testing.assert_array_equal(updated[:, 1], self.status[:, 1])
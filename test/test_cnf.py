@@ -2,11 +2,14 @@
    execute 'pytest' to run tests.
 """
 
+import os
 import sys
+import json
 from pathlib import Path
 import unittest
 sys.path.append(str(Path('..')))
 import dsautils.cnf as cnf
+import dsautils.dsa_mem_etcd as dme
 from pkg_resources import Requirement, resource_filename
 ETCDCONF = resource_filename(Requirement.parse("dsa110-pyutils"), "dsautils/conf/etcdConfig.yml")
 CNFCONF = resource_filename(Requirement.parse("dsa110-pyutils"), "dsautils/conf/cnfConfig.yml")
@@ -149,6 +152,20 @@ CAL_DATA = {
         'antennas_not_in_bf': []
     }
 
+# DSA_TEST_ETCD=mem runs the tests against the in-process etcd stand-in,
+# loaded with the example data
+MEM_ETCD = None
+if os.environ.get('DSA_TEST_ETCD') == 'mem':
+    MEM_ETCD = dme.MemEtcd()
+    for name, value in [('t2', T2_DATA), ('fringe', FRINGE_DATA),
+                        ('corr', CORR_DATA), ('cal', CAL_DATA)]:
+        MEM_ETCD.put('/cnf/' + name, json.dumps(value))
+
+
+def make_conf():
+    return cnf.Conf(client=MEM_ETCD)
+
+
 class TestCnf(unittest.TestCase):
     """This class is applying unit tests to the Conf class in
     cnf.py
@@ -159,32 +176,32 @@ class TestCnf(unittest.TestCase):
         self.assertRaises(FileNotFoundError, cnf.Conf, 'abcd', 'efgh', False)
 
     def test_c_tor(self):
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         self.assertIsInstance(my_cnf, cnf.Conf)
 
     def test_list(self):
         test_list = ['t2', 'corr', 'fringe', 'cal', 'snap', 'pipeline', 'search', 'minmax_ant', 'minmax_beb', 'minmax_service']
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         my_list = my_cnf.list()
         self.assertEqual(my_list, test_list)
 
     def test_t2_no_etcd(self):
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         t2_cnf = my_cnf.get('t2')
         self.assertEqual(t2_cnf.keys(), T2_DATA.keys())
 
     def test_fringe_no_etcd(self):
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         fringe_cnf = my_cnf.get('fringe')
         self.assertEqual(fringe_cnf.keys(), FRINGE_DATA.keys())
         
     def test_corr_no_etcd(self):
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         corr_cnf = my_cnf.get('corr')
         self.assertEqual(corr_cnf.keys(), CORR_DATA.keys())
         
     def test_cal_no_etcd(self):
-        my_cnf = cnf.Conf()
+        my_cnf = make_conf()
         cal_cnf = my_cnf.get('cal')
         self.assertEqual(cal_cnf.keys(), CAL_DATA.keys())
         
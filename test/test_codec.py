@@ -0,0 +1,101 @@
+"""Test code for codec.py
+   execute 'pytest' to run tests.
+"""
+
+import sys
+import json
+import math
+import datetime
+from pathlib import Path
+import unittest
+import numpy as np
+sys.path.append(str(Path('..')))
+import dsautils.codec as codec
+
+
+def strict(val):
+    raise ValueError
+
+
+class TestCodec(unittest.TestCase):
+    """Every backend must give the results of the json module."""
+
+    def setUp(self):
+        self.backend = codec.get_backend()
+
+    def tearDown(self):
+        codec.set_backend(self.backend)
+
+    def test_set_backend(self):
+        self.assertRaises(ValueError, codec.set_backend, 'abcd')
+        codec.set_backend('json')
+        self.assertEqual(codec.get_backend(), 'json')
+
+    def test_dumps(self):
+        values = [{'ant_el': 45.5, 'brake_on': False, 'pol': ['A', 'B']},
+                  {'value': None}, {1: 'one'}, {'value': 2**70}, {'value': 1e20}]
+        for backend in codec.BACKENDS:
+            codec.set_backend(backend)
+            for value in values:
+                self.assertEqual(json.loads(codec.dumps(value)), json.loads(json.dumps(value)))
+            self.assertRaises(TypeError, codec.dumps, {'time': datetime.datetime.now()})
+
+    def test_dumps_nan(self):
+        for backend in codec.BACKENDS:
+            codec.set_backend(backend)
+            for val in (math.nan, math.inf, -math.inf):
+                self.assertRaises(ValueError, codec.dumps, {'value': val})
+                self.assertEqual(codec.dumps({'value': [val]}, strict_json=False),
+                                 json.dumps({'value': [val]}))
+
+    def test_loads(self):
+        docs = ['{"value": 1}', b'{"value": [1.5, true, null]}',
+                '{"value": 1180591620717411303424}', '{"value": NaN}',
+                '{"value": Infinity}', '{"value": -Infinity}']
+        for backend in codec.BACKENDS:
+            codec.set_backend(backend)
+            for doc in docs:
+                self.assertEqual(repr(codec.loads(doc)), repr(json.loads(doc)))
+            for doc in docs[3:]:
+                self.assertRaises(ValueError, codec.loads, doc, strict)
+            self.assertRaises(ValueError, codec.loads, '{"value": 1}x')
+
+
+class TestEnvelope(unittest.TestCase):
+    """Binary envelopes for numpy arrays."""
+
+    def test_array(self):
+        arrays = [np.random.rand(2, 6144).astype(np.float32), np.arange(10)[::2],
+                  np.asfortranarray(np.ones((3, 4))), np.array(5, dtype='>i4'),
+                  np.zeros((0, 3)), np.zeros(3, dtype=[('a', '<f4'), ('b', 'u1', (2,))])]
+        for arr in arrays:
+            for compress in (False, True):
+                data = codec.pack_array(arr, compress)
+                self.assertTrue(codec.is_envelope(data))
+                out = codec.decode_payload(data)
+                self.assertEqual(out.dtype, arr.dtype)
+                self.assertEqual(out.shape, arr.shape)
+                np.testing.assert_array_equal(out, arr)
+        self.assertRaises(ValueError, codec.pack_array, np.array([{}]))
+
+    def test_dict(self):
+        value = {'time': 59000.5, 'pol': ['A', 'B'],
+                 'gainamp': np.random.rand(2, 2048), 'delay': np.arange(4, dtype=np.int16)}
+        out = codec.decode_payload(codec.pack_dict(value, compress=True))
+        self.assertEqual(sorted(out), sorted(value))
+        self.assertEqual(out['pol'], ['A', 'B'])
+        np.testing.assert_array_equal(out['gainamp'], value['gainamp'])
+        self.assertEqual(out['delay'].dtype, np.int16)
+
+    def test_dict_nan(self):
+        self.assertRaises(ValueError, codec.pack_dict, {'value': math.nan})
+        data = codec.pack_dict({'value': math.nan, 'arr': np.array([math.nan])},
+                               strict_json=False)
+        self.assertRaises(ValueError, codec.decode_payload, data, strict)
+        out = codec.decode_payload(data)
+        self.assertTrue(math.isnan(out['value']))
+        self.assertTrue(np.isnan(out['arr'][0]))
+
+    def test_json(self):
+        self.assertEqual(codec.decode_payload(b'{"value": 1}'), {'value': 1})
+        self.assertFalse(codec.is_envelope(b'{"value": 1}'))
@@ -0,0 +1,40 @@
+"""Test code for connections.py
+   execute 'pytest' to run tests.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+import unittest
+sys.path.append(str(Path('..')))
+from dsautils import connections
+
+
+class TestConnections(unittest.TestCase):
+    """This class is applying unit tests to the functions in connections.py
+    """
+
+    def tearDown(self):
+        connections.set_client('store', None)
+
+    def test_import_is_lazy(self):
+        code = ('import dsautils.connections as c, dsautils.coordinates, sys; '
+                'print(len(c._CLIENTS), "influxdb" in sys.modules)')
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                             text=True, check=True).stdout.split()
+        self.assertEqual(out, ['0', 'False'])
+
+    def test_set_client(self):
+        fake = object()
+        connections.set_client('store', fake)
+        self.assertIs(connections.get_store(), fake)
+        self.assertIs(connections.get_store(), fake)
+        connections.set_client('store', None)
+        self.assertNotIn('store', connections._CLIENTS)
+
+    def test_created_once(self):
+        calls = []
+        factory = lambda: calls.append(1) or object()
+        first = connections._get('store', factory)
+        self.assertIs(connections._get('store', factory), first)
+        self.assertEqual(len(calls), 1)
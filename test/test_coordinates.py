@@ -0,0 +1,120 @@
+"""Test code for coordinates.py
+   execute 'pytest' to run tests.
+"""
+
+import re
+import sys
+from pathlib import Path
+import unittest
+import numpy as np
+import pandas
+import astropy.units as u
+from astropy.time import Time
+sys.path.append(str(Path('..')))
+import dsautils.coordinates as coordinates
+from dsautils import connections
+
+
+class FakeDataFrameClient:
+    """Stand-in for influxdb.DataFrameClient answering time-window SELECTs
+    from a synthetic table sampled every 250 ms. Windows starting in every
+    seventh minute are empty, and one column has occasional NaNs.
+    """
+
+    def __init__(self):
+        self.nrequests = 0
+
+    def query(self, query, method='GET', **kwargs):
+        self.nrequests += 1
+        results = [self._statement(stmt) for stmt in query.split(';')]
+        if len(results) == 1:
+            return results[0]
+        return results
+
+    def _statement(self, stmt):
+        table = re.search(r'FROM "(\w+)"', stmt).group(1)
+        keys = [key.strip() for key in re.search(r'SELECT (.*) FROM', stmt).group(1).split(',')]
+        start, stop = (int(t) for t in re.search(r'time >= (-?\d+)ms and time < (-?\d+)ms',
+                                                  stmt).groups())
+        if (start//60000) % 7 == 0:
+            return {}
+        times = np.arange(start - start % 250 + 250, stop, 250)
+        data = {}
+        for idx, key in enumerate(keys):
+            data[key] = np.sin(times/1e7 + idx) + times % 1000
+            if idx == 1:
+                data[key][times % 3000000 < 250] = np.nan
+        return {table: pandas.DataFrame(data, index=pandas.to_datetime(times, unit='ms'))}
+
+
+def legacy_history(client, tablename, keys, num_days, tavg, selection, obstime):
+    """get_history as it was: one query per 10 minute window."""
+    df = pandas.DataFrame()
+    for i in range(24*6*num_days):
+        time_ago = obstime-i*10*u.min
+        time_ago_ms = int(time_ago.unix*1000)
+        query = f'SELECT {", ".join(keys)} FROM "{tablename}" WHERE time >= {time_ago_ms-tavg//2}ms and time < {time_ago_ms+tavg//2}ms'
+        if selection is not None:
+            query += f' and {selection}'
+        temp_df = client.query(query)
+        if tablename in temp_df:
+            temp_df = temp_df[tablename]
+            temp_df.reset_index(inplace=True, drop=True)
+            temp_dict = pandas.DataFrame.from_dict({'time': [time_ago.mjd]})
+            for key in keys:
+                temp_dict[key] = np.median(temp_df[key].astype(float))
+            df = pandas.concat([df, pandas.DataFrame.from_dict(temp_dict)])
+    df.reset_index(inplace=True, drop=True)
+    return df
+
+
+class TestCoordinates(unittest.TestCase):
+    """This class is applying unit tests to the functions in coordinates.py
+    """
+
+    def setUp(self):
+        self.influx = FakeDataFrameClient()
+        connections.set_client('influx', self.influx)
+
+    def tearDown(self):
+        connections.set_client('influx', None)
+
+    def test_get_history(self):
+        obstime = Time('2021-06-01T12:00:00')
+        keys = ['ant_el', 'ant_cmd_el', 'ant_el_err']
+        selection = 'ant_el_err < 0.25'
+        expected = legacy_history(FakeDataFrameClient(), 'antmon', keys, 2, 1000,
+                                  selection, obstime)
+        rtn = coordinates.get_history('antmon', keys, 2, selection=selection,
+                                      obstime=obstime)
+        pandas.testing.assert_frame_equal(rtn, expected)
+        self.assertTrue(rtn['ant_cmd_el'].isna().any())
+        self.assertEqual(self.influx.nrequests,
+                         -(-2*24*6//coordinates.HISTORY_BATCH))
+
+    def test_get_history_tavg(self):
+        obstime = Time('2021-06-01T12:03:00')
+        keys = ['last_seq', 'corr_num']
+        expected = legacy_history(FakeDataFrameClient(), 'corrmon', keys, 1, 60000,
+                                  None, obstime)
+        rtn = coordinates.get_history('corrmon', keys, 1, tavg=60000, obstime=obstime)
+        pandas.testing.assert_frame_equal(rtn, expected)
+
+    def test_get_pointings(self):
+        elevation = coordinates.get_elevation
+        coordinates.get_elevation = lambda tobs=None: 71.6*u.deg
+        try:
+            obstimes = Time(59400.1, format='mjd') + np.array([0, 0, 1, 1, 2])*u.min
+            ibeams = np.array([0, 127, 64, 255, 200])
+            jbeams = np.array([256, 300, 383, 511, 400])
+            ra, dec = coordinates.get_pointings(ibeams, jbeams, obstimes)
+            for i in range(len(ibeams)):
+                ra1, dec1 = coordinates.get_pointing(ibeams[i], jbeams[i], obstimes[i])
+                self.assertAlmostEqual(ra[i], ra1.deg, places=10)
+                self.assertAlmostEqual(dec[i], dec1.deg, places=10)
+            ra, dec = coordinates.get_pointings(ibeams, obstimes=obstimes[0])
+            ra1, dec1 = coordinates.get_pointing(ibeams[-1], obstime=obstimes[0])
+            self.assertAlmostEqual(ra[-1], ra1.deg, places=10)
+            self.assertAlmostEqual(dec[-1], dec1.deg, places=10)
+        finally:
+            coordinates.get_elevation = elevation
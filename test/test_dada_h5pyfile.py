@@ -0,0 +1,98 @@
+"""Test code for dada_h5pyfile.py
+   execute 'pytest' to run tests.
+"""
+
+import os
+import struct
+import tempfile
+import sys
+from pathlib import Path
+import unittest
+import numpy as np
+sys.path.append(str(Path('..')))
+import dsautils.dada_h5pyfile as dh
+from bench.bench_heimdall import legacy_unpack_message
+
+
+def make_message(i):
+    """Pack a heimdall candidate the way heimdall writes it."""
+    return (struct.pack('=QfQfQQfQ', 1000*i, 8.5+i, 1000*i+4321, 0.25*i, i % 5,
+                        100+i, 300.125+i, 3+i)
+            + np.float128(59400.123456789 + i/86400).tobytes()
+            + struct.pack('=iii', 59400, 2, 57)
+            + np.float128(12.345678901234567 + i).tobytes(), 1)
+
+
+def format_metadata(cand):
+    """Convert a decoded candidate to the string array legacy_unpack_message
+    returns, with the long double MJD and seconds written to 30 decimal places.
+    """
+    metadata = [cand[name] for name in dh.HEIMDALL_CAND_DTYPE.names]
+    metadata[8] = np.bytes_("%0.30f" % cand['MJD'])
+    metadata[12] = np.bytes_("%0.30f" % cand['cand_sec'])
+    return np.array(metadata)
+
+
+class TestDadaH5pyfile(unittest.TestCase):
+    """This class is applying unit tests to the functions in dada_h5pyfile.py
+    """
+
+    def test_dtype(self):
+        self.assertEqual(dh.HEIMDALL_CAND_DTYPE.itemsize, 96)
+
+    def test_unpack_messages(self):
+        messages = [make_message(i) for i in range(50)]
+        cands = dh.unpack_messages(messages)
+        self.assertEqual(len(cands), 50)
+        np.testing.assert_array_equal(cands['samp_idx'], 1000*np.arange(50)+4321)
+        np.testing.assert_array_equal(cands['h_group_dms'],
+                                      np.float32(300.125+np.arange(50)))
+        for dat, cand in zip(messages, cands):
+            np.testing.assert_array_equal(format_metadata(cand),
+                                          legacy_unpack_message(dat))
+
+    def test_unpack_message(self):
+        dat = make_message(7)
+        cand = dh.unpack_message(dat)
+        self.assertEqual(int(cand[2]), 7000+4321)
+        self.assertEqual(cand['cand_minute'], 57)
+        self.assertEqual(cand['MJD'], np.float128(59400.123456789 + 7/86400))
+
+    def test_candidate_writer(self):
+        cands = dh.unpack_messages([make_message(i) for i in range(10)])
+        rng = np.random.default_rng(1)
+        cutouts = [rng.integers(0, 2**16, (16, 20+i), dtype=np.uint16) for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'candidates.h5')
+            with dh.CandidateWriter(fname, nchan=16, flush_bytes=3000, chunk_samples=32,
+                                    compression='gzip') as writer:
+                for cutout, cand in zip(cutouts[:6], cands[:6]):
+                    writer.append(cutout, cand)
+                self.assertEqual(len(writer), 6)
+                self.assertGreater(writer.table.shape[0], 0)
+                self.assertLess(writer.table.shape[0], 6)
+            with dh.CandidateWriter(fname, nchan=16) as writer:
+                for cutout, cand in zip(cutouts[6:], cands[6:]):
+                    writer.append(cutout, cand)
+            with dh.CandidateWriter(fname, nchan=16) as writer:
+                self.assertEqual(len(writer), 10)
+                self.assertEqual(writer.data.shape, (16, sum(c.shape[1] for c in cutouts)))
+                for i in range(10):
+                    data, row = writer.read(i)
+                    np.testing.assert_array_equal(data, cutouts[i])
+                    self.assertEqual(row['samp_idx'], cands[i]['samp_idx'])
+                    self.assertEqual(row['MJD'], cands[i]['MJD'])
+
+    def test_flush_if_due(self):
+        cand = dh.unpack_message(make_message(0))
+        cutout = np.ones((16, 20), dtype=np.uint16)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'candidates.h5')
+            with dh.CandidateWriter(fname, nchan=16, flush_interval=60.) as writer:
+                writer.append(cutout, cand)
+                writer.flush_if_due()
+                self.assertEqual(writer.table.shape[0], 0)
+                writer.flush_interval = 0.
+                writer.flush_if_due()
+                self.assertEqual(writer.table.shape[0], 1)
+                np.testing.assert_array_equal(writer.read(0)[0], cutout)
@@ -0,0 +1,70 @@
+"""Test code for dsa_ant.py
+   execute 'pytest' to run tests.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+sys.path.append(str(Path('..')))
+import dsautils.dsa_ant as ant
+
+
+class FakeStore:
+    """Records put_many calls instead of writing to etcd."""
+
+    def __init__(self):
+        self.txns = []
+        self.mux = []
+        self.watches = []
+
+    def put_many(self, values):
+        self.txns.append(values)
+
+    def enable_watch_mux(self, prefix):
+        self.mux.append(prefix)
+
+    def add_watch(self, key, cb_func, executor=None):
+        self.watches.append(key)
+        return -len(self.watches)
+
+
+class TestDsaAnt(unittest.TestCase):
+    """This class is applying unit tests to the functions in dsa_ant.py
+    """
+
+    def setUp(self):
+        self.ants = ant.Ant([24, 25, 99])
+        self.ants.my_store = FakeStore()
+        self.ants.el_offset = {24: -0.03, 25: -1.35}
+
+    def test_move(self):
+        self.ants.move(60.)
+        self.assertEqual(self.ants.my_store.txns,
+                         [{'/cmd/ant/{}'.format(a): {'cmd': 'move', 'val': 60.}
+                           for a in [24, 25, 99]}])
+
+    def test_move_offset(self):
+        self.ants.move(60., apply_offset=True)
+        txn = self.ants.my_store.txns[0]
+        self.assertAlmostEqual(txn['/cmd/ant/24']['val'], 60.03)
+        self.assertAlmostEqual(txn['/cmd/ant/25']['val'], 61.35)
+        self.assertEqual(txn['/cmd/ant/99']['val'], 60.)
+        self.ants.move([50., 51., 52.], apply_offset=True)
+        self.assertAlmostEqual(self.ants.my_store.txns[1]['/cmd/ant/25']['val'], 52.35)
+        all_ants = ant.Ant(0)
+        all_ants.my_store = FakeStore()
+        with self.assertRaises(ValueError):
+            all_ants.move(60., apply_offset=True)
+
+    def test_noise(self):
+        self.ants.noise_ab_on(True)
+        txns = self.ants.my_store.txns
+        self.assertEqual(len(txns), 2)
+        self.assertEqual(txns[0]['/cmd/ant/99'], {'cmd': 'noise_a_on', 'val': True})
+        self.assertEqual(txns[1]['/cmd/ant/24'], {'cmd': 'noise_b_on', 'val': True})
+
+    def test_add_watch(self):
+        ids = self.ants.add_watch(print, [24, 25])
+        self.assertEqual(ids, [-1, -2])
+        self.assertEqual(self.ants.my_store.mux, ['/mon/ant/'])
+        self.assertEqual(self.ants.my_store.watches, ['/mon/ant/24', '/mon/ant/25'])
@@ -0,0 +1,59 @@
+"""Test code for dsa_async_store.py
+   execute 'pytest' to run tests.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+import unittest
+sys.path.append(str(Path('..')))
+import dsautils.dsa_async_store as das
+from pkg_resources import Requirement, resource_filename
+etcdconf = resource_filename(Requirement.parse("dsa110-pyutils"), "dsautils/conf/etcdConfig.yml")
+
+
+class TestAsyncDsaStore(unittest.TestCase):
+    """This class is applying unit tests to the AsyncDsaStore class in
+    dsa_async_store.py
+    """
+
+    def test_c_tor_exception(self):
+        self.assertRaises(FileNotFoundError, das.AsyncDsaStore, 'abcd')
+
+    def test_put_nan(self):
+        async def run():
+            async with das.AsyncDsaStore(etcdconf) as store:
+                await store.put_dict('/test/async/nan', {'a': float('nan')})
+        self.assertRaises(ValueError, asyncio.run, run())
+
+    def test_put_get(self):
+        async def run():
+            async with das.AsyncDsaStore(etcdconf, timeout=5.) as store:
+                await asyncio.gather(*[store.put_dict('/test/async/{}'.format(i), {'i': i})
+                                       for i in range(10)])
+                values = await asyncio.gather(*[store.get_dict('/test/async/{}'.format(i))
+                                                for i in range(10)])
+                prefix = await store.get_prefix('/test/async/')
+                await store.delete('/test/async/', prefix=True)
+                return values, prefix
+        values, prefix = asyncio.run(run())
+        self.assertEqual(values, [{'i': i} for i in range(10)])
+        self.assertEqual(prefix['/test/async/3'], {'i': 3})
+
+    def test_watch_prefix(self):
+        async def run():
+            got = []
+            async with das.AsyncDsaStore(etcdconf, timeout=5.) as store:
+                async with store.watch_prefix('/test/asyncwatch/') as events:
+                    async def consume():
+                        async for item in events:
+                            got.append(item)
+                            if len(got) == 2:
+                                events.cancel()
+                    task = asyncio.ensure_future(consume())
+                    await store.put_dict('/test/asyncwatch/1', {'v': 1})
+                    await store.delete('/test/asyncwatch/1')
+                    await asyncio.wait_for(task, 5.)
+            return got
+        self.assertEqual(asyncio.run(run()),
+                         [('/test/asyncwatch/1', {'v': 1}), ('/test/asyncwatch/1', None)])
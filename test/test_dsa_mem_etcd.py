@@ -0,0 +1,105 @@
+"""Test code for dsa_mem_etcd.py
+   execute 'pytest' to run tests.
+"""
+
+import sys
+import time
+from pathlib import Path
+import unittest
+sys.path.append(str(Path('..')))
+import dsautils.dsa_mem_etcd as dme
+import dsautils.dsa_store as ds
+import dsautils.cnf as cnf
+
+
+class TestMemEtcd(unittest.TestCase):
+    """This class is applying unit tests to the MemEtcd class in
+    dsa_mem_etcd.py
+    """
+
+    def test_put_get_delete(self):
+        mem = dme.MemEtcd()
+        self.assertEqual(mem.get('/a'), (None, None))
+        mem.put('/a', 'one')
+        value, meta = mem.get('/a')
+        self.assertEqual(value, b'one')
+        self.assertEqual(meta.mod_revision, mem.get_revision())
+        mem.put('/a/b', 'two')
+        self.assertEqual([v for v, m in mem.get_prefix('/a/')], [b'two'])
+        self.assertTrue(mem.delete('/a'))
+        self.assertFalse(mem.delete('/a'))
+
+    def test_revisions(self):
+        mem = dme.MemEtcd()
+        rev = mem.get_revision()
+        mem.put('/a', '1')
+        self.assertEqual(mem.get_revision(), rev + 1)
+        mem.transaction(compare=[],
+                        success=[mem.transactions.put('/b', '2'),
+                                 mem.transactions.put('/c', '3')],
+                        failure=[])
+        self.assertEqual(mem.get_revision(), rev + 2)
+        self.assertEqual(mem.get('/b')[1].mod_revision, mem.get('/c')[1].mod_revision)
+        mem.transaction(compare=[], success=[mem.transactions.get('/b')], failure=[])
+        self.assertEqual(mem.get_revision(), rev + 2)
+
+    def test_compare(self):
+        mem = dme.MemEtcd()
+        mem.put('/a', '1')
+        ok, _ = mem.transaction(compare=[mem.transactions.value('/a') == '2'],
+                                success=[mem.transactions.put('/a', '3')],
+                                failure=[mem.transactions.get('/a')])
+        self.assertFalse(ok)
+        self.assertEqual(mem.get('/a')[0], b'1')
+
+    def test_watch(self):
+        mem = dme.MemEtcd()
+        got = []
+        watch_id = mem.add_watch_prefix_callback('/w/', lambda resp: got.extend(resp.events))
+        mem.put('/w/1', 'x')
+        mem.delete('/w/1')
+        time.sleep(0.1)
+        self.assertEqual([type(ev).__name__ for ev in got], ['PutEvent', 'DeleteEvent'])
+        mem.cancel_watch(watch_id)
+        mem.put('/w/1', 'y')
+        time.sleep(0.1)
+        self.assertEqual(len(got), 2)
+
+    def test_watch_replay(self):
+        mem = dme.MemEtcd()
+        got = []
+        # hold the dispatcher back so the put is still queued when the
+        # watch replays it
+        with mem._lock:
+            mem.put('/r/1', 'x')
+            mem.add_watch_callback('/r/1', lambda resp: got.extend(resp.events),
+                                   start_revision=1)
+        time.sleep(0.1)
+        self.assertEqual([ev.value for ev in got], [b'x'])
+
+    def test_watch_callback_error(self):
+        mem = dme.MemEtcd()
+
+        def broken(resp):
+            raise TypeError('broken callback')
+
+        mem.add_watch_callback('/e', broken)
+        with self.assertLogs('dsautils.dsa_mem_etcd', 'ERROR') as logs:
+            mem.put('/e', 'x')
+            time.sleep(0.1)
+        self.assertIn('broken callback', '\n'.join(logs.output))
+
+    def test_latency(self):
+        mem = dme.MemEtcd(rtt=0.01, jitter=0.001, seed=1)
+        start = time.monotonic()
+        for i in range(5):
+            mem.put('/a', str(i))
+        self.assertGreater(time.monotonic() - start, 0.04)
+        self.assertEqual(mem.round_trips, 5)
+
+    def test_clients(self):
+        mem = dme.MemEtcd()
+        store = ds.DsaStore(client=mem)
+        self.assertIs(store.get_etcd(), mem)
+        store.put_dict('/cnf/t2', {'min_dm': 50.0})
+        self.assertEqual(cnf.Conf(client=mem).get('t2'), {'min_dm': 50.0})
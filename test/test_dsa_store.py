@@ -2,15 +2,28 @@
    execute 'pytest' to run tests.
 """
 
+import os
 import sys
 import math
+import time
+import threading
+import numpy as np
 from pathlib import Path
 import unittest
 sys.path.append(str(Path('..')))
 import dsautils.dsa_store as ds
+import dsautils.dsa_mem_etcd as dme
 from pkg_resources import Requirement, resource_filename
 etcdconf = resource_filename(Requirement.parse("dsa110-pyutils"), "dsautils/conf/etcdConfig.yml")
 
+# DSA_TEST_ETCD=mem runs the tests against the in-process etcd stand-in
+MEM_ETCD = dme.MemEtcd() if os.environ.get('DSA_TEST_ETCD') == 'mem' else None
+
+
+def make_store():
+    return ds.DsaStore(etcdconf, client=MEM_ETCD)
+
+
 class TestDsaStore(unittest.TestCase):
     """This class is applying unit tests to the DsaStore class in
     dsa_etcd.py
@@ -21,11 +34,11 @@ class TestDsaStore(unittest.TestCase):
         self.assertRaises(FileNotFoundError, ds.DsaStore, 'abcd')
 
     def test_c_tor(self):
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         self.assertIsInstance(my_etcd, ds.DsaStore)
 
     def test_put_get(self):
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         test_dict = {}
         test_dict['value'] = 23.4
         test_dict['value2'] = 23
@@ -35,7 +48,7 @@ class TestDsaStore(unittest.TestCase):
         self.assertEqual(rtn_dict, test_dict)
 
     def put_bad_val(self, val):
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         test_bad_val = {}
         test_bad_val['value'] = val
         a = 0
@@ -59,7 +72,7 @@ class TestDsaStore(unittest.TestCase):
         self.put_bad_val(-math.inf)
         
     def test_put_NaN_allow(self):
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         test_dict = {}
         test_dict['value'] = math.nan
         test_dict['value2'] = 23
@@ -77,7 +90,7 @@ class TestDsaStore(unittest.TestCase):
     def _get_val(self, val):
         """Helper to check whether valueError is thrown when val = NaN, -Infinity, Infinity
         """
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         test_dict = {}
         test_dict['value'] = val
         my_etcd.put_dict('/test/1', test_dict, False)
@@ -103,7 +116,7 @@ class TestDsaStore(unittest.TestCase):
     def _get_val_allow(self, val):
         """Helper to check whether val = NaN, -Infinity, Infinity is allowed. ie. no exceptions thrown.
         """
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         test_dict = {}
         test_dict['value'] = val
         my_etcd.put_dict('/test/1', test_dict, False)
@@ -127,6 +140,177 @@ class TestDsaStore(unittest.TestCase):
         self._get_val_allow(math.inf)
 
     def test_etcd(self):
-        my_etcd = ds.DsaStore(etcdconf)
+        my_etcd = make_store()
         rtn_etcd = my_etcd.get_etcd()
         #self.assertIsInstance(rtn_etcd, Etcd3Client )
+
+    def test_get_prefix_dicts(self):
+        my_etcd = make_store()
+        my_etcd.put_dict('/test/prefix/1', {'value': 1})
+        my_etcd.put_dict('/test/prefix/2', {'value': 2})
+        rtn = my_etcd.get_prefix_dicts('/test/prefix/')
+        self.assertEqual(rtn['/test/prefix/1'], {'value': 1})
+        self.assertEqual(rtn['/test/prefix/2'], {'value': 2})
+
+    def test_get_many(self):
+        my_etcd = make_store()
+        keys = ['/test/many/{}'.format(i) for i in range(ds.MAX_TXN_OPS+2)]
+        for i, key in enumerate(keys):
+            my_etcd.put_dict(key, {'value': i})
+        my_etcd.delete('/test/many/missing')
+        rtn = my_etcd.get_many(keys + ['/test/many/missing'])
+        for i, key in enumerate(keys):
+            self.assertEqual(rtn[key], {'value': i})
+        self.assertIsNone(rtn['/test/many/missing'])
+
+    def test_put_many(self):
+        my_etcd = make_store()
+        values = {'/test/putmany/{}'.format(i): {'value': i}
+                  for i in range(ds.MAX_TXN_OPS+2)}
+        my_etcd.put_many(values)
+        self.assertEqual(my_etcd.get_many(list(values)), values)
+        with self.assertRaises(ValueError):
+            my_etcd.put_many({'/test/putmany/0': {'value': -1},
+                              '/test/putmany/1': {'value': float('nan')}})
+        self.assertEqual(my_etcd.get_dict('/test/putmany/0'), {'value': 0})
+
+    def test_watch_mux(self):
+        my_etcd = make_store()
+        got = []
+        my_etcd.enable_watch_mux('/test/mux/')
+        ids = [my_etcd.add_watch('/test/mux/{}'.format(i),
+                                 lambda payload, i=i: got.append((i, payload)))
+               for i in range(4)]
+        self.assertTrue(all(watch_id < 0 for watch_id in ids))
+        my_etcd.cancel(ids[0])
+        for i in range(5):
+            my_etcd.put_dict('/test/mux/{}'.format(i), {'value': i})
+        time.sleep(1)
+        self.assertEqual(sorted(got), [(i, {'value': i}) for i in range(1, 4)])
+        my_etcd.disable_watch_mux('/test/mux/')
+
+    def test_watch_mux_callback_error(self):
+        my_etcd = make_store()
+        got = []
+        my_etcd.enable_watch_mux('/test/muxerr/')
+
+        def broken(payload):
+            raise TypeError('broken callback')
+
+        my_etcd.add_watch('/test/muxerr/1', broken)
+        my_etcd.add_watch('/test/muxerr/1', got.append)
+        with self.assertLogs('dsautils.dsa_store', 'ERROR') as logs:
+            my_etcd.put_dict('/test/muxerr/1', {'value': 1})
+            time.sleep(1)
+        self.assertIn('broken callback', '\n'.join(logs.output))
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(got, [{'value': 1}])
+        my_etcd.disable_watch_mux('/test/muxerr/')
+
+    def test_watch_max_rate(self):
+        my_etcd = make_store()
+        got = []
+        watch_id = my_etcd.add_watch('/test/rate', got.append, max_rate=2.)
+        for i in range(20):
+            my_etcd.put_dict('/test/rate', {'value': i})
+        time.sleep(1.5)
+        stats = my_etcd.get_watch_stats(watch_id)
+        self.assertEqual(got[-1], {'value': 19})
+        self.assertEqual(stats['delivered'], len(got))
+        self.assertEqual(stats['delivered'] + stats['coalesced'], 20)
+        my_etcd.cancel(watch_id)
+        self.assertIsNone(my_etcd.get_watch_stats(watch_id))
+
+    def test_cache(self):
+        my_etcd = make_store()
+        writer = make_store()
+        writer.put_dict('/test/cache/1', {'value': 1})
+        my_etcd.enable_cache('/test/cache/')
+        self.assertEqual(my_etcd.get_dict('/test/cache/1'), {'value': 1})
+        rev = my_etcd.get_cache_revision()
+        writer.put_dict('/test/cache/1', {'value': 2})
+        self.assertEqual(my_etcd.get_dict('/test/cache/1', max_age=0.),
+                         {'value': 2})
+        time.sleep(1)
+        self.assertGreater(my_etcd.get_cache_revision(), rev)
+        my_etcd.disable_cache()
+        self.assertIsNone(my_etcd.get_cache_revision())
+
+    def test_put_get_array(self):
+        my_etcd = make_store()
+        arr = np.random.rand(2, 6144).astype(np.float32)
+        my_etcd.put_array('/test/array', arr, compress=True)
+        np.testing.assert_array_equal(my_etcd.get_array('/test/array'), arr)
+        my_etcd.put_dict_arrays('/test/dictarray', {'time': 1., 'gainamp': arr[0]})
+        value = my_etcd.get_dict('/test/dictarray')
+        self.assertEqual(value['time'], 1.)
+        np.testing.assert_array_equal(value['gainamp'], arr[0])
+        self.assertRaises(ValueError, my_etcd.get_array, '/test/dictarray')
+
+    def test_watch_max_rate_mux(self):
+        my_etcd = make_store()
+        my_etcd.enable_watch_mux('/test/ratemux/')
+
+        def broken(payload):
+            raise TypeError('broken callback')
+
+        watch_id = my_etcd.add_watch('/test/ratemux/1', broken, max_rate=10.)
+        with self.assertLogs('dsautils.dsa_store', 'ERROR'):
+            my_etcd.put_dict('/test/ratemux/1', {'value': 1})
+            time.sleep(1)
+        stats = my_etcd.get_watch_stats(watch_id)
+        self.assertEqual((stats['delivered'], stats['failed']), (0, 1))
+        coalescer = my_etcd._coalescers[watch_id]
+        my_etcd.disable_watch_mux('/test/ratemux/')
+        self.assertIsNone(my_etcd.get_watch_stats(watch_id))
+        coalescer._thread.join(1.)
+        self.assertFalse(coalescer._thread.is_alive())
+
+
+class TestKeyOrderedExecutor(unittest.TestCase):
+    """Tests of KeyOrderedExecutor, which needs no etcd server."""
+
+    def wait_idle(self, executor, timeout=5.):
+        deadline = time.monotonic() + timeout
+        while executor.stats()['queue_depth']:
+            self.assertLess(time.monotonic(), deadline, 'executor did not drain')
+            time.sleep(0.01)
+
+    def test_order_and_parallelism(self):
+        executor = ds.KeyOrderedExecutor(max_workers=4)
+        got = {}
+        active = set()
+        most = []
+        lock = threading.Lock()
+
+        def work(key, i):
+            with lock:
+                active.add(key)
+                most.append(len(active))
+            time.sleep(0.002)
+            with lock:
+                got.setdefault(key, []).append(i)
+                active.discard(key)
+
+        for i in range(20):
+            for key in 'abcd':
+                executor.submit(key, work, key, i)
+        self.wait_idle(executor)
+        executor.shutdown()
+        for key in 'abcd':
+            self.assertEqual(got[key], list(range(20)))
+        self.assertGreater(max(most), 1)
+        stats = executor.stats()
+        self.assertEqual(stats['completed'], 80)
+        self.assertEqual(stats['errors'], 0)
+        self.assertGreater(stats['mean_run'], 0.)
+
+    def test_errors_and_shutdown(self):
+        executor = ds.KeyOrderedExecutor(max_workers=1)
+        with self.assertLogs('dsautils.dsa_store', 'ERROR') as logs:
+            executor.submit('a', lambda: 1/0)
+            self.wait_idle(executor)
+        self.assertIn('ZeroDivisionError', '\n'.join(logs.output))
+        self.assertEqual(executor.stats()['errors'], 1)
+        executor.shutdown()
+        self.assertRaises(RuntimeError, executor.submit, 'a', print)
@@ -1,4 +1,8 @@
 from logging.handlers import SysLogHandler as Syslog
+import io
+import json
+import logging
+import queue
 import sys
 from pathlib import Path
 import unittest
@@ -89,3 +93,61 @@ class TestDsaSyslogger(unittest.TestCase):
             p.start()
             p.join()
 
+
+    def test_fast_mjd(self):
+        from astropy.time import Time
+        self.assertAlmostEqual(dsl.fast_mjd(), Time.now().mjd, places=6)
+        self.assertEqual(dsl.fast_mjd(0.), dsl.MJD_UNIX_EPOCH)
+
+    def test_log_stream(self):
+        stream = io.StringIO()
+        loggr = dsl.DsaSyslogger(subsystem_name="test", log_level=logging.INFO,
+                                 logger_name="TestDsaSyslogger_stream", log_stream=stream)
+        loggr.function('test_log_stream')
+        loggr.info("stream message")
+        loggr.debug("filtered message")
+        out = stream.getvalue()
+        msg = json.loads(out[out.index('{'):out.rindex('}')+1])
+        self.assertEqual(msg['msg'], "stream message")
+        self.assertEqual(msg['level'], "info")
+        self.assertEqual(msg['function'], "test_log_stream")
+        self.assertAlmostEqual(msg['mjd'], dsl.fast_mjd(), places=3)
+        self.assertNotIn("filtered message", out)
+
+    def test_async(self):
+        stream = io.StringIO()
+        loggr = dsl.DsaSyslogger(subsystem_name="test", log_level=logging.INFO,
+                                 logger_name="TestDsaSyslogger_async", log_stream=stream,
+                                 async_mode=True, queue_size=100)
+        loggr.function('test_async')
+        for idx in range(10):
+            loggr.info("async message {}".format(idx))
+        loggr.stop()
+        out = stream.getvalue()
+        for idx in range(10):
+            self.assertIn("async message {}".format(idx), out)
+        self.assertEqual(loggr.get_dropped(), 0)
+        loggr.info("after stop")
+        self.assertIn("after stop", stream.getvalue())
+        self.assertNotIn(loggr.queue_handler, loggr.log.handlers)
+        loggr.stop()
+
+    def test_bad_overflow(self):
+        self.assertRaises(ValueError, dsl.DsaSyslogger, logger_name="TestDsaSyslogger_bad",
+                          log_stream=io.StringIO(), async_mode=True, overflow='spill')
+
+    def _fill_queue(self, overflow):
+        """Emit 5 records into a queue of size 2 that nothing drains.
+        """
+        handler = dsl.BoundedQueueHandler(queue.Queue(maxsize=2), overflow)
+        for idx in range(5):
+            handler.handle(logging.LogRecord('test', logging.INFO, __file__, 0,
+                                             str(idx), None, None))
+        msgs = [handler.queue.get_nowait().getMessage() for idx in range(2)]
+        return handler.dropped, msgs
+
+    def test_drop_oldest(self):
+        self.assertEqual(self._fill_queue('drop-oldest'), (3, ['3', '4']))
+
+    def test_drop_new(self):
+        self.assertEqual(self._fill_queue('drop-new'), (3, ['0', '1']))
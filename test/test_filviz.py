@@ -0,0 +1,135 @@
+"""Test code for filviz.py
+   execute 'pytest' to run tests.
+"""
+
+import importlib
+import sys
+import os
+import struct
+import tempfile
+import types
+from pathlib import Path
+import unittest
+from unittest import mock
+import numpy as np
+sys.path.append(str(Path('..')))
+
+def _read_string(fh):
+    (nchar,) = struct.unpack('i', fh.read(4))
+    return fh.read(nchar).decode()
+
+
+def read_next_header_keyword(fh):
+    """Stand-in for sigproc.read_next_header_keyword that reads the integer
+    header keywords written by write_fil.
+    """
+    keyword = _read_string(fh)
+    if keyword in ('HEADER_START', 'HEADER_END'):
+        return keyword, None, 0
+    return keyword, struct.unpack('i', fh.read(4))[0], 0
+
+
+def read_header(filename):
+    """Stand-in for sigproc.read_header."""
+    header = {}
+    with open(filename, 'rb') as fh:
+        while True:
+            keyword, value, idx = read_next_header_keyword(fh)
+            if keyword == 'HEADER_END':
+                return header
+            if value is not None:
+                header[keyword] = value
+
+
+filviz = None
+_sigproc_patch = None
+
+
+def setUpModule():
+    """Import filviz, with the stand-ins above as sigproc if it is not
+    installed. tearDownModule takes the stand-in out of sys.modules again.
+    """
+    global filviz, _sigproc_patch
+    try:
+        import sigproc
+    except ImportError:
+        sigproc = types.ModuleType('sigproc')
+        sigproc.read_next_header_keyword = read_next_header_keyword
+        sigproc.read_header = read_header
+        _sigproc_patch = mock.patch.dict(sys.modules, {'sigproc': sigproc})
+        _sigproc_patch.start()
+    filviz = importlib.import_module('dsautils.filviz')
+
+
+def tearDownModule():
+    if _sigproc_patch is not None:
+        _sigproc_patch.stop()
+
+
+def write_fil(filename, data, nsamples=None):
+    """Write data of shape (beam, time, chan) after a sigproc header and
+    return the header length in bytes.
+    """
+    def string(s):
+        return struct.pack('i', len(s)) + s.encode()
+
+    nbits = {np.dtype(dtype): nbits for nbits, dtype in filviz.NBITS_DTYPE.items()}[data.dtype]
+    header = string('HEADER_START')
+    keywords = [('nchans', data.shape[2]), ('nbits', nbits), ('nbeams', data.shape[0]),
+                ('nifs', 1)]
+    if nsamples is not None:
+        keywords.append(('nsamples', nsamples))
+    for keyword, value in keywords:
+        header += string(keyword) + struct.pack('i', value)
+    header += string('HEADER_END')
+    with open(filename, 'wb') as fh:
+        fh.write(header)
+        fh.write(data.tobytes())
+    return len(header)
+
+
+class TestFilReader(unittest.TestCase):
+    """This class is applying unit tests to the FilReader class in
+    filviz.py
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp.name, 'test.fil')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, data, nsamples=None):
+        offset = write_fil(self.filename, data, nsamples)
+        fil = filviz.FilReader(self.filename)
+        self.assertEqual(fil.data_offset, offset)
+        self.assertEqual(fil.dtype, data.dtype)
+        self.assertEqual(fil.data.shape, data.shape)
+        with open(self.filename, 'rb') as fh:
+            fh.seek(offset)
+            plain = np.fromfile(fh, dtype=data.dtype).reshape(data.shape)
+        np.testing.assert_array_equal(fil.data, plain)
+        return fil, plain
+
+    def test_dtypes(self):
+        rng = np.random.default_rng(1)
+        for dtype in (np.uint8, np.uint16, np.float32):
+            data = (rng.random((3, 50, 16))*200).astype(dtype)
+            self.check(data)
+
+    def test_window(self):
+        data = np.arange(4*5000*8, dtype=np.uint16).reshape(4, 5000, 8)
+        fil, plain = self.check(data)
+        np.testing.assert_array_equal(fil.window((1, 2), (100, 4999), (3, 5)),
+                                      plain[1:3, 100:5000, 3:6])
+        # bounds are clipped to the file and may be given in either order
+        np.testing.assert_array_equal(fil.window((10, 2), (-5, 3), None),
+                                      plain[2:, :4, :])
+        # no 4096 sample cap
+        self.assertEqual(fil.window().shape, (4, 5000, 8))
+
+    def test_partial_file(self):
+        data = np.ones((2, 30, 4), dtype=np.uint8)
+        fil, plain = self.check(data, nsamples=100)
+        self.assertEqual(fil.nsamples, 30)
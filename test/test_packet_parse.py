@@ -0,0 +1,139 @@
+"""Test code for packet_parse.py
+   execute 'pytest' to run tests.
+"""
+
+import struct
+import sys
+from pathlib import Path
+import unittest
+import numpy as np
+sys.path.append(str(Path('..')))
+from dsautils import packet_parse as pp
+
+
+def legacy_unpack(packet, ant, pol):
+    """Per-packet decode as done by scripts/packet_parse.py before."""
+    d = np.asarray(struct.unpack('>4616B', packet))[8:]
+    d = (d.reshape((3, 384, 2, 2)))[ant, :, :, pol].ravel()
+    d_r = ((d & 15) << 4)
+    d_i = d & 240
+    return d_r.astype(np.int8)/16, d_i.astype(np.int8)/16
+
+
+def legacy_make_histogram(data, ant=0, pol=0):
+    histo = np.zeros(16)
+    rms = 0.
+    for packet in data:
+        d_r, d_i = legacy_unpack(packet, ant, pol)
+        rms += 0.5*(np.std(d_r)**2.+np.std(d_i)**2.)
+        for i in range(384*2):
+            histo[int(d_r[i])+8] += 1.
+            histo[int(d_i[i])+8] += 1.
+    return histo/np.max(histo), np.sqrt(rms)
+
+
+def legacy_decode_data(data, ant=0, pol=0):
+    spec = np.zeros(384*2)
+    for packet in data:
+        d_r, d_i = legacy_unpack(packet, ant, pol)
+        spec += d_r**2.+d_i**2.
+    return spec.reshape((384, 2)).mean(axis=1)
+
+
+class TestPacketParse(unittest.TestCase):
+    """This class is applying unit tests to the functions in packet_parse.py
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.data = [rng.integers(0, 256, pp.PACKET_SIZE, dtype=np.uint8).tobytes()
+                     for i in range(5)]
+
+    def test_as_array(self):
+        arr = pp.as_array(self.data)
+        self.assertEqual(arr.shape, (5, pp.PACKET_SIZE))
+        self.assertTrue(np.shares_memory(pp.as_array(arr.ravel()), arr))
+
+    def test_decode_voltages(self):
+        real, imag = pp.decode_voltages(self.data)
+        for ant in range(pp.NANT):
+            d_r, d_i = legacy_unpack(self.data[3], ant, 1)
+            np.testing.assert_array_equal(real[3, ant, :, :, 1].ravel(), d_r)
+            np.testing.assert_array_equal(imag[3, ant, :, :, 1].ravel(), d_i)
+
+    def test_make_histogram(self):
+        for ant, pol in [(0, 0), (2, 1)]:
+            histo, rms = pp.make_histogram(self.data, ant, pol)
+            histo0, rms0 = legacy_make_histogram(self.data, ant, pol)
+            np.testing.assert_array_equal(histo, histo0)
+            self.assertAlmostEqual(rms, rms0)
+        counts = pp.histograms(self.data)
+        self.assertEqual(counts.shape, (pp.NANT, pp.NPOL, 16))
+        np.testing.assert_array_equal(counts[2, 1]/counts[2, 1].max(), histo0)
+
+    def test_spectra(self):
+        spec = pp.spectra(self.data)
+        self.assertEqual(spec.shape, (pp.NANT, pp.NPOL, pp.NCHAN))
+        for ant, pol in [(0, 0), (1, 1), (2, 0)]:
+            np.testing.assert_allclose(pp.decode_data(self.data, ant, pol),
+                                       legacy_decode_data(self.data, ant, pol))
+            np.testing.assert_allclose(spec[ant, pol], legacy_decode_data(self.data, ant, pol))
+
+    def test_decode_headers(self):
+        packet_ids, spectrum_ids = pp.decode_headers(self.data)
+        for packet, p0, sp0 in zip(self.data, packet_ids, spectrum_ids):
+            d = np.asarray(struct.unpack('>4616B', packet))
+            p = ((d[4] & 224) >> 5) | (d[3] << 3) | (d[2] << 11) | (d[1] << 19) | (d[0] << 27)
+            sp = ((d[4] & 31) << 8) | d[5]
+            self.assertEqual((p0, sp0), (p, sp))
+
+    def test_loss_stats(self):
+        ids = list(range(1000, 1200, 2))
+        del ids[50:53]
+        del ids[10]
+        ids[20], ids[21] = ids[21], ids[20]
+        ids += [ids[30]]
+        arr = np.zeros((2*len(ids), pp.PACKET_SIZE), dtype=np.uint8)
+        for row, (p, sp) in enumerate([(p, 7) for p in ids] + [(p, 300) for p in range(len(ids))]):
+            arr[row, :5] = np.frombuffer((p << 5 | sp >> 8).to_bytes(5, 'big'), dtype=np.uint8)
+            arr[row, 5] = sp & 255
+        stats = pp.loss_stats(arr)
+        self.assertEqual(sorted(stats), [7, 300])
+        self.assertEqual(stats[7]['step'], 2)
+        self.assertEqual(stats[7]['expected'], 100)
+        self.assertEqual(stats[7]['missing'], 4)
+        self.assertEqual(stats[7]['gaps'], 2)
+        self.assertEqual(stats[7]['largest_gap'], 3)
+        self.assertEqual(stats[7]['duplicates'], 1)
+        self.assertEqual(stats[7]['reorders'], 1)
+        self.assertAlmostEqual(stats[7]['loss_fraction'], 0.04)
+        self.assertEqual(stats[300]['missing'], 0)
+        self.assertEqual(stats[300]['reorders'], 0)
+
+    def test_accumulator(self):
+        class FakeStore:
+            def __init__(self):
+                self.puts = []
+
+            def put_dict(self, key, value):
+                self.puts.append((key, value))
+
+        store = FakeStore()
+        acc = pp.PacketAccumulator(store=store, key='/mon/test/packets', interval=0.)
+        acc.add(self.data[:2])
+        acc.add(pp.as_array(self.data[2:]))
+        real, imag = pp.decode_voltages(self.data)
+        samples = np.array([[np.concatenate([real[:, ant, :, :, pol].ravel(),
+                                             imag[:, ant, :, :, pol].ravel()])
+                             for pol in range(pp.NPOL)] for ant in range(pp.NANT)])
+        np.testing.assert_allclose(acc.mean, samples.mean(axis=-1))
+        np.testing.assert_allclose(acc.rms, samples.std(axis=-1))
+        np.testing.assert_array_equal(acc.counts, pp.histograms(self.data))
+        np.testing.assert_allclose(acc.power, pp.NTIME*pp.spectra(self.data))
+        self.assertEqual(len(store.puts), 2)
+        key, snapshot = store.puts[-1]
+        self.assertEqual(key, '/mon/test/packets')
+        self.assertEqual(snapshot['npackets'], 5)
+        np.testing.assert_allclose(snapshot['spectra'], pp.spectra(self.data)/5)
+        with self.assertRaises(ValueError):
+            pp.PacketAccumulator(store=store)
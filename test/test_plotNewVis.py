@@ -0,0 +1,79 @@
+"""Test code for plotNewVis.py
+   execute 'pytest' to run tests.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+import numpy as np
+from astropy.io import fits
+sys.path.append(str(Path('..')))
+from dsautils import plotNewVis
+
+
+def legacy_products(fl, f1, f2, tbin):
+    """Time and frequency averages as the plot functions computed them."""
+    f = fits.open(fl, ignore_missing_end=True)[1]
+    nrow = f.header['NAXIS2']
+    tsamp = f.header['TSAMP']
+    nchan = 1536
+    fch1 = f.header['FCH1'] - (nchan * 2 - 1) * 250. / 2048.
+    if1 = np.floor((-fch1 + f1) / (500. / 2048.)).astype('int')
+    if2 = np.floor((-fch1 + f2) / (500. / 2048.)).astype('int')
+    t1, t2 = 0, nrow - 1
+    full = np.flip(f.data['VIS'].reshape((nrow, 6, nchan, 2, 2)), axis=2)[t1:t2, :, if1:if2]
+    data = full.mean(axis=2)
+    tmax = np.floor((t2 - t1) / (tbin * 1.)).astype('int') * tbin
+    tims = (np.arange(nrow) * tsamp)[0:tmax]
+    tims = tims.reshape((tmax // tbin, tbin)).mean(axis=1)
+    data = data[0:tmax].reshape((tmax // tbin, tbin, 6, 2, 2)).mean(axis=1)
+    return tims, data, full.mean(axis=0)
+
+
+class TestPlotNewVis(unittest.TestCase):
+    """This class is applying unit tests to the functions in plotNewVis.py
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fl = os.path.join(self.tmpdir.name, 'vis.fits')
+        rng = np.random.default_rng(3)
+        vis = rng.normal(size=(23, 6*1536*4)).astype(np.float32)
+        hdu = fits.BinTableHDU.from_columns([fits.Column(name='VIS', format='{0}E'.format(vis.shape[1]),
+                                                         array=vis)])
+        hdu.header['TSAMP'] = 0.5
+        hdu.header['FCH1'] = 1530.
+        hdu.writeto(self.fl)
+
+    def tearDown(self):
+        plotNewVis._VISFILES.clear()
+        self.tmpdir.cleanup()
+
+    def test_products(self):
+        vf = plotNewVis.VisFile(self.fl, block_rows=5)
+        f1, f2 = 1200., 1300.
+        tims0, time0, freq0 = legacy_products(self.fl, f1, f2, 4)
+        tims, time_vis = vf.time_vis(f1, f2, tbin=4)
+        np.testing.assert_allclose(tims, tims0)
+        np.testing.assert_allclose(time_vis, time0, rtol=1e-5, atol=1e-6)
+        freqs, freq_vis = vf.freq_vis(f1, f2)
+        self.assertEqual(len(freqs), freq_vis.shape[1])
+        np.testing.assert_allclose(freq_vis, freq0, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(vf.time_phase(f1, f2, 4)[1], plotNewVis.phase(time0), rtol=1e-3, atol=1e-3)
+        np.testing.assert_allclose(vf.freq_amp(f1, f2)[1], plotNewVis.amplitude(freq0), rtol=1e-3, atol=1e-3)
+        vf.close()
+
+    def test_single_pass(self):
+        vf = plotNewVis.get_visfile(self.fl)
+        self.assertIs(plotNewVis.get_visfile(self.fl), vf)
+        scans = []
+        scan = vf._scan
+        vf._scan = lambda *band: scans.append(band) or scan(*band)
+        vf.time_amp(tbin=2)
+        vf.time_phase()
+        vf.freq_amp()
+        vf.freq_phase()
+        self.assertEqual(scans, [(0, 1536)])
+        vf.close()
@@ -0,0 +1,71 @@
+"""Test code for sockets.py
+   execute 'pytest' to run tests.
+"""
+
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+import unittest
+import numpy as np
+sys.path.append(str(Path('..')))
+from dsautils import sockets
+
+
+def send(port, npackets, size=4616, short_every=None):
+    """Send numbered packets to localhost:port from another thread."""
+    def run():
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for i in range(npackets):
+                nbytes = size//2 if short_every and i % short_every == 0 else size
+                sock.sendto(i.to_bytes(4, 'big')*(nbytes//4), ('127.0.0.1', port))
+                if i % 50 == 0:
+                    time.sleep(0.001)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+class TestSockets(unittest.TestCase):
+    """This class is applying unit tests to the functions in sockets.py
+    """
+
+    def test_capture_count(self):
+        with sockets.UdpCapture('127.0.0.1', 0, nslots=500, buf=4616, rcvbuf=2**22) as cap:
+            port = cap.sock.getsockname()[1]
+            sender = send(port, 300, short_every=100)
+            self.assertEqual(cap.run(n=300, duration=10.), 300)
+            sender.join()
+            packets, lengths = cap.packets()
+            stats = cap.stats()
+        self.assertEqual(packets.shape, (300, 4616))
+        np.testing.assert_array_equal(packets[:, :4].view('>u4').ravel(), np.arange(300))
+        self.assertEqual(stats['short'], 3)
+        self.assertEqual(lengths[100], 2308)
+        self.assertEqual(stats['overwritten'], 0)
+        self.assertIn(stats['kernel_drops'], (0, None))
+
+    def test_ring_wrap_and_duration(self):
+        with sockets.UdpCapture('127.0.0.1', 0, nslots=64, buf=1024) as cap:
+            port = cap.sock.getsockname()[1]
+            sender = send(port, 200, size=1024)
+            t0 = time.monotonic()
+            received = cap.run(duration=0.5, interval=0.05)
+            self.assertGreaterEqual(time.monotonic() - t0, 0.5)
+            sender.join()
+            packets, lengths = cap.packets()
+            self.assertEqual(len(packets), 64)
+            self.assertEqual(cap.stats()['overwritten'], received - 64)
+            np.testing.assert_array_equal(np.diff(packets[:, :4].view('>u4').ravel()), 1)
+            self.assertEqual(len(cap.packets()[0]), 0)
+
+    def test_iter_chunks(self):
+        with sockets.UdpCapture('127.0.0.1', 0, nslots=128, buf=1024, rcvbuf=2**22) as cap:
+            port = cap.sock.getsockname()[1]
+            sender = send(port, 250, size=1024)
+            chunks = [packets for packets, lengths in cap.iter_chunks(100, duration=1.)]
+            sender.join()
+        self.assertEqual([len(packets) for packets in chunks], [100, 100, 50])
+        ids = np.concatenate([packets[:, :4].view('>u4').ravel() for packets in chunks])
+        np.testing.assert_array_equal(ids, np.arange(250))